@@ -0,0 +1,130 @@
+# benchmarks/bench_artifact_load.py
+#
+# Load time and per-process memory of each model artifact format. Every
+# format is loaded in a fresh process; RssAnon is private heap memory that
+# each worker pays for separately, RssFile is file-backed page cache that
+# pre-forked workers mapping the same file share.
+#
+#   python -m benchmarks.bench_artifact_load
+
+import argparse
+import multiprocessing
+import os
+import queue as queue_module
+import sys
+import time
+import numpy as np
+
+def _memory_kb() -> dict:
+    memory = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(("RssAnon:", "RssFile:")):
+                name, value = line.split(":")
+                memory[name] = int(value.split()[0])
+    return memory
+
+def _artifact_path(artifact_format: str) -> str:
+    """Path of an artifact of the registry's CURRENT version (else of models/)."""
+    from src.models.registry import FLAT_BUNDLE, LOOKUP_BUNDLE, MODEL_FILE, QUANTIZED_BUNDLE, current_artifacts
+    name = {"joblib": MODEL_FILE, "flat": FLAT_BUNDLE, "lookup": LOOKUP_BUNDLE,
+            "quantized": QUANTIZED_BUNDLE}[artifact_format.split("-")[0]]
+    return current_artifacts()[name]
+
+def _load(artifact_format: str):
+    path = _artifact_path(artifact_format)
+    if artifact_format.startswith("joblib"):
+        import joblib
+        model = joblib.load(path, mmap_mode='r' if artifact_format == "joblib-mmap" else None)
+        model.verbose = 0
+        return model
+    if artifact_format.startswith("flat"):
+        from src.models.flat_forest import FlatForest
+        return FlatForest.load(path, mmap_mode='r' if artifact_format == "flat-mmap" else None)
+    if artifact_format.startswith("quantized"):
+        from src.models.quantized import QuantizedForest
+        return QuantizedForest.load(path, mmap_mode='r' if artifact_format == "quantized-mmap" else None)
+    from src.models.lookup import LookupModel
+    return LookupModel.load(path, mmap_mode='r' if artifact_format == "lookup-mmap" else None)
+
+def _measure(artifact_format: str, queue):
+    # Keep library import cost out of the load timing
+    import pandas
+    import sklearn.ensemble
+    import src.models.flat_forest
+    import src.models.lookup
+    import src.models.quantized
+    before = _memory_kb()
+    start = time.perf_counter()
+    model = _load(artifact_format)
+    load_ms = (time.perf_counter() - start) * 1000.0
+
+    # Score a batch so the pages inference needs are actually touched
+    rng = np.random.default_rng(0)
+    X = np.column_stack([
+        rng.integers(1, 4, 1000), rng.integers(0, 2, 1000), rng.uniform(0, 80, 1000),
+        rng.integers(0, 5, 1000), rng.integers(0, 5, 1000), rng.uniform(0, 300, 1000), rng.integers(0, 3, 1000),
+    ])
+    model.predict_proba(pandas.DataFrame(X, columns=['Pclass', 'Sex', 'Age', 'SibSp', 'Parch', 'Fare', 'Embarked']))
+    after = _memory_kb()
+    queue.put({
+        "format": artifact_format,
+        "load_ms": load_ms,
+        "anon_mb": (after["RssAnon"] - before["RssAnon"]) / 1024.0,
+        "file_mb": (after["RssFile"] - before["RssFile"]) / 1024.0,
+    })
+
+def _wait_for_result(worker, queue, timeout_s: float):
+    """The worker's result, or None if it exits without one (e.g. it raised) or exceeds timeout_s."""
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        try:
+            return queue.get(timeout=0.5)
+        except queue_module.Empty:
+            if worker.exitcode is not None:
+                # Exited; the result may still have been flushed just before
+                try:
+                    return queue.get(timeout=0.5)
+                except queue_module.Empty:
+                    return None
+    return None
+
+def _artifact_size_mb(artifact_format: str) -> float:
+    path = _artifact_path(artifact_format)
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)) / 1e6
+    return os.path.getsize(path) / 1e6
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load time and per-process RSS of each model artifact format")
+    parser.add_argument("--formats", nargs="+",
+                        default=["joblib", "joblib-mmap", "flat", "flat-mmap", "quantized", "quantized-mmap", "lookup", "lookup-mmap"])
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds to wait for each format's worker")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    print(f"{'format':<15} {'size MB':>8} {'load ms':>9} {'private MB':>11} {'shared MB':>10}")
+    failed = []
+    for artifact_format in args.formats:
+        try:
+            size_mb = _artifact_size_mb(artifact_format)
+        except FileNotFoundError:
+            print(f"{artifact_format:<15} (artifact not found, skipped)")
+            continue
+        queue = context.Queue()
+        worker = context.Process(target=_measure, args=(artifact_format, queue))
+        worker.start()
+        result = _wait_for_result(worker, queue, args.timeout)
+        if result is None:
+            reason = f"exit code {worker.exitcode}" if worker.exitcode is not None else f"no result within {args.timeout:g} s"
+            if worker.exitcode is None:
+                worker.terminate()
+            worker.join()
+            print(f"{artifact_format:<15} (worker failed: {reason})")
+            failed.append(artifact_format)
+            continue
+        worker.join()
+        print(f"{artifact_format:<15} {size_mb:>8.1f} {result['load_ms']:>9.1f} "
+              f"{result['anon_mb']:>11.1f} {result['file_mb']:>10.1f}")
+    if failed:
+        sys.exit(1)
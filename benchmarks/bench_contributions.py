@@ -0,0 +1,64 @@
+# benchmarks/bench_contributions.py
+#
+# Overhead of per-feature contributions on batch scoring. Times
+# Predictor.predict_batch against explain_batch (Saabas) on the same rows,
+# reported per 100k rows, and checks that bias + contributions reproduces the
+# survival probability. TreeSHAP (shap package) is timed on a smaller sample
+# and scaled up, since it is orders of magnitude slower.
+#
+#   python -m benchmarks.bench_contributions --rows 100000 --treeshap-rows 1000
+
+import argparse
+import sys
+import time
+import numpy as np
+from src.models.predictor import Predictor
+
+def random_columns(n: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    return {
+        'Pclass': rng.integers(1, 4, n), 'Sex': rng.integers(0, 2, n), 'Age': rng.uniform(0, 80, n).round(1),
+        'SibSp': rng.integers(0, 5, n), 'Parch': rng.integers(0, 5, n), 'Fare': rng.uniform(0, 300, n).round(2),
+        'Embarked': rng.integers(0, 3, n),
+    }
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+def scale(seconds: float, rows: int) -> float:
+    """Seconds per 100k rows."""
+    return seconds * 100000 / rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cost of per-feature contributions on batch scoring")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--treeshap-rows", type=int, default=1000, help="Rows for the TreeSHAP timing (0 skips it)")
+    args = parser.parse_args()
+
+    predictor = Predictor()
+    predictor.artifacts()[0].verbose = 0
+    columns = random_columns(args.rows)
+    predictor.explain_batch({name: values[:10] for name, values in columns.items()})  # builds the engine
+
+    (_, probabilities), predict_s = timed(lambda: predictor.predict_batch(columns))
+    (_, _, bias, contributions), explain_s = timed(lambda: predictor.explain_batch(columns))
+    error = float(np.abs(bias + contributions.sum(axis=1) - probabilities).max())
+    print(f"Saabas additivity on {args.rows} rows: max |bias + sum - probability| = {error:.3e}")
+    print(f"{'mode':<10} {'s / 100k rows':>14} {'overhead':>10}")
+    print(f"{'predict':<10} {scale(predict_s, args.rows):>14.2f} {'-':>10}")
+    print(f"{'saabas':<10} {scale(explain_s, args.rows):>14.2f} {scale(explain_s - predict_s, args.rows):>9.2f}s")
+
+    if args.treeshap_rows:
+        sample = {name: values[:args.treeshap_rows] for name, values in columns.items()}
+        try:
+            _, treeshap_s = timed(lambda: predictor.explain_batch(sample, 'treeshap'))
+        except ImportError:
+            print("treeshap   (shap not installed, skipped)")
+        else:
+            _, sample_predict_s = timed(lambda: predictor.predict_batch(sample))
+            print(f"{'treeshap':<10} {scale(treeshap_s, args.treeshap_rows):>14.2f} "
+                  f"{scale(treeshap_s - sample_predict_s, args.treeshap_rows):>9.2f}s  (from {args.treeshap_rows} rows)")
+    if error > 1e-9:
+        sys.exit(1)
@@ -0,0 +1,67 @@
+# benchmarks/bench_flat_forest.py
+#
+# Checks that the flattened (or quantized) NumPy engine reproduces
+# model.predict_proba exactly on the validation set, then compares batch
+# latency of both engines.
+#
+#   python -m benchmarks.bench_flat_forest --validation-data data/processed/validation_set.csv
+#   python -m benchmarks.bench_flat_forest --engine quantized
+
+import argparse
+import os
+import sys
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from src.models.flat_forest import FlatForest
+from src.models.quantized import QuantizedForest
+from src.models.registry import MODEL_FILE, current_artifacts
+
+ENGINES = {"flat": FlatForest, "quantized": QuantizedForest}
+
+BATCH_SIZES = [1, 10, 100, 1000, 10000, 100000]
+
+def best_time(fn, repeats: int) -> float:
+    """Best wall time of several calls, in seconds."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def check_exactness(model, forest, X: pd.DataFrame) -> bool:
+    expected = model.predict_proba(X)
+    actual = forest.predict_proba(X)
+    max_diff = float(np.abs(expected - actual).max())
+    same_labels = bool((model.predict(X) == forest.predict(X)).all())
+    print(f"Exactness on {len(X)} validation rows: max |proba diff| = {max_diff:.3e}, identical labels = {same_labels}")
+    return max_diff <= 1e-12 and same_labels
+
+def compare_latency(model, forest, X: pd.DataFrame, batch_sizes=BATCH_SIZES):
+    rng = np.random.default_rng(42)
+    print(f"{'batch':>8} {'sklearn ms':>12} {'engine ms':>10} {'speedup':>8}")
+    for batch_size in batch_sizes:
+        batch = X.iloc[rng.integers(0, len(X), batch_size)].reset_index(drop=True)
+        repeats = 20 if batch_size <= 1000 else 3
+        sklearn_time = best_time(lambda: model.predict_proba(batch), repeats)
+        flat_time = best_time(lambda: forest.predict_proba(batch), repeats)
+        print(f"{batch_size:>8} {sklearn_time * 1000:>12.3f} {flat_time * 1000:>10.3f} {sklearn_time / flat_time:>7.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exactness and latency of the flattened forest engine")
+    parser.add_argument("--model", type=str, default=None, help="Defaults to the registry's CURRENT model")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="flat")
+    parser.add_argument("--validation-data", type=str, default=os.path.join("data", "processed", "validation_set.csv"))
+    args = parser.parse_args()
+
+    model = joblib.load(args.model or current_artifacts()[MODEL_FILE])
+    model.verbose = 0
+    forest = ENGINES[args.engine].from_model(model)
+
+    X_val = pd.read_csv(args.validation_data).drop('Survived', axis=1)[forest.feature_names]
+    if not check_exactness(model, forest, X_val):
+        print(f"{args.engine} forest does not match the sklearn model.")
+        sys.exit(1)
+    compare_latency(model, forest, X_val)
@@ -0,0 +1,57 @@
+# benchmarks/bench_parse_input.py
+#
+# Throughput of parse_inputs_bulk against looping parse_input over the same
+# strings, after checking both produce the same features.
+#
+#   python -m benchmarks.bench_parse_input --rows 100000
+
+import argparse
+import logging
+import time
+import numpy as np
+from src.utils.helpers import FEATURE_ORDER, parse_input, parse_inputs_bulk
+
+def make_inputs(n_rows: int, seed: int = 42) -> list:
+    """Random 'key=value,...' strings, some with features left out."""
+    rng = np.random.default_rng(seed)
+    inputs = []
+    for _ in range(n_rows):
+        items = [
+            f"age={rng.uniform(0.5, 80):.1f}",
+            f"sex={rng.choice(['male', 'female'])}",
+            f"class={rng.integers(1, 4)}",
+            f"SibSp={rng.integers(0, 5)}",
+            f"Parch={rng.integers(0, 4)}",
+            f"Fare={rng.exponential(30):.4f}",
+            f"Embarked={rng.choice(['C', 'Q', 'S'])}",
+        ]
+        keep = rng.random(len(items)) < 0.85
+        inputs.append(",".join(item for item, k in zip(items, keep) if k) or items[0])
+    return inputs
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark bulk input parsing against parse_input")
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args()
+
+    # parse_input logs every default it fills in; measure it the way batch callers run it
+    logging.basicConfig(level=logging.WARNING)
+    inputs = make_inputs(args.rows)
+
+    start = time.perf_counter()
+    looped = [parse_input(s) for s in inputs]
+    loop_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    columns, valid, errors = parse_inputs_bulk(inputs)
+    bulk_seconds = time.perf_counter() - start
+
+    for feature in FEATURE_ORDER:
+        expected = np.array([row[feature] for row in looped])
+        if not np.array_equal(expected, columns[feature]):
+            raise SystemExit(f"parse_inputs_bulk disagrees with parse_input on {feature}.")
+
+    print(f"Rows: {args.rows}, invalid: {len(errors)}")
+    print(f"parse_input loop : {loop_seconds:.3f} s ({args.rows / loop_seconds:,.0f} rows/s)")
+    print(f"parse_inputs_bulk: {bulk_seconds:.3f} s ({args.rows / bulk_seconds:,.0f} rows/s)")
+    print(f"Speedup: {loop_seconds / bulk_seconds:.1f}x")
@@ -0,0 +1,82 @@
+# benchmarks/bench_scaling.py
+#
+# How preprocess_data and train_model scale with data size and n_jobs.
+# Synthetic raw data of each size is generated into a scratch directory and
+# every stage runs there as its own process, so wall time, peak RSS and CPU
+# time are those of the stage alone (from wait4).
+#
+#   python -m benchmarks.bench_scaling --sizes 891 10000 100000 1000000 --n-jobs 1 -1
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from src.data.synthetic import generate_raw_data
+
+RESULTS_PATH = os.path.join("benchmarks", "results", "scaling.json")
+
+def run_stage(args: list, cwd: str) -> dict:
+    """Run python -m <args> in cwd; return wall time, peak RSS and CPU use of that process."""
+    env = dict(os.environ, PYTHONPATH=os.getcwd(), PYTHONWARNINGS="ignore")
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-m", *args], cwd=cwd, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    # wait4 reports the resource usage of this child only
+    _, status, usage = os.wait4(process.pid, 0)
+    wall_s = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    stderr = process.stderr.read().decode('utf-8', 'replace')
+    process.stderr.close()
+    if process.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{stderr}")
+    cpu_s = usage.ru_utime + usage.ru_stime
+    return {
+        "wall_s": wall_s,
+        "peak_rss_mb": usage.ru_maxrss / 1024.0,
+        "cpu_s": cpu_s,
+        "cpu_utilization": cpu_s / wall_s,
+    }
+
+def scaling_grid(sizes: list, n_jobs_values: list, source_path: str, chunk_size: int = None) -> list:
+    results = []
+    for size in sizes:
+        workdir = tempfile.mkdtemp(prefix=f"scaling-{size}-")
+        try:
+            generate_raw_data(size, os.path.join(workdir, "data", "raw"), source_path)
+            preprocess_args = ["src.data.preprocess"] + (["--chunk-size", str(chunk_size)] if chunk_size else [])
+            stages = [("preprocess", None, preprocess_args)]
+            for n_jobs in n_jobs_values:
+                params_path = os.path.join(workdir, f"params_{n_jobs}.json")
+                with open(params_path, 'w') as f:
+                    json.dump({"n_jobs": n_jobs}, f)
+                stages.append(("train", n_jobs, ["src.models.train", "--params", params_path]))
+
+            for stage, n_jobs, args in stages:
+                measured = run_stage(args, workdir)
+                results.append({"stage": stage, "rows": size, "n_jobs": n_jobs, **measured})
+                print(f"{stage:>10} {size:>10} {str(n_jobs or '-'):>6} {measured['wall_s']:>9.2f} "
+                      f"{measured['peak_rss_mb']:>9.1f} {measured['cpu_s']:>9.2f} {measured['cpu_utilization']:>6.2f}",
+                      flush=True)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scaling of preprocessing and training with data size and n_jobs")
+    parser.add_argument("--sizes", type=int, nargs='+', default=[891, 10000, 100000, 1000000], help="train.csv row counts")
+    parser.add_argument("--n-jobs", type=int, nargs='+', default=[1, -1], help="n_jobs values for training")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Run preprocessing in streaming mode with this chunk size")
+    parser.add_argument("--source", type=str, default=os.path.join("data", "raw", "train.csv"), help="Real data the generator is fitted on")
+    parser.add_argument("--output", type=str, default=RESULTS_PATH)
+    args = parser.parse_args()
+
+    print(f"{'stage':>10} {'rows':>10} {'n_jobs':>6} {'wall s':>9} {'rss MB':>9} {'cpu s':>9} {'util':>6}")
+    results = scaling_grid(args.sizes, args.n_jobs, os.path.abspath(args.source), args.chunk_size)
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump({"cpu_count": os.cpu_count(), "results": results}, f, indent=2)
+    print(f"Results written to {args.output}.")
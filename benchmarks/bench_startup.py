@@ -0,0 +1,58 @@
+# benchmarks/bench_startup.py
+#
+# Startup cost of one CLI prediction with the full model and with --fast.
+# Each mode runs in fresh processes under -X importtime; the report shows
+# wall time, total import time, the heaviest top-level imports and whether
+# pandas/sklearn were loaded at all.
+#
+#   python -m benchmarks.bench_startup --runs 5
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+SAMPLE_INPUT = "age=22,sex=female,class=3"
+HEAVY_PACKAGES = ['pandas', 'sklearn', 'joblib', 'scipy', 'numpy']
+
+def parse_importtime(stderr: str) -> dict:
+    """Map each imported module to its (self, cumulative) import time in microseconds."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+def measure(extra_args: list, runs: int) -> dict:
+    command = [sys.executable, "-W", "ignore", "-X", "importtime", "main.py", "--input", SAMPLE_INPUT, *extra_args]
+    walls, imports = [], []
+    modules = {}
+    for _ in range(runs):
+        start = time.perf_counter()
+        completed = subprocess.run(command, capture_output=True, text=True, check=True)
+        walls.append(time.perf_counter() - start)
+        modules = parse_importtime(completed.stderr)
+        imports.append(sum(self_us for self_us, _ in modules.values()))
+    top_level = {name: cumulative for name, (_, cumulative) in modules.items() if "." not in name}
+    return {
+        "wall_ms": statistics.median(walls) * 1000.0,
+        "import_ms": statistics.median(imports) / 1000.0,
+        "modules": len(modules),
+        "heaviest": sorted(top_level.items(), key=lambda item: -item[1])[:5],
+        "heavy_loaded": [package for package in HEAVY_PACKAGES if package in modules],
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CLI startup and import time, full model vs --fast")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    for label, extra_args in [("full", []), ("fast", ["--fast"])]:
+        result = measure(extra_args, args.runs)
+        print(f"{label}: {result['wall_ms']:.0f} ms wall, {result['import_ms']:.0f} ms importing "
+              f"{result['modules']} modules; heavy packages imported: {', '.join(result['heavy_loaded']) or 'none'}")
+        for name, cumulative_us in result["heaviest"]:
+            print(f"    {name:<28} {cumulative_us / 1000.0:>8.1f} ms")
@@ -0,0 +1,161 @@
+# benchmarks/suite.py
+#
+# Inference latency and throughput suite for the shipped model. Writes the
+# results as JSON and compares them with a stored baseline; exits non-zero
+# when a metric regresses by more than --threshold.
+#
+#   python -m benchmarks.suite --update-baseline      # record a baseline on this machine
+#   python -m benchmarks.suite                        # compare against it
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from benchmarks.bench_flat_forest import best_time
+from benchmarks.bench_parse_input import make_inputs
+from src.models.artifacts import file_sha256
+from src.models.registry import FEATURE_ORDER_FILE, MODEL_FILE, current_artifacts
+from src.utils.helpers import parse_input
+
+RESULTS_PATH = os.path.join("benchmarks", "results", "latest.json")
+BASELINE_PATH = os.path.join("benchmarks", "baseline.json")
+BATCH_SIZES = [1, 10, 100, 1000, 10000, 100000, 1000000]
+SAMPLE_INPUT = "age=22,sex=female,class=3"
+
+def median_time(fn, repeats: int) -> float:
+    """Median wall time of several calls, in seconds."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+def make_features(n_rows: int, feature_order: list, seed: int = 42) -> pd.DataFrame:
+    """Random rows covering the encoded feature domains."""
+    rng = np.random.default_rng(seed)
+    columns = {
+        'Pclass': rng.integers(1, 4, n_rows),
+        'Sex': rng.integers(0, 2, n_rows),
+        'Age': rng.uniform(0.5, 80, n_rows).round(1),
+        'SibSp': rng.integers(0, 6, n_rows),
+        'Parch': rng.integers(0, 5, n_rows),
+        'Fare': rng.exponential(30, n_rows).round(4),
+        'Embarked': rng.integers(0, 3, n_rows),
+    }
+    return pd.DataFrame(columns)[feature_order]
+
+def metric(value: float, unit: str, better: str = 'lower') -> dict:
+    return {"value": value, "unit": unit, "better": better}
+
+def run_suite(batch_sizes=BATCH_SIZES, cold_runs: int = 5) -> dict:
+    metrics = {}
+
+    # Cold process: interpreter start, imports, model load and one prediction
+    command = [sys.executable, "-W", "ignore", "main.py", "--input", SAMPLE_INPUT]
+    cold = median_time(lambda: subprocess.run(command, capture_output=True, check=True), cold_runs)
+    metrics["cold_main_ms"] = metric(cold * 1000.0, "ms")
+
+    paths = current_artifacts()
+    load = median_time(lambda: joblib.load(paths[MODEL_FILE]), 5)
+    metrics["joblib_load_ms"] = metric(load * 1000.0, "ms")
+
+    # Single-row evaluate_model, with the prediction cache off so every call scores
+    from src.models.evaluate import configure_cache, evaluate_model, get_predictor
+    configure_cache(0)
+    get_predictor().artifacts()[0].verbose = 0
+    logging.disable(logging.CRITICAL)
+    features = parse_input(SAMPLE_INPUT)
+    evaluate_model(features)
+    metrics["evaluate_model_ms"] = metric(median_time(lambda: evaluate_model(features), 50) * 1000.0, "ms")
+
+    inputs = make_inputs(1000)
+    per_call = best_time(lambda: [parse_input(text) for text in inputs], 5) / len(inputs)
+    logging.disable(logging.NOTSET)
+    metrics["parse_input_us"] = metric(per_call * 1e6, "us")
+
+    model = joblib.load(paths[MODEL_FILE])
+    model.verbose = 0
+    with open(paths[FEATURE_ORDER_FILE], 'r') as f:
+        feature_order = [line.strip() for line in f]
+    X = make_features(max(batch_sizes), feature_order)
+    for batch_size in batch_sizes:
+        batch = X.iloc[:batch_size]
+        repeats = 20 if batch_size <= 1000 else 3 if batch_size <= 100000 else 1
+        elapsed = best_time(lambda: model.predict_proba(batch), repeats)
+        metrics[f"predict_proba_rows_per_s_{batch_size}"] = metric(batch_size / elapsed, "rows/s", better='higher')
+    return metrics
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Print current vs baseline per metric and return the names that regressed beyond threshold."""
+    regressions = []
+    print(f"{'metric':<34} {'baseline':>14} {'current':>14} {'change':>8}")
+    for name, current in results["metrics"].items():
+        previous = baseline["metrics"].get(name)
+        if previous is None:
+            print(f"{name:<34} {'-':>14} {current['value']:>14.3f}   (new)")
+            continue
+        change = current["value"] / previous["value"] - 1.0
+        worse = change > threshold if current["better"] == 'lower' else change < -threshold
+        flag = "  REGRESSION" if worse else ""
+        print(f"{name:<34} {previous['value']:>14.3f} {current['value']:>14.3f} {change:>+7.1%}{flag}")
+        if worse:
+            regressions.append(name)
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inference latency and throughput suite")
+    parser.add_argument("--output", type=str, default=RESULTS_PATH, help="Where to write this run's JSON results")
+    parser.add_argument("--baseline", type=str, default=BASELINE_PATH, help="Baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative slowdown that counts as a regression (0.2 = 20%%)")
+    parser.add_argument("--update-baseline", action='store_true', help="Store this run as the new baseline")
+    parser.add_argument("--max-batch-size", type=int, default=max(BATCH_SIZES), help="Largest predict_proba batch to measure")
+    args = parser.parse_args()
+
+    # Without a baseline the regression check could never fail, so that is an error rather than a pass
+    if not args.update_baseline and not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline on this machine to record one.")
+        sys.exit(1)
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            "model_sha256": file_sha256(current_artifacts()[MODEL_FILE]),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "sklearn": sklearn.__version__,
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+        },
+        "metrics": run_suite([size for size in BATCH_SIZES if size <= args.max_batch_size]),
+    }
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}.")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline updated at {args.baseline}.")
+        sys.exit(0)
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+    if baseline["meta"].get("model_sha256") != results["meta"]["model_sha256"]:
+        print("Note: the baseline was recorded with a different model artifact.")
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print("No regressions.")
@@ -1,12 +1,12 @@
 # main.py
 
 import argparse
-from src.models.evaluate import evaluate_model
+from src.utils import metrics
 from src.utils.helpers import parse_input
 import logging
 import sys
 
-def setup_logging():
+def setup_logging(stream=sys.stdout):
     """Set up logging to file and console."""
     logger = logging.getLogger()
     logger.setLevel(logging.INFO)
@@ -25,32 +25,92 @@ def setup_logging():
     logger.addHandler(file_handler)
 
     # Console handler
-    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler = logging.StreamHandler(stream)
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(formatter)
     logger.addHandler(console_handler)
 
 def main():
-    # Initialize logging
-    setup_logging()
-    logging.info("=== Starting Main Evaluation Script ===")
-    
     parser = argparse.ArgumentParser(description="Interact with the Titanic Survival Model")
-    parser.add_argument("--input", type=str, required=True, help="Input features in the format 'age=22,sex=female,class=3,SibSp=0,Parch=0,Fare=7.8292,Embarked=S'")
+    input_group = parser.add_mutually_exclusive_group(required=True)
+    input_group.add_argument("--input", type=str, help="Input features in the format 'age=22,sex=female,class=3,SibSp=0,Parch=0,Fare=7.8292,Embarked=S'")
+    input_group.add_argument("--input-file", type=str, help="CSV (with header) or JSONL file of passengers to score in batch, using the same keys as --input")
+    parser.add_argument("--output", type=str, default=None, help="Write batch predictions to this file instead of stdout")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Number of rows scored per model call in batch mode")
+    parser.add_argument("--cache-db", type=str, default=None, help="SQLite file that keeps cached predictions across runs (e.g. .cache/predictions.sqlite)")
+    parser.add_argument("--cache-size", type=int, default=None, help="Maximum number of predictions kept in the in-memory cache (0 disables caching; default 10000, or 0 for --input-file without --cache-db)")
+    parser.add_argument("--cache-db-max-entries", type=int, default=1000000, help="Maximum number of rows kept in the --cache-db file (least recently used are dropped)")
+    parser.add_argument("--quiet", action='store_true', help="Skip per-prediction and per-chunk log formatting")
+    parser.add_argument("--metrics-jsonl", type=str, default=None, help="Append one JSON line per timed span to this file")
+    parser.add_argument("--fast", action='store_true', help="Answer --input from the precompiled lookup/quantized/flat model without importing pandas or sklearn")
+    parser.add_argument("--metrics-prom", type=str, default=None, help="Write span totals in Prometheus text format to this file on exit")
+    parser.add_argument("--explain", choices=['saabas', 'treeshap'], default=None, help="Also output per-feature contributions to the survival probability ('treeshap' needs the shap package)")
     args = parser.parse_args()
+    metrics.configure(args.metrics_jsonl, args.metrics_prom, args.quiet or None)
+
+    # Initialize logging; keep stdout clean when batch results are streamed to it
+    batch_to_stdout = args.input_file is not None and args.output is None
+    setup_logging(sys.stderr if batch_to_stdout else sys.stdout)
+    logging.info("=== Starting Main Evaluation Script ===")
+
+    input_features = None
+    if args.fast and args.explain:
+        logging.warning("--explain needs the full model; ignoring --fast.")
+    elif args.fast and args.input is not None:
+        from src.models.compiled import predict_fast
+        try:
+            input_features = parse_input(args.input)
+            with metrics.span("evaluate_model.compiled", rows=1):
+                compiled = predict_fast(input_features)
+            if compiled is not None:
+                result = 'Survived' if compiled[0] == 1 else 'Did Not Survive'
+                logging.info(f"Survival Prediction: {result}")
+                print(f"Survival Prediction: {result}")
+                logging.info("=== Evaluation Completed Successfully ===")
+                return
+        except Exception as e:
+            logging.exception("Fast prediction failed.")
+            sys.exit(1)
+        logging.warning("No up-to-date compiled model can score this input; falling back to the full model.")
+
+    # pandas, joblib and sklearn are only imported when the full model is needed
+    from src.models.evaluate import configure_cache, evaluate_batch, evaluate_model
+    cache_size = args.cache_size
+    if cache_size is None:
+        # Rows of one file rarely repeat, so without a persistent cache building keys would only cost time
+        cache_size = 0 if args.input_file is not None and args.cache_db is None else 10000
+    configure_cache(cache_size, args.cache_db, args.cache_db_max_entries)
+
+    if args.input_file is not None:
+        try:
+            rows_scored = evaluate_batch(args.input_file, args.output, args.chunk_size, args.explain)
+        except Exception as e:
+            logging.exception("Failed to evaluate the batch input file.")
+            sys.exit(1)
+        logging.info(f"=== Batch Evaluation Completed Successfully: {rows_scored} rows ===")
+        return
 
     try:
-        input_features = parse_input(args.input)
-        logging.info(f"Parsed Input Features: {input_features}")
+        if input_features is None:
+            input_features = parse_input(args.input)
+        if not metrics.quiet():
+            logging.info(f"Parsed Input Features: {input_features}")
     except Exception as e:
         logging.exception("Failed to parse input features.")
         sys.exit(1)
 
     try:
-        prediction = evaluate_model(input_features)
+        if args.explain:
+            prediction, bias, contributions = evaluate_model(input_features, args.explain)
+        else:
+            prediction = evaluate_model(input_features)
         result = 'Survived' if prediction == 1 else 'Did Not Survive'
         logging.info(f"Survival Prediction: {result}")
         print(f"Survival Prediction: {result}")
+        if args.explain:
+            print(f"Survival probability {bias + sum(contributions.values()):.4f} = baseline {bias:.4f}")
+            for feature, value in sorted(contributions.items(), key=lambda item: -abs(item[1])):
+                print(f"    {feature:<10} {value:+.4f}")
     except Exception as e:
         logging.exception("Failed to evaluate the model.")
         sys.exit(1)
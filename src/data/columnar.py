@@ -0,0 +1,134 @@
+# src/data/columnar.py
+
+import json
+import logging
+import os
+import numpy as np
+import pandas as pd
+from src.models.artifacts import MANIFEST_NAME, load_array_bundle, save_array_bundle
+
+PROCESSED_DATA_PATH = os.path.join("data", "processed")
+DATA_FORMATS = ['csv', 'columnar']
+COLUMNAR_SUFFIX = ".cols"
+
+# Schema of every processed artifact; readers never infer types
+PROCESSED_DTYPES = {
+    'Survived': 'int64',
+    'Pclass': 'int64',
+    'Sex': 'int64',
+    'Age': 'float64',
+    'SibSp': 'int64',
+    'Parch': 'int64',
+    'Fare': 'float64',
+    'Embarked': 'int64',
+}
+
+def processed_path(name: str, data_format: str = 'csv', directory: str = PROCESSED_DATA_PATH) -> str:
+    """Path of a processed artifact, e.g. processed_path('train_processed', 'columnar')."""
+    if data_format not in DATA_FORMATS:
+        raise ValueError(f"Unknown data format '{data_format}'; expected one of {DATA_FORMATS}.")
+    suffix = COLUMNAR_SUFFIX if data_format == 'columnar' else ".csv"
+    return os.path.join(directory, f"{name}{suffix}")
+
+def cast_to_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Cast the columns named in PROCESSED_DTYPES to their schema type, so chunks never differ from whole-file output."""
+    return df.astype({column: PROCESSED_DTYPES[column] for column in df.columns if column in PROCESSED_DTYPES})
+
+def is_columnar(path: str) -> bool:
+    return path.endswith(COLUMNAR_SUFFIX) or os.path.exists(os.path.join(path, MANIFEST_NAME))
+
+def write_table(df: pd.DataFrame, path: str):
+    """
+    Write a processed DataFrame as CSV or, for a .cols path, as a columnar bundle.
+
+    The columnar form stores one .npy file per column, cast to
+    PROCESSED_DTYPES, plus the column order and dtypes in the manifest.
+    """
+    if not is_columnar(path):
+        df.to_csv(path, index=False)
+        return
+    dtypes = {column: PROCESSED_DTYPES.get(column, str(df[column].dtype)) for column in df.columns}
+    arrays = {column: df[column].to_numpy(dtype=dtypes[column]) for column in df.columns}
+    save_array_bundle(path, arrays, {"columns": list(df.columns), "dtypes": dtypes, "rows": len(df)})
+
+def read_table(path: str) -> pd.DataFrame:
+    """Read a table written by write_table, with the schema's dtypes and no type inference."""
+    if not os.path.exists(path):
+        logging.error(f"Processed data not found at {path}.")
+        raise FileNotFoundError(f"Processed data not found at {path}.")
+    if not is_columnar(path):
+        header = pd.read_csv(path, nrows=0).columns
+        dtypes = {column: PROCESSED_DTYPES[column] for column in header if column in PROCESSED_DTYPES}
+        return pd.read_csv(path, dtype=dtypes)
+
+    arrays, meta = load_array_bundle(path, mmap_mode=None)
+    for column, dtype in meta["dtypes"].items():
+        if arrays[column].dtype != np.dtype(dtype):
+            logging.error(f"Column {column} in {path} is {arrays[column].dtype}, schema says {dtype}.")
+            raise TypeError(f"Column {column} in {path} is {arrays[column].dtype}, schema says {dtype}.")
+    return pd.DataFrame({column: arrays[column] for column in meta["columns"]}, copy=False)
+
+def read_table_chunks(path: str, chunk_size: int):
+    """Yield a table written by write_table as DataFrames of at most chunk_size rows, with the schema's dtypes."""
+    if not os.path.exists(path):
+        logging.error(f"Processed data not found at {path}.")
+        raise FileNotFoundError(f"Processed data not found at {path}.")
+    if not is_columnar(path):
+        header = pd.read_csv(path, nrows=0).columns
+        dtypes = {column: PROCESSED_DTYPES[column] for column in header if column in PROCESSED_DTYPES}
+        yield from pd.read_csv(path, dtype=dtypes, chunksize=chunk_size)
+        return
+
+    # Memory maps, so only the rows of the current chunk are read in
+    arrays, meta = load_array_bundle(path, mmap_mode='r')
+    rows = len(arrays[meta["columns"][0]]) if meta["columns"] else 0
+    for start in range(0, rows, chunk_size):
+        yield pd.DataFrame({column: np.array(arrays[column][start:start + chunk_size]) for column in meta["columns"]}, copy=False)
+
+class ColumnarWriter:
+    """
+    Streams DataFrame chunks into a columnar bundle whose row count is known up front.
+
+    Each column is preallocated as a .npy memory map and filled chunk by
+    chunk, so memory use is bounded by the chunk size. The manifest is only
+    written by close(), after every row has been filled in.
+    """
+
+    def __init__(self, path: str, columns: list, rows: int):
+        self.path = path
+        self.columns = list(columns)
+        self.rows = rows
+        self.dtypes = {column: PROCESSED_DTYPES.get(column, 'float64') for column in self.columns}
+        self.written = 0
+        os.makedirs(path, exist_ok=True)
+        self._arrays = {
+            column: np.lib.format.open_memmap(
+                os.path.join(path, f"{column}.npy.tmp"), mode='w+', dtype=self.dtypes[column], shape=(rows,)
+            )
+            for column in self.columns
+        }
+
+    def append(self, df: pd.DataFrame):
+        end = self.written + len(df)
+        if end > self.rows:
+            raise ValueError(f"{self.path} was sized for {self.rows} rows; got {end}.")
+        for column in self.columns:
+            self._arrays[column][self.written:end] = df[column].to_numpy(dtype=self.dtypes[column])
+        self.written = end
+
+    def close(self):
+        if self.written != self.rows:
+            raise ValueError(f"{self.path} was sized for {self.rows} rows; only {self.written} written.")
+        for column, array in self._arrays.items():
+            array.flush()
+            array_path = os.path.join(self.path, f"{column}.npy")
+            os.replace(array_path + ".tmp", array_path)
+        self._arrays = {}
+
+        manifest_path = os.path.join(self.path, MANIFEST_NAME)
+        with open(manifest_path + ".tmp", 'w') as f:
+            json.dump({
+                "arrays": sorted(self.columns),
+                "meta": {"columns": self.columns, "dtypes": self.dtypes, "rows": self.rows},
+            }, f, indent=2)
+        os.replace(manifest_path + ".tmp", manifest_path)
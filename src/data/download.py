@@ -1,20 +1,205 @@
 # src/data/download.py
 
+import argparse
+import hashlib
+import json
+import logging
 import os
-from kaggle.api.kaggle_api_extended import KaggleApi
+import shutil
+import tempfile
+import zipfile
+import pandas as pd
+from src.data.columnar import DATA_FORMATS, processed_path, write_table
+from src.data.preprocess import transform_chunk
+from src.models.artifacts import MANIFEST_NAME, file_sha256
+from src.utils.metrics import span
 
-def download_titanic_dataset():
-    raw_data_path = os.path.join("data", "raw")
-    os.makedirs(raw_data_path, exist_ok=True)
+RAW_DATA_PATH = os.path.join("data", "raw")
+DATASET_CACHE_PATH = os.path.join("data", "cache")
+ARCHIVE_NAME = "titanic.zip"
+MEMBERS = ["train.csv", "test.csv"]
+# Directory holding a copy of titanic.zip, used instead of Kaggle (offline machines, CI)
+MIRROR_ENV = "TITANIC_DATASET_MIRROR"
+
+def archive_path(sha256: str, cache_path: str = DATASET_CACHE_PATH) -> str:
+    return os.path.join(cache_path, "archives", f"{sha256}.zip")
+
+def load_index(cache_path: str = DATASET_CACHE_PATH) -> dict:
+    index_path = os.path.join(cache_path, "index.json")
+    if not os.path.exists(index_path):
+        return {"current": None, "files": {}, "members": {}}
+    with open(index_path, 'r') as f:
+        return json.load(f)
+
+def save_index(index: dict, cache_path: str = DATASET_CACHE_PATH):
+    index_path = os.path.join(cache_path, "index.json")
+    os.makedirs(cache_path, exist_ok=True)
+    with open(index_path + ".tmp", 'w') as f:
+        json.dump(index, f, indent=2)
+    os.replace(index_path + ".tmp", index_path)
+
+def stat_signature(path: str):
+    """(size, mtime_ns) of a file, or of a columnar bundle's manifest; None if it does not exist."""
+    if os.path.isdir(path):
+        path = os.path.join(path, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+def known_sha256(path: str, index: dict) -> str:
+    """Content hash of a file, read only if its size or mtime changed since it was last hashed."""
+    signature = stat_signature(path)
+    if signature is None:
+        return None
+    record = index["files"].get(path)
+    if record and record["stat"] == signature:
+        return record["sha256"]
+    sha256 = file_sha256(path)
+    index["files"][path] = {"stat": signature, "sha256": sha256}
+    return sha256
+
+def add_archive(source: str, index: dict, cache_path: str = DATASET_CACHE_PATH, move: bool = False) -> str:
+    """Store an archive in the cache under its content hash (a no-op if it is already there). Returns the hash."""
+    sha256 = known_sha256(source, index)
+    target = archive_path(sha256, cache_path)
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if move:
+            os.replace(source, target)
+        else:
+            shutil.copyfile(source, target + ".tmp")
+            os.replace(target + ".tmp", target)
+    return sha256
+
+def fetch_from_kaggle(index: dict, cache_path: str = DATASET_CACHE_PATH) -> str:
+    from kaggle.api.kaggle_api_extended import KaggleApi
 
     api = KaggleApi()
     api.authenticate()
-    api.competition_download_files("titanic", path=raw_data_path)
+    os.makedirs(cache_path, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".download-", dir=cache_path)
+    try:
+        api.competition_download_files("titanic", path=staging)
+        sha256 = add_archive(os.path.join(staging, ARCHIVE_NAME), index, cache_path, move=True)
+    finally:
+        index["files"].pop(os.path.join(staging, ARCHIVE_NAME), None)
+        shutil.rmtree(staging, ignore_errors=True)
+    return sha256
+
+def resolve_archive(index: dict, mirror: str = None, refresh: bool = False, offline: bool = False,
+                    cache_path: str = DATASET_CACHE_PATH) -> str:
+    """
+    Hash of the archive to use: the mirror's titanic.zip if a mirror is set,
+    else the cached one, else (or with refresh) a fresh Kaggle download.
+    """
+    if mirror:
+        mirror_archive = os.path.join(mirror, ARCHIVE_NAME)
+        if not os.path.exists(mirror_archive):
+            logging.error(f"No {ARCHIVE_NAME} in the dataset mirror {mirror}.")
+            raise FileNotFoundError(f"No {ARCHIVE_NAME} in the dataset mirror {mirror}.")
+        print(f"Using dataset mirror {mirror}.")
+        return add_archive(mirror_archive, index, cache_path)
+    current = index["current"]
+    if current and os.path.exists(archive_path(current, cache_path)) and not refresh:
+        print(f"Using cached dataset {current[:12]} (no download).")
+        return current
+    if offline:
+        logging.error(f"No cached dataset in {cache_path} and no mirror; cannot download offline.")
+        raise FileNotFoundError(f"No cached dataset in {cache_path} and no mirror; cannot download offline.")
+    print("Downloading the dataset from Kaggle...")
+    return fetch_from_kaggle(index, cache_path)
+
+def extract_member(archive: zipfile.ZipFile, member: str, output_path: str) -> str:
+    """Stream one archive member to output_path (replaced atomically), hashing it on the way. Returns the hash."""
+    digest = hashlib.sha256()
+    with archive.open(member) as source, open(output_path + ".tmp", 'wb') as target:
+        for block in iter(lambda: source.read(1 << 20), b''):
+            digest.update(block)
+            target.write(block)
+    os.replace(output_path + ".tmp", output_path)
+    return digest.hexdigest()
+
+def extract_raw(sha256: str, index: dict, raw_path: str = RAW_DATA_PATH, cache_path: str = DATASET_CACHE_PATH) -> list:
+    """Extract the raw CSVs of a cached archive, skipping files whose checksum already matches. Returns those written."""
+    os.makedirs(raw_path, exist_ok=True)
+    members = index["members"].setdefault(sha256, {})
+    written = []
+    archive = None
+    try:
+        for member in MEMBERS:
+            output_path = os.path.join(raw_path, member)
+            if member in members and known_sha256(output_path, index) == members[member]:
+                continue
+            if archive is None:
+                archive = zipfile.ZipFile(archive_path(sha256, cache_path))
+            with span("download.extract", bytes_read=archive.getinfo(member).file_size):
+                members[member] = extract_member(archive, member, output_path)
+            index["files"][output_path] = {"stat": stat_signature(output_path), "sha256": members[member]}
+            written.append(output_path)
+    finally:
+        if archive is not None:
+            archive.close()
+    return written
+
+def extract_processed(sha256: str, index: dict, data_format: str, cache_path: str = DATASET_CACHE_PATH) -> list:
+    """
+    Preprocess the CSVs straight out of the archive into processed tables, without writing raw files.
+
+    Outputs already built from this archive (and unchanged since) are
+    skipped. Returns the paths written.
+    """
+    built = index.setdefault("processed", {})
+    written = []
+    with zipfile.ZipFile(archive_path(sha256, cache_path)) as archive:
+        for member in MEMBERS:
+            output_path = processed_path(member.replace(".csv", "_processed"), data_format)
+            record = built.get(output_path)
+            if record and record["archive"] == sha256 and record["stat"] == stat_signature(output_path):
+                continue
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            with span("download.preprocess", bytes_read=archive.getinfo(member).file_size) as timer:
+                with archive.open(member) as source:
+                    df = pd.read_csv(source)
+                timer.rows = len(df)
+                write_table(transform_chunk(df, df['Age'].median(), df['Fare'].median()), output_path)
+            built[output_path] = {"archive": sha256, "stat": stat_signature(output_path)}
+            written.append(output_path)
+    return written
+
+def download_titanic_dataset(mirror: str = None, refresh: bool = False, offline: bool = False, processed_format: str = None):
+    """
+    Make the Titanic CSVs available in data/raw (or, with processed_format, as processed tables).
 
-    print(f"Dataset downloaded to {raw_data_path}. Extracting...")
-    unzip_command = f"unzip -o {os.path.join(raw_data_path, 'titanic.zip')} -d {raw_data_path}"
-    os.system(unzip_command)
-    print("Extraction complete.")
+    Archives are kept in a content-addressed cache under data/cache, so
+    Kaggle is only contacted when nothing is cached (or with refresh). A
+    mirror directory (default: $TITANIC_DATASET_MIRROR) holding titanic.zip
+    replaces Kaggle entirely. Members are extracted in-process from the zip
+    stream, and only when the existing file's checksum differs; the
+    checksums are remembered by size and mtime, so an up-to-date run reads
+    nothing but the cache index.
+    """
+    mirror = mirror or os.environ.get(MIRROR_ENV)
+    index = load_index()
+    unchanged = json.dumps(index, sort_keys=True)
+    sha256 = resolve_archive(index, mirror, refresh, offline)
+    index["current"] = sha256
+    if processed_format:
+        written = extract_processed(sha256, index, processed_format)
+    else:
+        written = extract_raw(sha256, index)
+    if json.dumps(index, sort_keys=True) != unchanged:
+        save_index(index)
+    if written:
+        print(f"Extracted {', '.join(written)} from dataset {sha256[:12]}.")
+    else:
+        print("Dataset files are up to date; nothing extracted.")
 
 if __name__ == "__main__":
-    download_titanic_dataset()
+    parser = argparse.ArgumentParser(description="Download (or take from the cache / a mirror) and extract the Titanic dataset")
+    parser.add_argument("--mirror", type=str, default=None, help=f"Directory with {ARCHIVE_NAME} to use instead of Kaggle (default: ${MIRROR_ENV})")
+    parser.add_argument("--refresh", action='store_true', help="Download from Kaggle even if a dataset is cached")
+    parser.add_argument("--offline", action='store_true', help="Fail instead of contacting Kaggle when nothing is cached")
+    parser.add_argument("--processed-format", choices=DATA_FORMATS, default=None, help="Preprocess straight from the archive into this format instead of extracting raw CSVs")
+    args = parser.parse_args()
+    download_titanic_dataset(args.mirror, args.refresh, args.offline, args.processed_format)
@@ -1,10 +1,89 @@
 # src/data/preprocess.py
 
+import argparse
 import pandas as pd
 import os
 import logging
+import numpy as np
+from src.data.columnar import DATA_FORMATS, ColumnarWriter, cast_to_schema, is_columnar, processed_path, write_table
+from src.utils.metrics import path_bytes, span
 
-def preprocess_data():
+DROPPED_COLUMNS = ['Name', 'Ticket', 'Cabin', 'PassengerId']
+
+class StreamingMedian:
+    """
+    Exact median over values seen chunk by chunk.
+
+    Keeps one count per distinct value rather than the values themselves, so
+    memory grows with the number of distinct Age/Fare values (a few thousand
+    at the data's recorded precision), not with the number of rows.
+    """
+
+    def __init__(self):
+        self.counts = pd.Series(dtype=np.int64)
+
+    def add(self, values: pd.Series):
+        self.counts = self.counts.add(values.value_counts(), fill_value=0).astype(np.int64)
+
+    def median(self) -> float:
+        total = int(self.counts.sum())
+        if total == 0:
+            return np.nan
+        counts = self.counts.sort_index()
+        cumulative = counts.to_numpy().cumsum()
+        values = counts.index.to_numpy(dtype=np.float64)
+        lower = values[np.searchsorted(cumulative, (total - 1) // 2, side='right')]
+        upper = values[np.searchsorted(cumulative, total // 2, side='right')]
+        return (lower + upper) / 2
+
+def transform_chunk(df: pd.DataFrame, age_median: float, fare_median: float) -> pd.DataFrame:
+    """Fill missing values, encode categoricals and drop unused columns of a raw DataFrame."""
+    # Fill missing Age values with median age
+    df['Age'] = df['Age'].fillna(age_median)
+    # Fill missing Embarked values with 'S'
+    df['Embarked'] = df['Embarked'].fillna('S')
+    # Fill missing Fare values with median fare
+    df['Fare'] = df['Fare'].fillna(fare_median)
+
+    # Encode categorical variables
+    df['Sex'] = df['Sex'].map({'male': 0, 'female': 1})
+    df['Embarked'] = df['Embarked'].map({'C': 0, 'Q': 1, 'S': 2})
+
+    # Drop unwanted columns including PassengerId
+    return df.drop(DROPPED_COLUMNS, axis=1, errors='ignore')
+
+def preprocess_file_streaming(input_path: str, output_path: str, chunk_size: int) -> int:
+    """
+    Preprocess one raw CSV in two passes without loading it whole.
+
+    The first pass reads only Age and Fare to count rows and compute the
+    exact medians; the second transforms each chunk and appends it to the
+    output CSV, or fills a preallocated columnar bundle. Returns the row count.
+    """
+    age_median, fare_median = StreamingMedian(), StreamingMedian()
+    rows = 0
+    for chunk in pd.read_csv(input_path, usecols=['Age', 'Fare'], dtype=np.float64, chunksize=chunk_size):
+        age_median.add(chunk['Age'])
+        fare_median.add(chunk['Fare'])
+        rows += len(chunk)
+    age, fare = age_median.median(), fare_median.median()
+    logging.info(f"{input_path}: {rows} rows, median Age {age}, median Fare {fare}.")
+
+    columns = [column for column in pd.read_csv(input_path, nrows=0).columns if column not in DROPPED_COLUMNS]
+    chunks = pd.read_csv(input_path, usecols=columns, chunksize=chunk_size)
+    if is_columnar(output_path):
+        writer = ColumnarWriter(output_path, columns, rows)
+        for chunk in chunks:
+            writer.append(transform_chunk(chunk, age, fare)[columns])
+        writer.close()
+    else:
+        with open(output_path, 'w', newline='') as f:
+            for i, chunk in enumerate(chunks):
+                # pandas infers types per chunk; a chunk of whole ages would otherwise be written as 22 instead of 22.0
+                cast_to_schema(transform_chunk(chunk, age, fare)[columns]).to_csv(f, header=(i == 0), index=False)
+    return rows
+
+def preprocess_data(data_format: str = 'csv', chunk_size: int = None):
     # Configure logging for preprocessing
     logging.basicConfig(
         filename='preprocessing.log',  # Log to a file named preprocessing.log
@@ -21,39 +100,42 @@ def preprocess_data():
     
     train_path = os.path.join(raw_data_path, "train.csv")
     test_path = os.path.join(raw_data_path, "test.csv")
+    train_processed_path = processed_path("train_processed", data_format, processed_data_path)
+    test_processed_path = processed_path("test_processed", data_format, processed_data_path)
+
+    if chunk_size:
+        try:
+            for input_path, output_path in [(train_path, train_processed_path), (test_path, test_processed_path)]:
+                # Both passes read the whole input
+                with span("preprocess.stream", bytes_read=2 * path_bytes(input_path)) as timer:
+                    timer.rows = preprocess_file_streaming(input_path, output_path, chunk_size)
+        except Exception as e:
+            logging.error(f"Error during streaming preprocessing: {e}")
+            raise e
+        logging.info(f"Data preprocessing completed successfully (streaming, chunks of {chunk_size} rows).")
+        return
     
     try:
-        train_data = pd.read_csv(train_path)
-        test_data = pd.read_csv(test_path)
+        with span("preprocess.load", bytes_read=path_bytes(train_path) + path_bytes(test_path)) as timer:
+            train_data = pd.read_csv(train_path)
+            test_data = pd.read_csv(test_path)
+            timer.rows = len(train_data) + len(test_data)
         logging.info("Successfully loaded train and test data.")
     except Exception as e:
         logging.error(f"Error loading data: {e}")
         raise e
     
     # Handle missing values and encode categorical variables
-    for df in [train_data, test_data]:
-        # Fill missing Age values with median age
-        df['Age'] = df['Age'].fillna(df['Age'].median())
-        # Fill missing Embarked values with 'S'
-        df['Embarked'] = df['Embarked'].fillna('S')
-        # Fill missing Fare values with median fare
-        df['Fare'] = df['Fare'].fillna(df['Fare'].median())
-        
-        # Encode categorical variables
-        df['Sex'] = df['Sex'].map({'male': 0, 'female': 1})
-        df['Embarked'] = df['Embarked'].map({'C': 0, 'Q': 1, 'S': 2})
-        
-        # Drop unwanted columns including PassengerId
-        df.drop(['Name', 'Ticket', 'Cabin', 'PassengerId'], axis=1, inplace=True)
-        logging.info("Dropped columns: Name, Ticket, Cabin, PassengerId.")
+    with span("preprocess.transform", rows=len(train_data) + len(test_data)):
+        train_data = transform_chunk(train_data, train_data['Age'].median(), train_data['Fare'].median())
+        test_data = transform_chunk(test_data, test_data['Age'].median(), test_data['Fare'].median())
+    logging.info(f"Dropped columns: {', '.join(DROPPED_COLUMNS)}.")
     
     # Save the processed data
-    train_processed_path = os.path.join(processed_data_path, "train_processed.csv")
-    test_processed_path = os.path.join(processed_data_path, "test_processed.csv")
-    
     try:
-        train_data.to_csv(train_processed_path, index=False)
-        test_data.to_csv(test_processed_path, index=False)
+        with span("preprocess.save", rows=len(train_data) + len(test_data)):
+            write_table(train_data, train_processed_path)
+            write_table(test_data, test_processed_path)
         logging.info("Successfully saved processed train and test data.")
     except Exception as e:
         logging.error(f"Error saving processed data: {e}")
@@ -62,4 +144,8 @@ def preprocess_data():
     logging.info("Data preprocessing completed successfully.")
 
 if __name__ == "__main__":
-    preprocess_data()
+    parser = argparse.ArgumentParser(description="Preprocess the raw Titanic data")
+    parser.add_argument("--format", choices=DATA_FORMATS, default='csv', help="Format of the processed data files")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Stream the raw files in chunks of this many rows instead of loading them whole")
+    args = parser.parse_args()
+    preprocess_data(args.format, args.chunk_size)
@@ -1,10 +1,11 @@
 # src/data/split.py
 
-import pandas as pd
 from sklearn.model_selection import train_test_split
 import logging
+from src.data.columnar import processed_path, read_table
+from src.utils.metrics import path_bytes, span
 
-def split_data():
+def split_data(data_format: str = 'csv'):
     # Configure logging for splitting
     logging.basicConfig(
         filename='splitting.log',  # Log to a file named splitting.log
@@ -15,11 +16,12 @@ def split_data():
     
     logging.info("Starting data splitting...")
     
-    processed_data_path = "data/processed"
-    train_processed_path = f"{processed_data_path}/train_processed.csv"
+    train_processed_path = processed_path("train_processed", data_format)
     
     try:
-        train_data = pd.read_csv(train_processed_path)
+        with span("split.load", bytes_read=path_bytes(train_processed_path)) as timer:
+            train_data = read_table(train_processed_path)
+            timer.rows = len(train_data)
         logging.info("Successfully loaded processed train data.")
     except Exception as e:
         logging.error(f"Error loading processed train data: {e}")
@@ -30,9 +32,10 @@ def split_data():
     y = train_data['Survived']
     
     # Split the data
-    X_train, X_val, y_train, y_val = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
+    with span("split.split", rows=len(X)):
+        X_train, X_val, y_train, y_val = train_test_split(
+            X, y, test_size=0.2, random_state=42, stratify=y
+        )
     
     logging.info("Data successfully split into training and validation sets.")
     
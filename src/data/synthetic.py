@@ -0,0 +1,139 @@
+# src/data/synthetic.py
+
+import argparse
+import logging
+import os
+import numpy as np
+import pandas as pd
+
+RAW_COLUMNS = ['PassengerId', 'Survived', 'Pclass', 'Name', 'Sex', 'Age', 'SibSp', 'Parch', 'Ticket', 'Fare', 'Cabin', 'Embarked']
+# Discrete columns sampled together from their observed joint distribution (missing Embarked included)
+JOINT_COLUMNS = ['Survived', 'Pclass', 'Sex', 'SibSp', 'Parch', 'Embarked']
+
+def _bandwidth(values: np.ndarray) -> float:
+    """Silverman's rule-of-thumb kernel bandwidth."""
+    if values.size < 2:
+        return 0.0
+    return 1.06 * values.std() * values.size ** -0.2
+
+class TitanicGenerator:
+    """
+    Samples raw rows with the schema of data/raw/train.csv.
+
+    The discrete columns follow the empirical joint distribution of the
+    source file. Age is a kernel-smoothed resample within its (Pclass, Sex)
+    group and Fare a log-space kernel resample within its Pclass; Age, Fare
+    and Cabin are left missing at their observed per-group rates.
+    """
+
+    def __init__(self, source: pd.DataFrame):
+        joint = source[JOINT_COLUMNS].astype(object).where(source[JOINT_COLUMNS].notna(), None)
+        frequencies = joint.value_counts(dropna=False, normalize=True)
+        self.combinations = pd.DataFrame(list(frequencies.index), columns=JOINT_COLUMNS)
+        self.probabilities = frequencies.to_numpy()
+
+        self.age = self._groups(source, ['Pclass', 'Sex'], 'Age')
+        self.fare = self._groups(source, ['Pclass'], 'Fare', transform=np.log1p)
+        self.cabin = {}
+        for pclass, group in source.groupby('Pclass'):
+            cabins = group['Cabin'].dropna().to_numpy()
+            self.cabin[pclass] = (group['Cabin'].isna().mean(), cabins)
+
+    @staticmethod
+    def _groups(source: pd.DataFrame, by: list, column: str, transform=None) -> dict:
+        """Per group: (missing rate, observed values, kernel bandwidth), plus an overall fallback under None."""
+        def summarize(values: pd.Series):
+            observed = values.dropna().to_numpy(dtype=np.float64)
+            if transform is not None:
+                observed = transform(observed)
+            return values.isna().mean(), observed, _bandwidth(observed)
+
+        groups = {None: summarize(source[column])}
+        for key, group in source.groupby(by):
+            key = key if len(by) > 1 else key[0] if isinstance(key, tuple) else key
+            groups[key] = summarize(group[column])
+        return groups
+
+    @staticmethod
+    def _sample(rng, n: int, missing_rate: float, observed: np.ndarray, bandwidth: float) -> np.ndarray:
+        values = rng.choice(observed, n) + rng.normal(0.0, bandwidth, n) if observed.size else np.full(n, np.nan)
+        values[rng.random(n) < missing_rate] = np.nan
+        return values
+
+    def sample(self, n: int, rng: np.random.Generator, first_id: int = 1) -> pd.DataFrame:
+        """n raw rows with PassengerIds starting at first_id."""
+        rows = self.combinations.iloc[rng.choice(len(self.combinations), n, p=self.probabilities)].reset_index(drop=True)
+        age = np.empty(n)
+        fare = np.empty(n)
+        cabin = np.full(n, None, dtype=object)
+
+        for key, index in rows.groupby(['Pclass', 'Sex']).indices.items():
+            missing_rate, observed, bandwidth = self.age.get(key) or self.age[None]
+            if observed.size == 0:
+                _, observed, bandwidth = self.age[None]
+            age[index] = self._sample(rng, len(index), missing_rate, observed, bandwidth)
+        for pclass, index in rows.groupby('Pclass').indices.items():
+            missing_rate, observed, bandwidth = self.fare.get(pclass) or self.fare[None]
+            fare[index] = np.expm1(self._sample(rng, len(index), missing_rate, observed, bandwidth))
+            cabin_missing, cabins = self.cabin.get(pclass, (1.0, np.array([])))
+            if cabins.size:
+                has_cabin = rng.random(len(index)) >= cabin_missing
+                cabin[index[has_cabin]] = rng.choice(cabins, int(has_cabin.sum()))
+
+        ids = np.arange(first_id, first_id + n)
+        return pd.DataFrame({
+            'PassengerId': ids,
+            'Survived': rows['Survived'].astype(int),
+            'Pclass': rows['Pclass'].astype(int),
+            'Name': [f"Passenger {i}" for i in ids],
+            'Sex': rows['Sex'],
+            'Age': np.clip(age, 0.17, 80.0).round(1),
+            'SibSp': rows['SibSp'].astype(int),
+            'Parch': rows['Parch'].astype(int),
+            'Ticket': [f"SYN{i}" for i in ids],
+            'Fare': np.clip(fare, 0.0, None).round(4),
+            'Cabin': cabin,
+            'Embarked': rows['Embarked'],
+        })[RAW_COLUMNS]
+
+def generate_raw_data(n_rows: int, output_dir: str = os.path.join("data", "synthetic", "raw"),
+                      source_path: str = os.path.join("data", "raw", "train.csv"), test_rows: int = None,
+                      seed: int = 42, chunk_size: int = 500000):
+    """
+    Write synthetic train.csv (n_rows) and test.csv (test_rows, no Survived) to output_dir.
+
+    Rows are generated and appended chunk by chunk, so memory stays bounded
+    for any size.
+    """
+    if not os.path.exists(source_path):
+        logging.error(f"Source data not found at {source_path}.")
+        raise FileNotFoundError(f"Source data not found at {source_path}.")
+    generator = TitanicGenerator(pd.read_csv(source_path))
+    rng = np.random.default_rng(seed)
+    os.makedirs(output_dir, exist_ok=True)
+    test_rows = n_rows // 2 if test_rows is None else test_rows
+
+    next_id = 1
+    for name, rows, columns in [
+        ("train.csv", n_rows, RAW_COLUMNS),
+        ("test.csv", test_rows, [column for column in RAW_COLUMNS if column != 'Survived']),
+    ]:
+        path = os.path.join(output_dir, name)
+        with open(path, 'w', newline='') as f:
+            for start in range(0, rows, chunk_size):
+                chunk = generator.sample(min(chunk_size, rows - start), rng, next_id)
+                chunk[columns].to_csv(f, header=(start == 0), index=False)
+                next_id += len(chunk)
+            if rows == 0:
+                f.write(",".join(columns) + "\n")
+        print(f"Wrote {rows} synthetic rows to {path}.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic raw data with the Titanic schema")
+    parser.add_argument("--rows", type=int, required=True, help="Number of train.csv rows")
+    parser.add_argument("--test-rows", type=int, default=None, help="Number of test.csv rows (default: half of --rows)")
+    parser.add_argument("--output-dir", type=str, default=os.path.join("data", "synthetic", "raw"))
+    parser.add_argument("--source", type=str, default=os.path.join("data", "raw", "train.csv"), help="Real data the distributions are fitted on")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    generate_raw_data(args.rows, args.output_dir, args.source, args.test_rows, args.seed)
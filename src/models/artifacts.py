@@ -0,0 +1,80 @@
+# src/models/artifacts.py
+
+import hashlib
+import json
+import logging
+import os
+import numpy as np
+
+MANIFEST_NAME = "manifest.json"
+# Where training saves the model, its feature order and its provenance before publishing them to the registry
+MODEL_PATH = os.path.join("models", "random_forest_titanic_model.joblib")
+FEATURE_ORDER_PATH = os.path.join("models", "feature_order.txt")
+MODEL_META_PATH = os.path.join("models", "random_forest_titanic_model.meta.json")
+
+def file_sha256(path: str) -> str:
+    """Return the hex SHA-256 digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def round_down_float32(threshold: np.ndarray) -> np.ndarray:
+    """
+    The largest float32 not above each float64 threshold.
+
+    sklearn casts inputs to float32 and tests x <= threshold; no float32 lies
+    strictly between the rounded-down value and the original, so the test
+    gives the same answer with the float32 threshold. Every engine that
+    stores float32 thresholds must round them with this one function.
+    """
+    rounded = np.asarray(threshold, dtype=np.float64).astype(np.float32)
+    too_high = rounded.astype(np.float64) > threshold
+    rounded[too_high] = np.nextafter(rounded[too_high], np.float32(-np.inf))
+    return rounded
+
+def save_array_bundle(path: str, arrays: dict, meta: dict = None):
+    """
+    Save NumPy arrays as an uncompressed .npy bundle directory.
+
+    Each array is written to its own .npy file (the .npy header pads the data
+    to a 64-byte boundary), plus a manifest.json holding the array names and
+    any JSON-serialisable metadata. Files are written under a temporary name
+    and renamed into place, so processes that still have the previous version
+    mapped keep reading their old, unchanged inode.
+    """
+    os.makedirs(path, exist_ok=True)
+    for name, array in arrays.items():
+        array_path = os.path.join(path, f"{name}.npy")
+        with open(array_path + ".tmp", 'wb') as f:
+            np.save(f, np.ascontiguousarray(array), allow_pickle=False)
+        os.replace(array_path + ".tmp", array_path)
+
+    manifest_path = os.path.join(path, MANIFEST_NAME)
+    with open(manifest_path + ".tmp", 'w') as f:
+        json.dump({"arrays": sorted(arrays), "meta": meta or {}}, f, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+def load_array_bundle(path: str, mmap_mode: str = 'r'):
+    """
+    Load a bundle written by save_array_bundle.
+
+    With mmap_mode='r' (the default) every array is a read-only memory map, so
+    any number of worker processes share one physical copy through the page
+    cache. Pass mmap_mode=None to read private in-memory copies instead.
+
+    Returns:
+        tuple: (dict of arrays, metadata dict)
+    """
+    manifest_path = os.path.join(path, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        logging.error(f"Array bundle not found at {path}.")
+        raise FileNotFoundError(f"Array bundle not found at {path}.")
+    with open(manifest_path, 'r') as f:
+        manifest = json.load(f)
+    arrays = {
+        name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode, allow_pickle=False)
+        for name in manifest["arrays"]
+    }
+    return arrays, manifest["meta"]
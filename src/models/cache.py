@@ -0,0 +1,185 @@
+# src/models/cache.py
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+class PredictionCache:
+    """
+    Memoizes predictions keyed on the encoded, feature_order-aligned feature tuple.
+
+    Entries live in a bounded in-memory LRU and, when db_path is given, in a
+    SQLite file that survives across processes, capped at max_disk_entries
+    rows with least-recently-used eviction. Every entry belongs to the hash
+    of the model artifact that produced it; when the hash changes, entries for
+    other models are dropped. Callers pass the hash of the model they scored
+    with, so a batch still scored by the previous model after a reload is
+    neither served from nor stored under the new hash.
+    """
+
+    def __init__(self, max_entries: int = 10000, db_path: str = None, max_disk_entries: int = 1000000):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.max_disk_entries = max_disk_entries
+        self.model_hash = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._disk_rows = 0
+        if db_path:
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            columns = [row[1] for row in self._db.execute("PRAGMA table_info(predictions)")]
+            if columns and "last_used" not in columns:
+                # Written before the disk tier was capped; it is only a cache, so start over
+                self._db.execute("DROP TABLE predictions")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                "model_hash TEXT NOT NULL, features TEXT NOT NULL, "
+                "prediction INTEGER NOT NULL, probability REAL NOT NULL, last_used REAL NOT NULL, "
+                "PRIMARY KEY (model_hash, features))"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS predictions_last_used ON predictions (last_used)")
+            self._db.commit()
+            self._disk_rows = self._db.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+    @staticmethod
+    def make_key(values) -> str:
+        """Canonical key for one row of feature values in model feature order."""
+        return ",".join(repr(float(value)) for value in values)
+
+    @staticmethod
+    def make_keys(frame) -> list:
+        """make_key of every row of a DataFrame, built column by column instead of row by row."""
+        columns = [map(repr, frame[column].to_numpy(dtype=np.float64).tolist()) for column in frame.columns]
+        return list(map(",".join, zip(*columns)))
+
+    def validate(self, model_hash: str):
+        """Drop entries that were produced by a different model artifact."""
+        if model_hash == self.model_hash:
+            return
+        with self._lock:
+            if self.model_hash is not None:
+                logging.info("Model artifact changed; clearing prediction cache.")
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM predictions WHERE model_hash != ?", (model_hash,))
+                self._db.commit()
+                self._disk_rows = self._db.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+            self.model_hash = model_hash
+
+    def get_many(self, keys: list, model_hash: str) -> list:
+        """Look up keys for the model with model_hash; returns a (prediction, probability) tuple or None for each."""
+        results = [None] * len(keys)
+        missing = []
+        with self._lock:
+            if model_hash != self.model_hash:
+                self.misses += len(keys)
+                return results
+            for i, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    results[i] = entry
+                    self.hits += 1
+                else:
+                    missing.append(i)
+
+            if missing and self._db is not None:
+                found = {}
+                unique_keys = list({keys[i] for i in missing})
+                for start in range(0, len(unique_keys), 500):
+                    batch = unique_keys[start:start + 500]
+                    rows = self._db.execute(
+                        f"SELECT features, prediction, probability FROM predictions "
+                        f"WHERE model_hash = ? AND features IN ({','.join('?' * len(batch))})",
+                        [self.model_hash, *batch],
+                    )
+                    found.update((features, (prediction, probability)) for features, prediction, probability in rows)
+                if found:
+                    self._touch(list(found))
+                still_missing = []
+                for i in missing:
+                    entry = found.get(keys[i])
+                    if entry is not None:
+                        results[i] = entry
+                        self.disk_hits += 1
+                        self._remember(keys[i], entry)
+                    else:
+                        still_missing.append(i)
+                missing = still_missing
+
+            self.misses += len(missing)
+        return results
+
+    def put_many(self, keys: list, entries: list, model_hash: str):
+        """Store (prediction, probability) entries for keys, unless model_hash is no longer the cache's model."""
+        with self._lock:
+            if model_hash != self.model_hash:
+                return
+            for key, entry in zip(keys, entries):
+                self._remember(key, entry)
+            if self._db is not None:
+                now = time.time()
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?)",
+                    [(self.model_hash, key, int(prediction), float(probability), now)
+                     for key, (prediction, probability) in zip(keys, entries)],
+                )
+                # Replaced rows are counted too, so the exact count is only taken once the cap may be exceeded
+                self._disk_rows += len(keys)
+                if self._disk_rows > self.max_disk_entries:
+                    self._evict_disk()
+                self._db.commit()
+
+    def _touch(self, keys: list):
+        """Mark disk entries as used now, so the LRU eviction keeps them."""
+        now = time.time()
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            self._db.execute(
+                f"UPDATE predictions SET last_used = ? WHERE model_hash = ? AND features IN ({','.join('?' * len(batch))})",
+                [now, self.model_hash, *batch],
+            )
+        self._db.commit()
+
+    def _evict_disk(self):
+        # Drop the least recently used rows down to max_disk_entries
+        self._disk_rows = self._db.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+        excess = self._disk_rows - self.max_disk_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM predictions WHERE rowid IN (SELECT rowid FROM predictions ORDER BY last_used LIMIT ?)", (excess,)
+            )
+            self._disk_rows -= excess
+            self.disk_evictions += excess
+
+    def _remember(self, key: str, entry: tuple):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "disk_entries": self._disk_rows if self._db is not None else None,
+            "disk_evictions": self.disk_evictions,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else None,
+        }
@@ -0,0 +1,70 @@
+# src/models/compiled.py
+#
+# Scoring from the precompiled NumPy bundles only. Nothing here imports
+# pandas, joblib or sklearn, so a one-off CLI prediction skips their import
+# cost entirely.
+
+import json
+import logging
+import os
+import numpy as np
+from src.models.artifacts import MANIFEST_NAME, file_sha256
+from src.models.flat_forest import FlatForest
+from src.models.lookup import LookupModel
+from src.models.quantized import QuantizedForest
+from src.models.registry import (FEATURE_ORDER_FILE, FLAT_BUNDLE, LOOKUP_BUNDLE, META_FILE, MODEL_FILE, QUANTIZED_BUNDLE,
+                                 REGISTRY_PATH, current_artifacts)
+
+def load_compiled_models(registry_path: str = REGISTRY_PATH):
+    """
+    Yield (model, feature_order_path) for the lookup table, then the quantized and flat forests, of the current model.
+
+    The current model is the registry's CURRENT version, whose bundles are
+    stored in its version directory (models/ when there is no CURRENT). A
+    bundle is only yielded if the sha256 of the joblib model it was compiled
+    from matches that model; each is loaded only when the previous one was
+    not enough.
+    """
+    paths = current_artifacts(registry_path)
+    if paths["version"] is not None:
+        # Published versions are immutable and record their model's hash, so the joblib file is not read
+        with open(paths[META_FILE], 'r') as f:
+            source_hash = json.load(f)["model_sha256"]
+    else:
+        source_hash = file_sha256(paths[MODEL_FILE]) if os.path.exists(paths[MODEL_FILE]) else None
+    for name, loader in [(LOOKUP_BUNDLE, LookupModel), (QUANTIZED_BUNDLE, QuantizedForest), (FLAT_BUNDLE, FlatForest)]:
+        bundle_path = paths[name]
+        if not os.path.exists(os.path.join(bundle_path, MANIFEST_NAME)):
+            continue
+        model = loader.load(bundle_path)
+        if model.source_hash == source_hash:
+            yield model, paths[FEATURE_ORDER_FILE]
+        else:
+            logging.warning(f"{bundle_path} was compiled from a different model; ignoring it.")
+
+def predict_compiled(model, input_features: dict, feature_order_path: str):
+    """Predict one parsed feature dict with a compiled model; returns (prediction, survival probability)."""
+    with open(feature_order_path, 'r') as f:
+        feature_order = [line.strip() for line in f if line.strip()]
+    if feature_order != model.feature_names:
+        raise ValueError(f"Compiled model expects features {model.feature_names}, feature order file lists {feature_order}.")
+    row = np.array([[input_features[feature] for feature in feature_order]], dtype=np.float64)
+    probabilities = model.predict_proba(row)
+    survived = list(model.classes_).index(1)
+    return model.predict(row)[0], float(probabilities[0, survived])
+
+def predict_fast(input_features: dict, registry_path: str = REGISTRY_PATH):
+    """
+    Predict one parsed feature dict with the first compiled model that can score it.
+
+    The lookup table only covers the discrete values seen in training (e.g.
+    not the Pclass of 0 filled in for a missing class), so a ValueError from
+    one bundle moves on to the next. Returns (prediction, survival
+    probability), or None if no up-to-date bundle could score the input.
+    """
+    for model, feature_order_path in load_compiled_models(registry_path):
+        try:
+            return predict_compiled(model, input_features, feature_order_path)
+        except ValueError as e:
+            logging.warning(f"{type(model).__name__} cannot score this input ({e}); trying the next compiled model.")
+    return None
@@ -0,0 +1,219 @@
+# src/models/compress.py
+
+import argparse
+import copy
+import io
+import os
+import time
+import joblib
+import numpy as np
+from sklearn.model_selection import train_test_split
+from src.data.columnar import processed_path, read_table
+from src.models.evaluate_error_rate import compute_metrics
+from src.models.registry import FEATURE_ORDER_FILE, MODEL_FILE, current_artifacts
+
+COMPRESSED_MODEL_PATH = os.path.join("models", "random_forest_titanic_model.compressed.joblib")
+DEPTH_CAPS = [None, 16, 12, 10, 8, 6]
+# Layout of sklearn's Tree pickle state that cap_tree_depth rewrites
+TREE_STATE_KEYS = {'max_depth', 'node_count', 'nodes', 'values'}
+NODE_FIELDS = {'left_child', 'right_child', 'feature', 'threshold'}
+
+def cap_tree_depth(estimator, max_depth: int):
+    """
+    Return a copy of a fitted decision tree with every node at max_depth turned into a leaf.
+
+    sklearn stores the training class distribution at internal nodes too, so
+    the result predicts exactly what the original tree truncated at depth
+    max_depth does. (That is not the tree a fit with max_depth would give:
+    a fresh fit draws its candidate features in a different order.) Nodes
+    below the cap are dropped and the rest renumbered in preorder.
+
+    sklearn's Tree arrays are read-only, so the tree is rebuilt through its
+    pickle state; a TypeError is raised if that state does not have the
+    layout this was written for.
+    """
+    tree_class, tree_args, state = estimator.tree_.__reduce__()
+    if set(state) != TREE_STATE_KEYS or not NODE_FIELDS <= set(state['nodes'].dtype.names or ()):
+        raise TypeError(f"Unsupported scikit-learn tree state (keys {sorted(state)}, node fields "
+                        f"{state['nodes'].dtype.names}); cap_tree_depth expects keys {sorted(TREE_STATE_KEYS)} "
+                        f"and node fields {sorted(NODE_FIELDS)}.")
+    nodes, values = state['nodes'], state['values']
+    if state['max_depth'] <= max_depth:
+        return copy.deepcopy(estimator)
+
+    keep, depth_of = [], {}
+    stack = [(0, 0)]
+    while stack:
+        node, depth = stack.pop()
+        depth_of[node] = depth
+        keep.append(node)
+        if nodes[node]['left_child'] != -1 and depth < max_depth:
+            stack.append((nodes[node]['right_child'], depth + 1))
+            stack.append((nodes[node]['left_child'], depth + 1))
+    new_id = {old: new for new, old in enumerate(keep)}
+
+    new_nodes = nodes[keep].copy()
+    for new, old in enumerate(keep):
+        if nodes[old]['left_child'] == -1 or depth_of[old] >= max_depth:
+            new_nodes[new]['left_child'] = new_nodes[new]['right_child'] = -1
+            new_nodes[new]['feature'] = -2
+            new_nodes[new]['threshold'] = -2.0
+        else:
+            new_nodes[new]['left_child'] = new_id[nodes[old]['left_child']]
+            new_nodes[new]['right_child'] = new_id[nodes[old]['right_child']]
+
+    tree = tree_class(*tree_args)
+    tree.__setstate__({
+        'max_depth': min(state['max_depth'], max_depth),
+        'node_count': len(keep),
+        'nodes': new_nodes,
+        'values': np.ascontiguousarray(values[keep]),
+    })
+    capped = copy.copy(estimator)
+    capped.tree_ = tree
+    return capped
+
+def select_trees(tree_proba: np.ndarray, y: np.ndarray, classes: np.ndarray, node_counts: np.ndarray,
+                 target: float, metric: str, min_trees: int = 1) -> list:
+    """
+    Greedy forward selection of trees until the sub-forest reaches target on metric.
+
+    tree_proba has shape (n_trees, n_samples, n_classes). Each step adds the
+    tree that gives the best metric for the averaged sub-forest, preferring
+    smaller trees on ties. Returns the selected tree indices in order.
+    """
+    n_trees = tree_proba.shape[0]
+    selected = []
+    total = np.zeros(tree_proba.shape[1:])
+    remaining = list(range(n_trees))
+    while remaining:
+        candidates = total[np.newaxis] + tree_proba[remaining]
+        predictions = classes.take(candidates.argmax(axis=2))
+        scores = _candidate_scores(y, predictions, metric)
+        order = np.lexsort((node_counts[remaining], -scores))
+        best = remaining[order[0]]
+        selected.append(best)
+        total += tree_proba[best]
+        remaining.remove(best)
+        if len(selected) >= min_trees and scores[order[0]] >= target:
+            break
+    return selected
+
+def _candidate_scores(y: np.ndarray, predictions: np.ndarray, metric: str) -> np.ndarray:
+    """Accuracy or F1 (positive class 1) of every row of predictions at once; matches compute_metrics."""
+    if metric == 'accuracy':
+        return (predictions == y).mean(axis=1)
+    true_positives = ((predictions == 1) & (y == 1)).sum(axis=1)
+    predicted = (predictions == 1).sum(axis=1)
+    denominator = predicted + (y == 1).sum()
+    return np.where(denominator > 0, 2.0 * true_positives / np.maximum(denominator, 1), 0.0)
+
+def _build(model, estimators: list):
+    compressed = copy.deepcopy(model)
+    compressed.estimators_ = estimators
+    compressed.n_estimators = len(estimators)
+    return compressed
+
+def _measure(model, X) -> dict:
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    row = X.iloc[:1]
+    single = min(_elapsed(lambda: model.predict_proba(row)) for _ in range(20))
+    batch = min(_elapsed(lambda: model.predict_proba(X)) for _ in range(5))
+    return {
+        "trees": len(model.estimators_),
+        "nodes": int(sum(estimator.tree_.node_count for estimator in model.estimators_)),
+        "size_kb": buffer.tell() / 1024.0,
+        "single_ms": single * 1000.0,
+        "batch_us_per_row": batch * 1e6 / len(X),
+    }
+
+def _elapsed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+def compress_model(metric: str = 'accuracy', tolerance: float = 0.005, depth_caps=DEPTH_CAPS, min_trees: int = 10,
+                   model_path: str = None, validation_path: str = None,
+                   output_path: str = COMPRESSED_MODEL_PATH, holdout: float = 0.5, seed: int = 42) -> dict:
+    """
+    Find the smallest forest (fewest nodes) within tolerance of the full forest's metric on the validation set.
+
+    The validation set is split (stratified) into a selection part and a
+    holdout fraction. For every depth cap, trees are capped and then
+    selected greedily on the selection part; the configuration with the
+    fewest total nodes that keeps metric >= full - tolerance there is saved
+    to output_path. The printed report scores every configuration on the
+    holdout rows, which the selection never saw, so it is not inflated by
+    the greedy search. model_path defaults to the registry's CURRENT model.
+    """
+    paths = current_artifacts()
+    model_path = model_path or paths[MODEL_FILE]
+    validation_path = validation_path or processed_path("validation_set")
+    for path in [model_path, validation_path]:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Required file not found at {path}.")
+
+    model = joblib.load(model_path)
+    model.verbose = 0
+    with open(paths[FEATURE_ORDER_FILE], 'r') as f:
+        feature_order = [line.strip() for line in f]
+    validation = read_table(validation_path)
+    X_select, X_holdout, y_select, y_holdout = train_test_split(
+        validation[feature_order], validation['Survived'].to_numpy(), test_size=holdout, random_state=seed,
+        stratify=validation['Survived'],
+    )
+
+    full_selection = compute_metrics(y_select, model.predict(X_select))[metric]
+    target = full_selection - tolerance
+    report = [{"config": "full", "selection": full_selection, **_measure(model, X_holdout),
+               **compute_metrics(y_holdout, model.predict(X_holdout))}]
+
+    best = None
+    X_array = X_select.to_numpy(dtype=np.float32)
+    for depth in depth_caps:
+        estimators = [cap_tree_depth(e, depth) if depth else e for e in model.estimators_]
+        tree_proba = np.stack([e.predict_proba(X_array) for e in estimators])
+        node_counts = np.array([e.tree_.node_count for e in estimators])
+        selected = select_trees(tree_proba, y_select, model.classes_, node_counts, target, metric, min_trees)
+
+        candidate = _build(model, [estimators[i] for i in selected])
+        selection = compute_metrics(y_select, candidate.predict(X_select))[metric]
+        row = {"config": f"depth<={depth or '-'}", "selection": selection, **_measure(candidate, X_holdout),
+               **compute_metrics(y_holdout, candidate.predict(X_holdout))}
+        row["within_tolerance"] = selection >= target
+        report.append(row)
+        if row["within_tolerance"] and (best is None or row["nodes"] < best[1]["nodes"]):
+            best = (candidate, row)
+
+    print(f"Target: selection {metric} >= {target:.4f} (full forest {full_selection:.4f} - tolerance {tolerance}) "
+          f"on {len(y_select)} rows; accuracy and f1 below are on {len(y_holdout)} held-out rows.")
+    print(f"{'config':<11} {'trees':>5} {'nodes':>7} {'size KB':>9} {'1-row ms':>9} {'us/row':>8} "
+          f"{'selection':>9} {'accuracy':>9} {'f1':>7}")
+    for row in report:
+        chosen = "  <- saved" if best is not None and row is best[1] else ""
+        print(f"{row['config']:<11} {row['trees']:>5} {row['nodes']:>7} {row['size_kb']:>9.1f} {row['single_ms']:>9.2f} "
+              f"{row['batch_us_per_row']:>8.2f} {row['selection']:>9.4f} {row['accuracy']:>9.4f} {row['f1']:>7.4f}{chosen}")
+
+    if best is None:
+        print("No configuration stayed within tolerance; nothing saved.")
+        return None
+    best[0].verbose = model.verbose
+    joblib.dump(best[0], output_path)
+    print(f"Compressed model saved to {output_path}.")
+    return best[1]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shrink the forest by tree selection and depth capping within a validation tolerance")
+    parser.add_argument("--metric", choices=['accuracy', 'f1'], default='accuracy')
+    parser.add_argument("--tolerance", type=float, default=0.005, help="Allowed drop in the metric versus the full forest")
+    parser.add_argument("--depth-caps", type=int, nargs='*', default=[cap for cap in DEPTH_CAPS if cap], help="Depth caps to try in addition to uncapped trees")
+    parser.add_argument("--min-trees", type=int, default=10, help="Never select fewer trees than this (guards against overfitting the validation set)")
+    parser.add_argument("--model", type=str, default=None, help="Defaults to the registry's CURRENT model")
+    parser.add_argument("--validation-data", type=str, default=None, help="Defaults to data/processed/validation_set.csv")
+    parser.add_argument("--output", type=str, default=COMPRESSED_MODEL_PATH)
+    parser.add_argument("--holdout", type=float, default=0.5, help="Fraction of the validation set kept out of tree selection and used for the report")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    compress_model(args.metric, args.tolerance, [None] + args.depth_caps, args.min_trees,
+                   args.model, args.validation_data, args.output, args.holdout, args.seed)
@@ -0,0 +1,93 @@
+# src/models/contributions.py
+
+import logging
+import numpy as np
+from src.models.flat_forest import FlatForest
+
+CONTRIBUTION_METHODS = ['saabas', 'treeshap']
+
+class ContributionEngine:
+    """
+    Path-based (Saabas) per-feature contributions for a whole batch of forest predictions.
+
+    Walking from a tree's root to a leaf, every split moves the predicted
+    probability from the parent's value to the child's; that change is
+    credited to the split feature. Summed along the path this gives, per
+    node, a vector of feature contributions, which is precomputed for every
+    node so a batch only needs its leaf ids (sklearn's apply) and one
+    gather per tree. For every row:
+
+        bias + contributions.sum(axis=1) == predict_proba(X)[:, class]
+
+    where bias is the mean root value over trees (the training prior).
+    """
+
+    def __init__(self, model, positive_class=1):
+        self.model = model
+        self.forest = FlatForest.from_model(model)
+        self.feature_names = self.forest.feature_names
+        self.class_index = list(self.forest.classes_).index(positive_class)
+
+        forest = self.forest
+        value = forest.value[:, self.class_index]
+        n_nodes = forest.node_count
+        is_split = forest.is_split
+        parent = np.full(n_nodes, -1, dtype=np.int64)
+        parent[forest.left[is_split]] = np.flatnonzero(is_split)
+        parent[forest.right[is_split]] = np.flatnonzero(is_split)
+
+        # Deltas are accumulated one depth level at a time, so a node's parent is always done first
+        self.node_contributions = np.zeros((n_nodes, len(self.feature_names)), dtype=np.float64)
+        level = forest.roots.astype(np.int64)
+        while level.size:
+            splits = level[is_split[level]]
+            children = np.concatenate([forest.left[splits], forest.right[splits]]).astype(np.int64)
+            parents = parent[children]
+            self.node_contributions[children] = self.node_contributions[parents]
+            self.node_contributions[children, forest.feature[parents]] += value[children] - value[parents]
+            level = children
+        self.bias = float(value[forest.roots].mean())
+
+    def contributions(self, X, chunk_size: int = 16384, block_size: int = 1024):
+        """
+        Return (bias, contributions) for a batch; contributions has shape (n_samples, n_features).
+
+        X is a DataFrame or an array in feature_names order. Leaf ids come
+        from one apply call per chunk_size rows; every block_size rows of
+        them are then one gather of (trees, rows, features) node vectors
+        summed over the trees axis, a temporary small enough to stay in cache.
+        """
+        # Keep DataFrames as they are, so sklearn sees the feature names it was fitted with
+        X = X[self.feature_names] if hasattr(X, "columns") else self.forest._as_array(X)
+        contributions = np.empty((X.shape[0], len(self.feature_names)), dtype=np.float64)
+        roots = self.forest.roots.astype(np.int64)
+        for start in range(0, X.shape[0], chunk_size):
+            # Per-tree leaf ids from the compiled traversal, shifted to FlatForest's global node ids
+            rows = X.iloc[start:start + chunk_size] if hasattr(X, "iloc") else X[start:start + chunk_size]
+            # Tree-major, so the reduction adds whole contiguous (rows, features) blocks
+            leaves = (self.model.apply(rows) + roots).T
+            for offset in range(0, leaves.shape[1], block_size):
+                block = leaves[:, offset:offset + block_size]
+                gathered = np.take(self.node_contributions, block, axis=0)
+                # A chunk's last block may be short; it must not spill into the next chunk's rows
+                contributions[start + offset:start + offset + block.shape[1]] = gathered.sum(axis=0) / self.forest.n_trees
+        return np.full(X.shape[0], self.bias), contributions
+
+def treeshap_contributions(model, X, positive_class=1):
+    """
+    TreeSHAP (path-dependent) contributions from the optional shap package; same return shape as ContributionEngine.
+
+    Exact Shapley values, but far slower than the Saabas engine on large batches.
+    """
+    try:
+        import shap
+    except ImportError:
+        logging.error("TreeSHAP contributions need the shap package (pip install shap).")
+        raise
+    class_index = list(model.classes_).index(positive_class)
+    explainer = shap.TreeExplainer(model)
+    values = explainer.shap_values(X, check_additivity=False)
+    # Older shap releases return one array per class, newer ones a (samples, features, classes) array
+    values = values[class_index] if isinstance(values, list) else values[..., class_index]
+    bias = np.atleast_1d(explainer.expected_value)[class_index]
+    return np.full(len(values), float(bias)), np.asarray(values, dtype=np.float64)
@@ -0,0 +1,194 @@
+# src/models/cross_validate.py
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import StratifiedKFold
+from src.data.columnar import DATA_FORMATS, processed_path, read_table
+from src.models.artifacts import load_array_bundle, save_array_bundle
+from src.models.evaluate_error_rate import compute_metrics, confusion_counts
+from src.models.train import DEFAULT_MODEL_PARAMS
+from src.utils.metrics import path_bytes, span
+
+RESULTS_PATH = os.path.join("models", "cv_results.csv")
+METRICS = ['accuracy', 'precision', 'recall', 'f1']
+
+# Memory-mapped features and labels of the current worker process, set once by _init_worker
+_data = None
+
+def setup_logging():
+    """Set up logging to file and console."""
+    logger = logging.getLogger()
+    logger.setLevel(logging.INFO)
+
+    # Remove any existing handlers to prevent duplicate logs
+    if logger.hasHandlers():
+        logger.handlers.clear()
+
+    formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+
+    file_handler = logging.FileHandler('cross_validation.log')
+    file_handler.setLevel(logging.INFO)
+    file_handler.setFormatter(formatter)
+    logger.addHandler(file_handler)
+
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setLevel(logging.INFO)
+    console_handler.setFormatter(formatter)
+    logger.addHandler(console_handler)
+
+def _init_worker(bundle_path: str):
+    global _data
+    # Every worker maps the same pages; nothing is pickled or copied up front
+    arrays, _ = load_array_bundle(bundle_path, mmap_mode='r')
+    _data = (arrays["X"], arrays["y"])
+
+def fold_indices(y: np.ndarray, n_splits: int, repeat: int, fold: int, seed: int):
+    """Train and test row indices of one fold; repeat r shuffles with seed + r, so any process can rebuild it."""
+    splitter = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=seed + repeat)
+    return next(islice(splitter.split(np.zeros(len(y)), y), fold, None))
+
+def run_fold(repeat: int, fold: int, n_splits: int, seed: int, params: dict) -> dict:
+    """Fit and score one fold in the worker."""
+    X, y = _data
+    train_index, test_index = fold_indices(y, n_splits, repeat, fold, seed)
+    # Fancy indexing reads only this fold's rows out of the shared map
+    X_train, y_train = X[train_index], y[train_index]
+    X_test, y_test = X[test_index], y[test_index]
+
+    model = RandomForestClassifier(**params)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    y_pred = model.predict(X_test)
+    predict_s = time.perf_counter() - start
+
+    matrix = confusion_counts(y_test, y_pred, model.classes_)
+    return {
+        "repeat": repeat,
+        "fold": fold,
+        "train_rows": len(train_index),
+        "test_rows": len(test_index),
+        **compute_metrics(y_test, y_pred),
+        "fit_s": fit_s,
+        "predict_s": predict_s,
+        "tn": int(matrix[0, 0]), "fp": int(matrix[0, 1]), "fn": int(matrix[1, 0]), "tp": int(matrix[1, 1]),
+    }
+
+def cross_validate(n_splits: int = 5, n_repeats: int = 1, model_params: dict = None, cores_per_fold: int = 1,
+                   max_workers: int = None, data_format: str = 'csv', seed: int = 42) -> pd.DataFrame:
+    """
+    Stratified K-fold (optionally repeated) cross-validation of the forest on the processed training data.
+
+    Features and labels are written once to a memory-mapped .npy bundle in a
+    temporary directory that every worker maps read-only. Folds run on a
+    process pool of max_workers processes (default cpu_count //
+    cores_per_fold), each fitting with n_jobs=cores_per_fold. Returns one
+    row of metrics and timings per fold.
+    """
+    setup_logging()
+    logging.info(f"=== Starting {n_repeats}x{n_splits}-fold Cross-Validation ===")
+
+    train_processed_path = processed_path("train_processed", data_format)
+    if not os.path.exists(train_processed_path):
+        logging.error(f"Processed training data not found at {train_processed_path}.")
+        raise FileNotFoundError(f"Processed training data not found at {train_processed_path}.")
+    with span("cross_validate.load", bytes_read=path_bytes(train_processed_path)) as timer:
+        train_data = read_table(train_processed_path)
+        timer.rows = len(train_data)
+    if 'Survived' not in train_data.columns:
+        logging.error("'Survived' column not found in the training data.")
+        raise KeyError("'Survived' column not found in the training data.")
+
+    # sklearn fits trees on float32, so the mapped matrix is used without conversion
+    X = train_data.drop('Survived', axis=1).to_numpy(dtype=np.float32)
+    y = train_data['Survived'].to_numpy()
+    del train_data
+
+    cpu_count = os.cpu_count() or 1
+    cores_per_fold = max(1, min(cores_per_fold, cpu_count))
+    max_workers = max_workers or max(1, cpu_count // cores_per_fold)
+    params = {**DEFAULT_MODEL_PARAMS, **(model_params or {}), 'n_jobs': cores_per_fold}
+    logging.info(f"{len(X)} rows, {max_workers} worker processes x {cores_per_fold} cores per fold; parameters {json.dumps(params)}.")
+
+    bundle_path = tempfile.mkdtemp(prefix="cv-")
+    try:
+        save_array_bundle(bundle_path, {"X": X, "y": y})
+        del X
+        folds = [(repeat, fold) for repeat in range(n_repeats) for fold in range(n_splits)]
+        with span("cross_validate.folds", rows=len(y) * n_repeats):
+            with ProcessPoolExecutor(max_workers, initializer=_init_worker, initargs=(bundle_path,)) as pool:
+                results = []
+                for result in pool.map(run_fold, *zip(*folds), [n_splits] * len(folds), [seed] * len(folds), [params] * len(folds)):
+                    logging.info(f"[repeat {result['repeat']} fold {result['fold']}] accuracy={result['accuracy']:.4f} "
+                                 f"f1={result['f1']:.4f} fit={result['fit_s']:.2f}s")
+                    results.append(result)
+    finally:
+        shutil.rmtree(bundle_path, ignore_errors=True)
+
+    logging.info("=== Cross-Validation Completed ===")
+    return pd.DataFrame(results)
+
+def summarize(table: pd.DataFrame, wall_s: float = None) -> dict:
+    """Mean and standard deviation of each metric over folds, plus pooled counts and timings."""
+    summary = {metric: {"mean": float(table[metric].mean()), "std": float(table[metric].std(ddof=1)) if len(table) > 1 else 0.0}
+               for metric in METRICS}
+    tp, fp, fn = table['tp'].sum(), table['fp'].sum(), table['fn'].sum()
+    summary["pooled_accuracy"] = float((table['tp'].sum() + table['tn'].sum()) / table['test_rows'].sum())
+    summary["pooled_f1"] = float(2 * tp / (2 * tp + fp + fn)) if tp + fp + fn else 0.0
+    summary["folds"] = len(table)
+    summary["fit_s_total"] = float(table['fit_s'].sum())
+    summary["fit_s_mean"] = float(table['fit_s'].mean())
+    if wall_s:
+        summary["wall_s"] = wall_s
+        summary["parallel_speedup"] = float((table['fit_s'].sum() + table['predict_s'].sum()) / wall_s)
+    return summary
+
+def save_results(table: pd.DataFrame, summary: dict, results_path: str = RESULTS_PATH):
+    """Write the per-fold table and print the aggregated report."""
+    os.makedirs(os.path.dirname(results_path), exist_ok=True)
+    table.to_csv(results_path, index=False)
+
+    columns = ['repeat', 'fold', 'test_rows'] + METRICS + ['fit_s', 'predict_s']
+    print(table[columns].to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+    print()
+    for metric in METRICS:
+        print(f"{metric:>9}: {summary[metric]['mean']:.4f} +/- {summary[metric]['std']:.4f}")
+    print(f"Pooled over {summary['folds']} folds: accuracy {summary['pooled_accuracy']:.4f}, F1 {summary['pooled_f1']:.4f}")
+    line = f"Fit time: {summary['fit_s_mean']:.2f} s per fold, {summary['fit_s_total']:.2f} s in total"
+    if "wall_s" in summary:
+        line += f"; wall time {summary['wall_s']:.2f} s ({summary['parallel_speedup']:.1f}x parallel speedup)"
+    print(line)
+    print(f"Per-fold results saved to {results_path}.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel stratified K-fold cross-validation of the Titanic forest")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=1, help="Repeat K-fold with a different shuffle each time")
+    parser.add_argument("--params", type=str, default=None, help="JSON file of RandomForestClassifier parameters (e.g. models/best_params.json)")
+    parser.add_argument("--cores-per-fold", type=int, default=1, help="n_jobs given to each fold's forest")
+    parser.add_argument("--max-workers", type=int, default=None, help="Concurrent folds (default: cpu_count // cores-per-fold)")
+    parser.add_argument("--format", choices=DATA_FORMATS, default='csv', help="Format of the processed data files")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=str, default=RESULTS_PATH)
+    args = parser.parse_args()
+
+    model_params = None
+    if args.params:
+        with open(args.params, 'r') as f:
+            model_params = json.load(f)
+    start = time.perf_counter()
+    table = cross_validate(args.folds, args.repeats, model_params, args.cores_per_fold, args.max_workers, args.format, args.seed)
+    save_results(table, summarize(table, time.perf_counter() - start), args.output)
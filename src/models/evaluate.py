@@ -1,9 +1,16 @@
 # src/models/evaluate.py
 
-import pandas as pd
-import joblib
 import logging
 import os
+import sys
+from src.models.cache import PredictionCache
+from src.models.predictor import Predictor
+from src.utils.helpers import parse_inputs_bulk, read_input_records
+from src.utils.metrics import path_bytes, quiet, span
+
+# Process-wide predictor shared by evaluate_model and evaluate_batch
+_predictor = None
+_logging_configured = False
 
 def setup_logging():
     """Set up logging to file and console."""
@@ -29,58 +36,154 @@ def setup_logging():
     console_handler.setFormatter(formatter)
     logger.addHandler(console_handler)
 
-def evaluate_model(input_features: dict):
-    """Load the trained model and make a prediction based on input features."""
-    setup_logging()
-    logging.info("=== Starting Model Evaluation ===")
-    
-    model_path = os.path.join("models", "random_forest_titanic_model.joblib")
-    feature_order_path = os.path.join("models", "feature_order.txt")
-    
-    # Check if both model and feature order files exist
-    if not os.path.exists(model_path):
-        logging.error(f"Trained model not found at {model_path}.")
-        raise FileNotFoundError(f"Trained model not found at {model_path}.")
-    if not os.path.exists(feature_order_path):
-        logging.error(f"Feature order file not found at {feature_order_path}.")
-        raise FileNotFoundError(f"Feature order file not found at {feature_order_path}.")
+def get_predictor() -> Predictor:
+    """Return the process-wide Predictor, creating it on first use."""
+    global _predictor
+    if _predictor is None:
+        _predictor = Predictor(cache=PredictionCache())
+    return _predictor
+
+def configure_cache(max_entries: int = 10000, db_path: str = None, max_disk_entries: int = 1000000):
+    """
+    Replace the process-wide prediction cache.
+
+    With db_path, cached predictions are also kept in a SQLite file of at
+    most max_disk_entries rows so they survive across main.py invocations;
+    max_entries=0 disables caching.
+    """
+    cache = PredictionCache(max_entries, db_path, max_disk_entries) if max_entries > 0 else None
+    predictor = get_predictor()
+    predictor.cache = cache
+    if cache is not None and predictor.model_hash is not None:
+        cache.validate(predictor.model_hash)
+
+def _setup_logging_once():
+    global _logging_configured
+    if not _logging_configured:
+        setup_logging()
+        _logging_configured = True
+
+def evaluate_model(input_features: dict, explain: str = None):
+    """
+    Make a prediction based on input features using the cached model.
+
+    With explain ('saabas' or 'treeshap'), returns (prediction, bias,
+    contributions) instead, where contributions maps each feature to its
+    share of the survival probability and bias + their sum is that
+    probability.
+    """
+    _setup_logging_once()
+    verbose = not quiet()
+    if verbose:
+        logging.info("=== Starting Model Evaluation ===")
     
     try:
-        logging.info(f"Loading model from {model_path}...")
-        model = joblib.load(model_path)
-        logging.info("Model loaded successfully.")
+        with span("evaluate_model", rows=1):
+            if explain:
+                predictor = get_predictor()
+                predictions, _, bias, contributions = predictor.explain_batch([input_features], explain)
+                prediction = predictions[0]
+                contributions = dict(zip(predictor.feature_order, contributions[0].tolist()))
+            else:
+                prediction = get_predictor().predict(input_features)
+        if verbose:
+            logging.info(f"Prediction result: {prediction}")
     except Exception as e:
-        logging.exception("Failed to load the trained model.")
+        logging.exception("Error during prediction.")
         raise e
     
-    try:
-        logging.info("Loading feature order...")
-        with open(feature_order_path, 'r') as f:
-            feature_order = [line.strip() for line in f.readlines()]
-        logging.info(f"Feature order: {feature_order}")
-    except Exception as e:
-        logging.exception("Failed to load feature order.")
-        raise e
+    if verbose:
+        logging.info("=== Model Evaluation Completed ===")
+    if explain:
+        return prediction, float(bias[0]), contributions
+    return prediction
+
+def evaluate_batch(input_path: str, output_path: str = None, chunk_size: int = 10000, explain: str = None) -> int:
+    """
+    Score every passenger in a CSV or JSONL file, one model call per chunk.
+
+    Results are streamed as 'PassengerId,Survived,Survival_Probability' rows to
+    output_path, or to stdout if no output path is given. Rows without a
+    PassengerId column are numbered from 1. Rows that fail validation are
+    logged with their row number and skipped. With explain ('saabas' or
+    'treeshap'), a Bias column and one <feature>_Contribution column per
+    feature are appended.
+
+    Returns:
+        int: Number of rows scored.
+    """
+    _setup_logging_once()
+    logging.info("=== Starting Batch Evaluation ===")
     
-    try:
-        logging.info("Preparing input data for prediction...")
-        input_df = pd.DataFrame([input_features])
-        logging.info(f"Initial Input DataFrame:\n{input_df}")
-        
-        # Reorder columns to match feature order
-        input_df = input_df[feature_order]
-        logging.info(f"Reordered Input DataFrame:\n{input_df}")
-    except Exception as e:
-        logging.exception("Error preparing input data.")
-        raise e
+    if not os.path.exists(input_path):
+        logging.error(f"Input file not found at {input_path}.")
+        raise FileNotFoundError(f"Input file not found at {input_path}.")
     
-    try:
-        logging.info("Making prediction...")
-        prediction = model.predict(input_df)
-        logging.info(f"Prediction result: {prediction[0]}")
-    except Exception as e:
-        logging.exception("Error during prediction.")
-        raise e
+    predictor = get_predictor()
+    
+    with span("evaluate_batch", bytes_read=path_bytes(input_path)) as timer:
+        out = open(output_path, 'w') if output_path else sys.stdout
+        rows_read = 0
+        rows_scored = 0
+        try:
+            header = "PassengerId,Survived,Survival_Probability"
+            if explain:
+                feature_order = predictor.artifacts()[1]
+                header += ",Bias," + ",".join(f"{feature}_Contribution" for feature in feature_order)
+            out.write(header + "\n")
+            for chunk in read_input_records(input_path, chunk_size):
+                id_columns = [key for key in set().union(*chunk) if str(key).strip().lower() == 'passengerid']
+                passenger_ids = [record.get(id_columns[0]) if id_columns else None for record in chunk]
+                # Only a missing or empty id is numbered; 0 is a valid PassengerId
+                passenger_ids = [
+                    row_number if passenger_id in (None, '') else passenger_id
+                    for row_number, passenger_id in enumerate(passenger_ids, start=rows_read + 1)
+                ]
+                
+                with span("evaluate_batch.parse", rows=len(chunk)):
+                    columns, valid, errors = parse_inputs_bulk(chunk)
+                for row, message in errors:
+                    logging.error(f"Skipping input row {rows_read + row + 1}: {message}")
+                rows_read += len(chunk)
+                if not valid.any():
+                    continue
+                
+                try:
+                    valid_columns = {feature: column[valid] for feature, column in columns.items()}
+                    if explain:
+                        with span("evaluate_batch.explain", rows=int(valid.sum())):
+                            predictions, probabilities, bias, contributions = predictor.explain_batch(valid_columns, explain)
+                    else:
+                        with span("evaluate_batch.predict", rows=int(valid.sum())):
+                            predictions, probabilities = predictor.predict_batch(valid_columns)
+                except Exception as e:
+                    logging.exception("Error during batch prediction.")
+                    raise e
+                
+                valid_ids = [passenger_id for passenger_id, ok in zip(passenger_ids, valid) if ok]
+                if explain:
+                    out.writelines(
+                        f"{passenger_id},{prediction},{probability:.6f},{row_bias:.6f},"
+                        + ",".join(f"{value:.6f}" for value in row) + "\n"
+                        for passenger_id, prediction, probability, row_bias, row
+                        in zip(valid_ids, predictions, probabilities, bias, contributions)
+                    )
+                else:
+                    out.writelines(
+                        f"{passenger_id},{prediction},{probability:.6f}\n"
+                        for passenger_id, prediction, probability in zip(valid_ids, predictions, probabilities)
+                    )
+                rows_scored += len(valid_ids)
+                if not quiet():
+                    logging.info(f"Scored {rows_scored} of {rows_read} rows...")
+            timer.rows = rows_read
+        finally:
+            if output_path:
+                out.close()
+            else:
+                out.flush()
     
-    logging.info("=== Model Evaluation Completed ===")
-    return prediction[0]
+    if predictor.cache is not None:
+        logging.info(f"Prediction cache: {predictor.cache.stats()}")
+    logging.info(f"=== Batch Evaluation Completed: {rows_scored} rows ===")
+    return rows_scored
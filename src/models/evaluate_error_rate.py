@@ -1,10 +1,12 @@
 # src/models/evaluate_error_rate.py
 
-import pandas as pd
 import joblib
 import logging
 import os
 import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 from sklearn.metrics import (
     accuracy_score,
     precision_score,
@@ -13,6 +15,12 @@ from sklearn.metrics import (
     confusion_matrix,
     classification_report,
 )
+from src.data.columnar import read_table, read_table_chunks
+from src.models.registry import FEATURE_ORDER_FILE, MODEL_FILE, current_artifacts
+from src.utils.metrics import path_bytes, quiet, span
+
+# Model, feature order and labels of the current worker process, set once by _init_worker
+_worker = None
 
 def setup_logging():
     """Set up logging to file and console."""
@@ -38,13 +46,106 @@ def setup_logging():
     console_handler.setFormatter(formatter)
     logger.addHandler(console_handler)
 
-def evaluate_error_rate(test_data_path: str):
-    """Evaluate the model's error rate on the test dataset."""
+def compute_metrics(y_true, y_pred, sample_weight=None) -> dict:
+    """Accuracy, precision, recall and F1 of binary predictions."""
+    return {
+        "accuracy": accuracy_score(y_true, y_pred, sample_weight=sample_weight),
+        "precision": precision_score(y_true, y_pred, sample_weight=sample_weight, zero_division=0),
+        "recall": recall_score(y_true, y_pred, sample_weight=sample_weight, zero_division=0),
+        "f1": f1_score(y_true, y_pred, sample_weight=sample_weight, zero_division=0),
+    }
+
+def confusion_counts(y_true, y_pred, labels) -> np.ndarray:
+    """Confusion matrix over labels (rows true, columns predicted); raises ValueError on unknown labels."""
+    unknown = np.setdiff1d(np.unique(y_true), labels)
+    if unknown.size:
+        raise ValueError(f"Test data contains labels {unknown.tolist()} the model does not predict.")
+    return confusion_matrix(y_true, y_pred, labels=labels)
+
+def _as_weighted_labels(matrix: np.ndarray, labels):
+    # One (true, predicted) pair per cell, weighted by its count, stands in for the rows themselves
+    true_index, pred_index = np.indices(matrix.shape)
+    labels = np.asarray(labels)
+    return labels[true_index.ravel()], labels[pred_index.ravel()], matrix.ravel()
+
+def metrics_from_confusion(matrix: np.ndarray, labels) -> dict:
+    """compute_metrics from an accumulated confusion matrix; identical to computing it over the rows."""
+    y_true, y_pred, weight = _as_weighted_labels(matrix, labels)
+    return compute_metrics(y_true, y_pred, sample_weight=weight)
+
+def report_from_confusion(matrix: np.ndarray, labels, digits: int = 2) -> str:
+    """The text of sklearn's classification_report, computed from an accumulated confusion matrix."""
+    y_true, y_pred, weight = _as_weighted_labels(matrix, labels)
+    report = classification_report(y_true, y_pred, sample_weight=weight, zero_division=0, output_dict=True)
+    names = [str(label) for label in labels]
+    width = max(len("weighted avg"), digits, *(len(name) for name in names))
+    total = int(matrix.sum())
+
+    # Same layout as classification_report; supports are the integer counts of the matrix
+    row = "{:>{width}s} " + " {:>9.{digits}f}" * 3 + " {:>9}\n"
+    text = ("{:>{width}s} " + " {:>9}" * 4 + "\n\n").format("", "precision", "recall", "f1-score", "support", width=width)
+    for name in names:
+        scores = report[name]
+        text += row.format(name, scores["precision"], scores["recall"], scores["f1-score"], int(scores["support"]), width=width, digits=digits)
+    text += "\n"
+    text += ("{:>{width}s} " + " {:>9.{digits}}" * 2 + " {:>9.{digits}f} {:>9}\n").format(
+        "accuracy", "", "", report["accuracy"], total, width=width, digits=digits)
+    for average in ["macro avg", "weighted avg"]:
+        scores = report[average]
+        text += row.format(average, scores["precision"], scores["recall"], scores["f1-score"], total, width=width, digits=digits)
+    return text
+
+def _init_worker(model_path: str, feature_order: list, labels):
+    global _worker
+    model = joblib.load(model_path)
+    # The pool provides the parallelism; each worker predicts on one core
+    model.n_jobs = 1
+    model.verbose = 0
+    _worker = (model, feature_order, labels)
+
+def score_chunk(chunk) -> np.ndarray:
+    """Predict one chunk in the worker and return its confusion matrix."""
+    model, feature_order, labels = _worker
+    return confusion_counts(chunk['Survived'].to_numpy(), model.predict(chunk[feature_order]), labels)
+
+def stream_confusion(test_data_path: str, model_path: str, feature_order: list, labels,
+                     chunk_size: int, max_workers: int = None) -> np.ndarray:
+    """
+    Score the test file chunk by chunk on a process pool and sum the confusion matrices.
+
+    At most two chunks per worker are in flight, so memory depends on
+    chunk_size and max_workers, not on the size of the file.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    matrix = np.zeros((len(labels), len(labels)), dtype=np.int64)
+    pending = deque()
+    with ProcessPoolExecutor(max_workers, initializer=_init_worker, initargs=(model_path, feature_order, labels)) as pool:
+        for chunk in read_table_chunks(test_data_path, chunk_size):
+            if 'Survived' not in chunk.columns:
+                logging.error("'Survived' column not found in the test data.")
+                raise KeyError("'Survived' column not found in the test data.")
+            pending.append(pool.submit(score_chunk, chunk[feature_order + ['Survived']]))
+            if len(pending) >= 2 * max_workers:
+                matrix += pending.popleft().result()
+        while pending:
+            matrix += pending.popleft().result()
+    return matrix
+
+def evaluate_error_rate(test_data_path: str, chunk_size: int = None, max_workers: int = None):
+    """
+    Evaluate the model's error rate on the test dataset.
+
+    With chunk_size, the file is read chunk by chunk, scored on a pool of
+    max_workers processes (default: all cores) and the metrics are derived
+    from the summed confusion matrix, so memory does not grow with the file.
+    """
     setup_logging()
     logging.info("=== Starting Error Rate Evaluation ===")
 
-    model_path = os.path.join("models", "random_forest_titanic_model.joblib")
-    feature_order_path = os.path.join("models", "feature_order.txt")
+    # The version CURRENT points at, the same model main.py and serve.py score with
+    paths = current_artifacts()
+    model_path = paths[MODEL_FILE]
+    feature_order_path = paths[FEATURE_ORDER_FILE]
     
     # Check if model and feature order files exist
     if not os.path.exists(model_path):
@@ -59,7 +160,8 @@ def evaluate_error_rate(test_data_path: str):
     
     try:
         logging.info(f"Loading model from {model_path}...")
-        model = joblib.load(model_path)
+        with span("evaluate_error_rate.load_model", bytes_read=path_bytes(model_path)):
+            model = joblib.load(model_path)
         logging.info("Model loaded successfully.")
     except Exception as e:
         logging.exception("Failed to load the trained model.")
@@ -74,70 +176,92 @@ def evaluate_error_rate(test_data_path: str):
         logging.exception("Failed to load feature order.")
         raise e
     
-    try:
-        logging.info(f"Loading test data from {test_data_path}...")
-        test_data = pd.read_csv(test_data_path)
-        logging.info("Test data loaded successfully.")
-    except Exception as e:
-        logging.exception("Failed to load test data.")
-        raise e
-    
-    # Check if 'Survived' column exists
-    if 'Survived' not in test_data.columns:
-        logging.error("'Survived' column not found in the test data.")
-        raise KeyError("'Survived' column not found in the test data.")
-    
-    try:
-        X_test = test_data.drop('Survived', axis=1)
-        y_test = test_data['Survived']
-        logging.info("Separated features and target variable from test data.")
-    except Exception as e:
-        logging.exception("Error separating features and target from test data.")
-        raise e
-    
-    try:
-        logging.info("Reordering test data features to match training feature order...")
-        X_test = X_test[feature_order]
-        logging.info("Feature order aligned.")
-    except Exception as e:
-        logging.exception("Error aligning feature order in test data.")
-        raise e
-    
-    try:
-        logging.info("Making predictions on the test set...")
-        y_pred = model.predict(X_test)
-        logging.info("Predictions completed.")
-    except Exception as e:
-        logging.exception("Error during prediction on test set.")
-        raise e
-    
+    if chunk_size:
+        try:
+            logging.info(f"Scoring {test_data_path} in chunks of {chunk_size} rows on {max_workers or os.cpu_count()} worker processes...")
+            labels = model.classes_
+            with span("evaluate_error_rate.stream", bytes_read=path_bytes(test_data_path)) as timer:
+                conf_matrix = stream_confusion(test_data_path, model_path, feature_order, labels, chunk_size, max_workers)
+                timer.rows = int(conf_matrix.sum())
+            logging.info(f"Predictions completed for {timer.rows} rows.")
+        except Exception as e:
+            logging.exception("Error during chunked prediction on the test set.")
+            raise e
+    else:
+        try:
+            logging.info(f"Loading test data from {test_data_path}...")
+            with span("evaluate_error_rate.load_data", bytes_read=path_bytes(test_data_path)) as timer:
+                test_data = read_table(test_data_path)
+                timer.rows = len(test_data)
+            logging.info("Test data loaded successfully.")
+        except Exception as e:
+            logging.exception("Failed to load test data.")
+            raise e
+
+        # Check if 'Survived' column exists
+        if 'Survived' not in test_data.columns:
+            logging.error("'Survived' column not found in the test data.")
+            raise KeyError("'Survived' column not found in the test data.")
+
+        try:
+            X_test = test_data.drop('Survived', axis=1)
+            y_test = test_data['Survived']
+            logging.info("Separated features and target variable from test data.")
+        except Exception as e:
+            logging.exception("Error separating features and target from test data.")
+            raise e
+
+        try:
+            logging.info("Reordering test data features to match training feature order...")
+            X_test = X_test[feature_order]
+            logging.info("Feature order aligned.")
+        except Exception as e:
+            logging.exception("Error aligning feature order in test data.")
+            raise e
+
+        try:
+            logging.info("Making predictions on the test set...")
+            with span("evaluate_error_rate.predict", rows=len(X_test)):
+                y_pred = model.predict(X_test)
+            logging.info("Predictions completed.")
+        except Exception as e:
+            logging.exception("Error during prediction on test set.")
+            raise e
+
     try:
         logging.info("Calculating evaluation metrics...")
-        accuracy = accuracy_score(y_test, y_pred)
-        precision = precision_score(y_test, y_pred, zero_division=0)
-        recall = recall_score(y_test, y_pred, zero_division=0)
-        f1 = f1_score(y_test, y_pred, zero_division=0)
-        conf_matrix = confusion_matrix(y_test, y_pred)
-        report = classification_report(y_test, y_pred, zero_division=0)
+        scores = metrics_from_confusion(conf_matrix, labels) if chunk_size else compute_metrics(y_test, y_pred)
+        accuracy = scores["accuracy"]
+        precision = scores["precision"]
+        recall = scores["recall"]
+        f1 = scores["f1"]
         
         logging.info(f"Validation Accuracy: {accuracy:.4f}")
         logging.info(f"Precision: {precision:.4f}")
         logging.info(f"Recall: {recall:.4f}")
         logging.info(f"F1-Score: {f1:.4f}")
-        logging.info("Confusion Matrix:")
-        logging.info(f"\n{conf_matrix}")
-        logging.info("Classification Report:")
-        logging.info(f"\n{report}")
         
         # Print metrics to console
         print(f"Validation Accuracy: {accuracy:.4f}")
         print(f"Precision: {precision:.4f}")
         print(f"Recall: {recall:.4f}")
         print(f"F1-Score: {f1:.4f}")
-        print("Confusion Matrix:")
-        print(conf_matrix)
-        print("Classification Report:")
-        print(report)
+
+        # The formatted matrix and report are skipped in quiet mode
+        if not quiet():
+            if chunk_size:
+                report = report_from_confusion(conf_matrix, labels)
+            else:
+                conf_matrix = confusion_matrix(y_test, y_pred)
+                report = classification_report(y_test, y_pred, zero_division=0)
+            logging.info("Confusion Matrix:")
+            logging.info(f"\n{conf_matrix}")
+            logging.info("Classification Report:")
+            logging.info(f"\n{report}")
+            print("Confusion Matrix:")
+            print(conf_matrix)
+            print("Classification Report:")
+            print(report)
     except Exception as e:
         logging.exception("Error during evaluation metric calculation.")
         raise e
@@ -152,12 +276,14 @@ if __name__ == "__main__":
         "--test-data",
         type=str,
         required=True,
-        help="Path to the processed test dataset CSV file (e.g., data/processed/test_processed.csv)"
+        help="Path to the processed test dataset, CSV or columnar bundle (e.g., data/processed/validation_set.csv or data/processed/validation_set.cols)"
     )
+    parser.add_argument("--chunk-size", type=int, default=None, help="Stream the test data in chunks of this many rows, scored on a process pool")
+    parser.add_argument("--max-workers", type=int, default=None, help="Worker processes for --chunk-size (default: all cores)")
     args = parser.parse_args()
 
     try:
-        evaluate_error_rate(args.test_data)
+        evaluate_error_rate(args.test_data, args.chunk_size, args.max_workers)
     except Exception as e:
         logging.exception("Evaluation failed.")
         sys.exit(1)
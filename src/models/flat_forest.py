@@ -0,0 +1,186 @@
+# src/models/flat_forest.py
+
+import argparse
+import os
+import numpy as np
+from src.models.artifacts import file_sha256, load_array_bundle, save_array_bundle
+
+FLAT_MODEL_PATH = os.path.join("models", "random_forest_titanic_model.flat")
+
+class FlatForest:
+    """
+    A RandomForestClassifier packed into contiguous NumPy arrays.
+
+    Every node of every tree lives in one set of arrays (feature, threshold,
+    left, right, value) indexed by a global node id; roots holds the id of each
+    tree's root. A batch is evaluated for all trees at once by stepping every
+    (tree, row) pair one level per iteration, with no per-tree Python loop.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, classes, feature_names, max_depth, source_hash=""):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+        self.feature_names = list(feature_names)
+        self.max_depth = int(max_depth)
+        self.source_hash = str(source_hash)
+        self.is_split = left != np.arange(len(left))
+
+    @classmethod
+    def from_model(cls, model):
+        """Pack a fitted RandomForestClassifier."""
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            node_ids = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+            roots.append(offset)
+
+            # Leaves point to themselves; is_split tells them apart from internal nodes
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+
+            # Same normalisation DecisionTreeClassifier.predict_proba applies to leaf values
+            value = tree.value[:, 0, :].astype(np.float64)
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(value / normalizer)
+
+            max_depth = max(max_depth, tree.max_depth)
+            offset += tree.node_count
+
+        feature_names = getattr(model, "feature_names_in_", range(model.n_features_in_))
+        return cls(
+            feature=np.concatenate(features).astype(np.int32),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            left=np.concatenate(lefts).astype(np.int32),
+            right=np.concatenate(rights).astype(np.int32),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.int32),
+            classes=np.asarray(model.classes_),
+            feature_names=[str(name) for name in feature_names],
+            max_depth=max_depth,
+        )
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def node_count(self) -> int:
+        return len(self.feature)
+
+    def _as_array(self, X):
+        if hasattr(X, "columns"):
+            X = X[self.feature_names].to_numpy()
+        # sklearn trees compare float32 inputs against float64 thresholds
+        return np.asarray(X, dtype=np.float32)
+
+    def leaves(self, X) -> np.ndarray:
+        """Return the leaf node id reached in every tree, shape (n_trees, n_samples)."""
+        X = self._as_array(X)
+        n_samples, n_features = X.shape
+        X_flat = X.ravel()
+
+        # One entry per (tree, row) pair, tree-major
+        node = np.repeat(self.roots, n_samples)
+        row_offset = np.tile(np.arange(n_samples, dtype=np.int64) * n_features, self.n_trees)
+
+        # Step every pair one level down per iteration, dropping pairs once they reach a leaf
+        active = np.flatnonzero(self.is_split[node])
+        current = node[active]
+        row_offset = row_offset[active]
+        while active.size:
+            go_left = X_flat[row_offset + self.feature[current]] <= self.threshold[current]
+            current = np.where(go_left, self.left[current], self.right[current])
+            node[active] = current
+            still_split = self.is_split[current]
+            active = active[still_split]
+            current = current[still_split]
+            row_offset = row_offset[still_split]
+        return node.reshape(self.n_trees, n_samples)
+
+    def predict_proba(self, X, chunk_size: int = 8192) -> np.ndarray:
+        """Class probabilities, averaged over trees in the same order as sklearn."""
+        X = self._as_array(X)
+        proba = np.empty((X.shape[0], len(self.classes_)), dtype=np.float64)
+        for start in range(0, X.shape[0], chunk_size):
+            node = self.leaves(X[start:start + chunk_size])
+            # Summing over the leading (tree) axis adds trees one after another
+            proba[start:start + chunk_size] = self.value[node].sum(axis=0) / self.n_trees
+        return proba
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_.take(self.predict_proba(X).argmax(axis=1))
+
+    def save(self, path: str = FLAT_MODEL_PATH):
+        """Save as a memory-mappable .npy bundle directory."""
+        save_array_bundle(
+            path,
+            {
+                "feature": self.feature,
+                "threshold": self.threshold,
+                "left": self.left,
+                "right": self.right,
+                "value": self.value,
+                "roots": self.roots,
+                "classes": self.classes_,
+            },
+            {"feature_names": self.feature_names, "max_depth": self.max_depth, "source_hash": self.source_hash},
+        )
+
+    @classmethod
+    def load(cls, path: str = FLAT_MODEL_PATH, mmap_mode: str = 'r'):
+        """Load a saved bundle; node arrays are read-only memory maps unless mmap_mode is None."""
+        arrays, meta = load_array_bundle(path, mmap_mode)
+        return cls(
+            feature=arrays["feature"],
+            threshold=arrays["threshold"],
+            left=arrays["left"],
+            right=arrays["right"],
+            value=arrays["value"],
+            roots=arrays["roots"],
+            classes=arrays["classes"],
+            feature_names=meta["feature_names"],
+            max_depth=meta["max_depth"],
+            source_hash=meta.get("source_hash", ""),
+        )
+
+def export_flat_forest(model_path: str = None, output_path: str = None) -> FlatForest:
+    """
+    Pack a trained joblib forest into a FlatForest and save it next to the model.
+
+    Defaults to the current model (registry CURRENT, else models/), saved
+    into its version directory.
+    """
+    import joblib
+    from src.models.registry import FLAT_BUNDLE, MODEL_FILE, add_bundle, current_artifacts
+
+    paths = current_artifacts()
+    model_path = model_path or paths[MODEL_FILE]
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Trained model not found at {model_path}.")
+    forest = FlatForest.from_model(joblib.load(model_path))
+    forest.source_hash = file_sha256(model_path)
+    if output_path is None and paths["version"] is not None:
+        output_path = add_bundle(paths["version"], FLAT_BUNDLE, forest.save)
+    else:
+        output_path = output_path or paths[FLAT_BUNDLE]
+        forest.save(output_path)
+    print(f"Packed {forest.n_trees} trees ({forest.node_count} nodes, max depth {forest.max_depth}) into {output_path}.")
+    return forest
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the trained forest to flat NumPy arrays")
+    parser.add_argument("--model", type=str, default=None, help="Path to the trained joblib model (default: the registry's CURRENT version)")
+    parser.add_argument("--output", type=str, default=None, help="Bundle directory to write (default: next to the model)")
+    args = parser.parse_args()
+    export_flat_forest(args.model, args.output)
@@ -0,0 +1,273 @@
+# src/models/lookup.py
+
+import argparse
+import itertools
+import logging
+import os
+import numpy as np
+from src.models.artifacts import file_sha256, load_array_bundle, round_down_float32, save_array_bundle
+
+LOOKUP_MODEL_PATH = os.path.join("models", "random_forest_titanic_model.lookup")
+# Largest table compile_lookup writes unless told otherwise
+MAX_TABLE_MB = 256.0
+
+# Discrete features and their valid codes; SibSp/Parch domains are derived from the forest
+CATEGORICAL_DOMAINS = {'Pclass': [1, 2, 3], 'Sex': [0, 1], 'Embarked': [0, 1, 2]}
+COUNT_FEATURES = ['SibSp', 'Parch']
+CONTINUOUS_FEATURES = ['Age', 'Fare']
+
+def _interval_representatives(thresholds: np.ndarray) -> np.ndarray:
+    """
+    One float32 value per interval (-inf, t0], (t0, t1], ..., (t_last, inf) of a sorted threshold list.
+
+    An interval can hold no float32 value at all (two thresholds within one
+    float32 step); no input can land in such a cell, so its value is irrelevant.
+    """
+    if thresholds.size == 0:
+        return np.zeros(1, dtype=np.float32)
+    above = thresholds[-1:].astype(np.float32)
+    above[above.astype(np.float64) <= thresholds[-1]] = np.nextafter(above, np.float32(np.inf))
+    return np.concatenate([round_down_float32(thresholds), above])
+
+def _reachable_thresholds(forest, x: np.ndarray, continuous_idx: list) -> list:
+    """
+    Walk every tree with the discrete features fixed to x, following both
+    branches of continuous splits, and collect the continuous thresholds met.
+    """
+    found = [[] for _ in continuous_idx]
+    nodes = forest.roots
+    while nodes.size:
+        nodes = nodes[forest.is_split[nodes]]
+        feature = forest.feature[nodes]
+        threshold = forest.threshold[nodes]
+        is_continuous = np.isin(feature, continuous_idx)
+
+        for i, idx in enumerate(continuous_idx):
+            found[i].append(threshold[feature == idx])
+
+        discrete = nodes[~is_continuous]
+        go_left = x[forest.feature[discrete]] <= forest.threshold[discrete]
+        branching = nodes[is_continuous]
+        nodes = np.concatenate([
+            np.where(go_left, forest.left[discrete], forest.right[discrete]),
+            forest.left[branching],
+            forest.right[branching],
+        ])
+    return [np.unique(np.concatenate(parts)) for parts in found]
+
+class LookupModel:
+    """
+    The forest compiled into an exact table over its discrete input grid.
+
+    Discrete features (Pclass, Sex, Embarked, SibSp, Parch) select a combination
+    id. Within each combination the forest only depends on which interval,
+    between the Age and Fare thresholds reachable for that combination, each
+    value falls in. All combinations' thresholds are concatenated, shifted by
+    combination id * key_span, so a whole batch is answered with two
+    searchsorted calls plus one table index. SibSp/Parch values above the
+    largest threshold the forest uses are clamped, which cannot change the
+    result.
+
+    The table holds the forest's float64 survival probability, so predict()
+    and predict_proba()[:, 1] equal sklearn's exactly; the other column is
+    1 - p, which can differ from sklearn's own value in the last bit.
+    """
+
+    def __init__(self, feature_names, discrete_features, discrete_low, discrete_size,
+                 age_keys, age_start, fare_keys, fare_start, table_start, proba, labels,
+                 classes, key_span, source_hash=""):
+        self.feature_names = list(feature_names)
+        self.discrete_features = list(discrete_features)
+        self.discrete_low = discrete_low
+        self.discrete_size = discrete_size
+        self.age_keys = age_keys
+        self.age_start = age_start
+        self.fare_keys = fare_keys
+        self.fare_start = fare_start
+        self.table_start = table_start
+        self.proba = proba
+        self.labels = labels
+        self.classes_ = classes
+        self.key_span = float(key_span)
+        self.source_hash = str(source_hash)
+
+        self._discrete_idx = [self.feature_names.index(name) for name in self.discrete_features]
+        self._age_idx = self.feature_names.index('Age')
+        self._fare_idx = self.feature_names.index('Fare')
+        self._strides = np.cumprod(np.concatenate([[1], self.discrete_size[::-1][:-1]]))[::-1]
+        self._fare_width = np.diff(np.append(self.fare_start, len(self.fare_keys))) + 1
+        self._clamped = np.array([name in COUNT_FEATURES for name in self.discrete_features])
+
+    def cells(self, X) -> np.ndarray:
+        """Table index of every row of X (columns in feature_names order)."""
+        if hasattr(X, "columns"):
+            X = X[self.feature_names].to_numpy()
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+
+        codes = X[:, self._discrete_idx] - self.discrete_low
+        codes = np.where(self._clamped, np.minimum(codes, self.discrete_size - 1), codes)
+        if (codes < 0).any() or (codes >= self.discrete_size).any() or (codes != np.floor(codes)).any():
+            raise ValueError(f"Discrete features {self.discrete_features} outside the compiled domain.")
+        if np.isnan(X[:, [self._age_idx, self._fare_idx]]).any():
+            raise ValueError("Age and Fare must not be missing.")
+        combination = codes.astype(np.int64) @ self._strides
+
+        # Same float32 view of the inputs the sklearn trees compare against
+        age = np.clip(X[:, self._age_idx].astype(np.float32), 0, self.key_span - 1)
+        fare = np.clip(X[:, self._fare_idx].astype(np.float32), 0, self.key_span - 1)
+        offset = combination * self.key_span
+        age_bin = np.searchsorted(self.age_keys, offset + age, side='left') - self.age_start[combination]
+        fare_bin = np.searchsorted(self.fare_keys, offset + fare, side='left') - self.fare_start[combination]
+        return self.table_start[combination] + age_bin * self._fare_width[combination] + fare_bin
+
+    def predict_proba(self, X) -> np.ndarray:
+        survived = self.proba[self.cells(X)].astype(np.float64)
+        return np.column_stack([1.0 - survived, survived])
+
+    def predict(self, X) -> np.ndarray:
+        cells = self.cells(X)
+        survived = (self.labels[cells >> 3] >> (7 - (cells & 7))) & 1
+        return self.classes_.take(survived)
+
+    def save(self, path: str = LOOKUP_MODEL_PATH):
+        """Save as a memory-mappable .npy bundle directory."""
+        save_array_bundle(
+            path,
+            {
+                "discrete_low": self.discrete_low,
+                "discrete_size": self.discrete_size,
+                "age_keys": self.age_keys,
+                "age_start": self.age_start,
+                "fare_keys": self.fare_keys,
+                "fare_start": self.fare_start,
+                "table_start": self.table_start,
+                "proba": self.proba,
+                "labels": self.labels,
+                "classes": self.classes_,
+            },
+            {
+                "feature_names": self.feature_names,
+                "discrete_features": self.discrete_features,
+                "key_span": self.key_span,
+                "source_hash": self.source_hash,
+            },
+        )
+
+    @classmethod
+    def load(cls, path: str = LOOKUP_MODEL_PATH, mmap_mode: str = 'r'):
+        """Load a saved bundle; the table is a read-only memory map unless mmap_mode is None."""
+        arrays, meta = load_array_bundle(path, mmap_mode)
+        return cls(
+            classes=arrays.pop("classes"),
+            **arrays,
+            **meta,
+        )
+
+def compile_lookup(model_path: str = None, output_path: str = None, max_table_mb: float = MAX_TABLE_MB) -> LookupModel:
+    """
+    Compile a trained forest into a LookupModel and save it next to the model.
+
+    Defaults to the current model (registry CURRENT, else models/), saved
+    into its version directory. The table size is known once the reachable
+    thresholds are collected; compiling stops with a ValueError before any
+    scoring if it would exceed max_table_mb.
+    """
+    import joblib
+    import pandas as pd
+    from src.models.flat_forest import FlatForest
+    from src.models.registry import LOOKUP_BUNDLE, MODEL_FILE, add_bundle, current_artifacts
+
+    paths = current_artifacts()
+    model_path = model_path or paths[MODEL_FILE]
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Trained model not found at {model_path}.")
+    model = joblib.load(model_path)
+    model.verbose = 0
+    forest = FlatForest.from_model(model)
+    feature_names = forest.feature_names
+    survived_index = list(model.classes_).index(1)
+
+    # Discrete domains: fixed categorical codes, plus counts up to just past the largest threshold
+    discrete_features = list(CATEGORICAL_DOMAINS) + COUNT_FEATURES
+    domains = []
+    for name in discrete_features:
+        if name in CATEGORICAL_DOMAINS:
+            domains.append(np.asarray(CATEGORICAL_DOMAINS[name]))
+        else:
+            used = forest.threshold[forest.is_split & (forest.feature == feature_names.index(name))]
+            top = int(np.floor(used.max())) + 1 if used.size else 0
+            domains.append(np.arange(top + 1))
+    discrete_idx = [feature_names.index(name) for name in discrete_features]
+    continuous_idx = [feature_names.index(name) for name in CONTINUOUS_FEATURES]
+
+    all_continuous = forest.threshold[forest.is_split & np.isin(forest.feature, continuous_idx)]
+    key_span = 2.0 ** np.ceil(np.log2(all_continuous.max() + 2))
+
+    combinations = []
+    for values in itertools.product(*domains):
+        x = np.full(len(feature_names), np.nan, dtype=np.float32)
+        x[discrete_idx] = values
+        combinations.append((x, *_reachable_thresholds(forest, x, continuous_idx)))
+    total_cells = sum((age.size + 1) * (fare.size + 1) for _, age, fare in combinations)
+    # Probabilities (float64) plus one label bit per cell
+    table_mb = total_cells * (8 + 1 / 8) / 1e6
+    if table_mb > max_table_mb:
+        logging.error(f"The lookup table would have {total_cells} cells ({table_mb:.1f} MB), over the {max_table_mb:g} MB limit.")
+        raise ValueError(f"The lookup table would have {total_cells} cells ({table_mb:.1f} MB), over the {max_table_mb:g} MB limit.")
+
+    age_keys, age_start, fare_keys, fare_start, table_start, proba, labels = [], [], [], [], [], [], []
+    n_age_keys = n_fare_keys = n_cells = 0
+    for combination, (x, age_thresholds, fare_thresholds) in enumerate(combinations):
+        age_start.append(n_age_keys)
+        fare_start.append(n_fare_keys)
+        table_start.append(n_cells)
+        age_keys.append(combination * key_span + age_thresholds)
+        fare_keys.append(combination * key_span + fare_thresholds)
+        n_age_keys += age_thresholds.size
+        n_fare_keys += fare_thresholds.size
+
+        # Score one representative point per (Age interval, Fare interval) cell
+        age_grid, fare_grid = np.meshgrid(
+            _interval_representatives(age_thresholds), _interval_representatives(fare_thresholds), indexing='ij'
+        )
+        grid = np.tile(x, (age_grid.size, 1))
+        grid[:, continuous_idx[0]] = age_grid.ravel()
+        grid[:, continuous_idx[1]] = fare_grid.ravel()
+        grid_proba = model.predict_proba(pd.DataFrame(grid, columns=feature_names))
+        proba.append(grid_proba[:, survived_index])
+        labels.append(model.classes_.take(grid_proba.argmax(axis=1)) == model.classes_[survived_index])
+        n_cells += age_grid.size
+
+    proba = np.concatenate(proba)
+    lookup = LookupModel(
+        feature_names=feature_names,
+        discrete_features=discrete_features,
+        discrete_low=np.array([domain[0] for domain in domains], dtype=np.float64),
+        discrete_size=np.array([len(domain) for domain in domains], dtype=np.int64),
+        age_keys=np.concatenate(age_keys),
+        age_start=np.asarray(age_start, dtype=np.int64),
+        fare_keys=np.concatenate(fare_keys),
+        fare_start=np.asarray(fare_start, dtype=np.int64),
+        table_start=np.asarray(table_start, dtype=np.int64),
+        proba=proba.astype(np.float64),
+        # Labels are kept separately so predict() matches the forest even where 1 - p would tie with p
+        labels=np.packbits(np.concatenate(labels)),
+        classes=np.asarray(model.classes_),
+        key_span=key_span,
+        source_hash=file_sha256(model_path),
+    )
+    if output_path is None and paths["version"] is not None:
+        output_path = add_bundle(paths["version"], LOOKUP_BUNDLE, lookup.save)
+    else:
+        output_path = output_path or paths[LOOKUP_BUNDLE]
+        lookup.save(output_path)
+    print(f"Compiled {len(table_start)} discrete combinations into {n_cells} cells ({table_mb:.1f} MB) at {output_path}.")
+    return lookup
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile the trained forest into an exact lookup table")
+    parser.add_argument("--model", type=str, default=None, help="Path to the trained joblib model (default: the registry's CURRENT version)")
+    parser.add_argument("--output", type=str, default=None, help="Bundle directory to write (default: next to the model)")
+    parser.add_argument("--max-table-mb", type=float, default=MAX_TABLE_MB, help="Refuse to compile a table larger than this")
+    args = parser.parse_args()
+    compile_lookup(args.model, args.output, args.max_table_mb)
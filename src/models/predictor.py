@@ -0,0 +1,300 @@
+# src/models/predictor.py
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+import joblib
+import numpy as np
+import pandas as pd
+from src.models.artifacts import FEATURE_ORDER_PATH, MODEL_PATH, file_sha256
+from src.models.cache import PredictionCache
+from src.models.contributions import CONTRIBUTION_METHODS, ContributionEngine, treeshap_contributions
+from src.models.registry import CURRENT, REGISTRY_PATH, SHADOW, load_version, pointer_stat, read_pointer
+from src.utils.metrics import span
+
+class Predictor:
+    """
+    Keeps the trained model and its feature order in memory between predictions.
+
+    The artifacts are loaded on first use. Before each prediction the files are
+    stat'ed; when their mtime or size changes the contents are hashed, and the
+    model is reloaded only if that hash differs from the one currently loaded.
+
+    When the model registry has a CURRENT version, it is used instead of
+    model_path/feature_order_path: only the pointer files are stat'ed, and a
+    version's model and feature order always come from the same immutable
+    directory. Up to max_resident versions stay loaded, so switching back
+    and forth costs nothing. If the registry also has a SHADOW version, every
+    batch is scored by it too, on the same input frame, and the agreement
+    with CURRENT is tracked in shadow_stats().
+
+    Only the first load happens inline. A later reload runs on a background
+    thread while every caller keeps predicting with the artifacts already
+    held; the new ones are swapped in with one assignment once loaded, so
+    predictions never wait for or see a half load. If the reload fails, the
+    loaded model keeps serving until the files or pointers change again.
+
+    An optional PredictionCache memoizes results per feature tuple; it is
+    invalidated whenever a different artifact hash is loaded.
+    """
+
+    def __init__(self, model_path: str = MODEL_PATH, feature_order_path: str = FEATURE_ORDER_PATH,
+                 cache: PredictionCache = None, registry_path: str = REGISTRY_PATH, max_resident: int = 3):
+        self.model_path = model_path
+        self.feature_order_path = feature_order_path
+        self.cache = cache
+        self.registry_path = registry_path
+        self.max_resident = max_resident
+        # (model, feature_order, hash) are swapped as one tuple, so a reader never pairs a model with another's hash
+        self._artifacts = (None, None, None)
+        self._stat = None
+        self._lock = threading.Lock()
+        self._explainer = (None, None)
+        self._resident = OrderedDict()
+        self._shadow = (None, None)
+        self._shadow_lock = threading.Lock()
+        self._shadow_stats = {}
+
+    def _use_registry(self) -> bool:
+        return bool(self.registry_path) and os.path.exists(os.path.join(self.registry_path, CURRENT))
+
+    def _artifact_stat(self):
+        if self._use_registry():
+            return (pointer_stat(CURRENT, self.registry_path), pointer_stat(SHADOW, self.registry_path))
+        stats = []
+        for path in [self.model_path, self.feature_order_path]:
+            if not os.path.exists(path):
+                logging.error(f"Model artifact not found at {path}.")
+                raise FileNotFoundError(f"Model artifact not found at {path}.")
+            st = os.stat(path)
+            stats.append((st.st_mtime_ns, st.st_size))
+        return tuple(stats)
+
+    def refresh(self, wait: bool = False) -> bool:
+        """
+        Reload the artifacts if they changed on disk.
+
+        Returns True if a (re)load happened inline, which is the case for the
+        first load and with wait; otherwise the reload is started in the
+        background and False is returned.
+        """
+        stat = self._artifact_stat()
+        if stat == self._stat:
+            return False
+        if wait or self._artifacts[0] is None:
+            with self._lock:
+                return self._reload(stat)
+        # Only the first thread to notice starts a reload; released by that reload when it is done
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            threading.Thread(target=self._background_reload, args=(stat,), name="predictor-reload", daemon=True).start()
+        except Exception:
+            self._lock.release()
+            raise
+        return False
+
+    def _background_reload(self, stat):
+        try:
+            self._reload(stat)
+        except Exception:
+            logging.exception("Failed to reload the model; still serving the loaded one.")
+            # Not retried on every request; a later change of the files or pointers triggers the next attempt
+            self._stat = stat
+        finally:
+            self._lock.release()
+
+    def _reload(self, stat) -> bool:
+        """Load the artifacts for stat and swap them in; the caller holds self._lock."""
+        if stat == self._stat:
+            return False
+        if self._use_registry():
+            artifact_hash = read_pointer(CURRENT, self.registry_path)
+            self._load_shadow(read_pointer(SHADOW, self.registry_path), artifact_hash)
+        else:
+            artifact_hash = file_sha256(self.model_path) + file_sha256(self.feature_order_path)
+            self._shadow = (None, None)
+        if artifact_hash == self.model_hash:
+            self._stat = stat
+            self._evict()
+            return False
+        if self._use_registry():
+            model, feature_order = self._resident_version(artifact_hash)
+        else:
+            model, feature_order = self._load()
+        self._artifacts = (model, feature_order, artifact_hash)
+        self._stat = stat
+        self._evict()
+        if self.cache is not None:
+            self.cache.validate(artifact_hash)
+        return True
+
+    def _resident_version(self, version: str):
+        """(model, feature_order) of a registry version, loading it unless it is already resident."""
+        if version in self._resident:
+            self._resident.move_to_end(version)
+            return self._resident[version]
+        logging.info(f"Loading model version {version} from {self.registry_path}...")
+        model, feature_order, _ = load_version(version, self.registry_path)
+        self._resident[version] = (model, feature_order)
+        return self._resident[version]
+
+    def _evict(self):
+        # Drop the least recently used versions beyond max_resident, but never the ones being served
+        pinned = {self.model_hash, self._shadow[0]}
+        for old in [old for old in self._resident if old not in pinned][:max(0, len(self._resident) - self.max_resident)]:
+            del self._resident[old]
+
+    def _load_shadow(self, version: str, current: str):
+        if version is None or version == current:
+            self._shadow = (None, None)
+        elif version != self._shadow[0]:
+            try:
+                self._shadow = (version, self._resident_version(version))
+            except Exception:
+                # A broken shadow must never take the primary model down with it
+                logging.exception(f"Failed to load shadow model version {version}; shadow scoring disabled.")
+                self._shadow = (None, None)
+
+    def _load(self):
+        try:
+            logging.info(f"Loading model from {self.model_path}...")
+            model = joblib.load(self.model_path)
+            logging.info("Model loaded successfully.")
+        except Exception as e:
+            logging.exception("Failed to load the trained model.")
+            raise e
+
+        try:
+            logging.info(f"Loading feature order from {self.feature_order_path}...")
+            with open(self.feature_order_path, 'r') as f:
+                feature_order = [line.strip() for line in f.readlines()]
+            logging.info(f"Feature order: {feature_order}")
+        except Exception as e:
+            logging.exception("Failed to load feature order.")
+            raise e
+
+        return model, feature_order
+
+    @property
+    def model_hash(self):
+        return self._artifacts[2]
+
+    @property
+    def model(self):
+        return self._artifacts[0]
+
+    @property
+    def feature_order(self):
+        return self._artifacts[1]
+
+    def artifacts(self):
+        """Return the current (model, feature_order) pair; a change of the files starts a reload (see refresh)."""
+        self.refresh()
+        return self._artifacts[:2]
+
+    @property
+    def shadow_version(self):
+        return self._shadow[0]
+
+    def predict(self, input_features: dict):
+        """Predict survival (0 or 1) for one parsed feature dict."""
+        model, feature_order = self.artifacts()
+        if self.cache is not None or self.shadow_version is not None:
+            predictions, _ = self.predict_batch([input_features])
+            return predictions[0]
+        input_df = pd.DataFrame([input_features])[feature_order]
+        return model.predict(input_df)[0]
+
+    def predict_batch(self, features_list):
+        """
+        Predict a list of parsed feature dicts (or a dict of feature columns) with a single predict_proba call.
+
+        Returns:
+            tuple: (predictions, survival_probabilities) as NumPy arrays.
+        """
+        self.refresh()
+        model, feature_order, model_hash = self._artifacts
+        shadow_version, shadow_artifacts = self._shadow
+        input_df = pd.DataFrame(features_list)[feature_order]
+        if self.cache is None:
+            predictions, probabilities = self._score(model, input_df)
+        else:
+            keys = PredictionCache.make_keys(input_df)
+            cached = self.cache.get_many(keys, model_hash)
+            missing = [i for i, entry in enumerate(cached) if entry is None]
+            if missing:
+                predictions, probabilities = self._score(model, input_df.iloc[missing])
+                entries = list(zip(predictions.tolist(), probabilities.tolist()))
+                self.cache.put_many([keys[i] for i in missing], entries, model_hash)
+                for i, entry in zip(missing, entries):
+                    cached[i] = entry
+            predictions = np.array([entry[0] for entry in cached], dtype=model.classes_.dtype)
+            probabilities = np.array([entry[1] for entry in cached], dtype=np.float64)
+        if shadow_version is not None:
+            self._score_shadow(shadow_version, shadow_artifacts, input_df, predictions, probabilities)
+        return predictions, probabilities
+
+    def _score_shadow(self, version: str, artifacts, input_df: pd.DataFrame, predictions, probabilities):
+        """Score the same input frame with the shadow model and record how often it agrees; never raises."""
+        try:
+            model, feature_order = artifacts
+            with span("predict.shadow", rows=len(input_df)):
+                shadow_predictions, shadow_probabilities = self._score(model, input_df[feature_order])
+            with self._shadow_lock:
+                stats = self._shadow_stats.setdefault(version, {"rows": 0, "disagreements": 0, "abs_probability_diff": 0.0})
+                stats["rows"] += len(input_df)
+                stats["disagreements"] += int((shadow_predictions != predictions).sum())
+                stats["abs_probability_diff"] += float(np.abs(shadow_probabilities - probabilities).sum())
+        except Exception:
+            logging.exception(f"Shadow model version {version} failed; primary predictions are unaffected.")
+
+    def shadow_stats(self) -> dict:
+        """Per shadow version: rows scored, prediction disagreements and mean |probability difference| against CURRENT."""
+        with self._shadow_lock:
+            return {
+                version: {
+                    "rows": stats["rows"],
+                    "disagreements": stats["disagreements"],
+                    "disagreement_rate": stats["disagreements"] / stats["rows"] if stats["rows"] else 0.0,
+                    "mean_abs_probability_diff": stats["abs_probability_diff"] / stats["rows"] if stats["rows"] else 0.0,
+                }
+                for version, stats in self._shadow_stats.items()
+            }
+
+    def explain_batch(self, features_list, method: str = 'saabas'):
+        """
+        Predict a batch and split each survival probability into per-feature contributions.
+
+        method is 'saabas' (vectorized path contributions) or 'treeshap'
+        (needs the shap package). The prediction cache is not used.
+
+        Returns:
+            tuple: (predictions, survival_probabilities, bias, contributions), with
+            contributions of shape (rows, features) in feature_order.
+        """
+        if method not in CONTRIBUTION_METHODS:
+            raise ValueError(f"Unknown contribution method {method!r}; expected one of {CONTRIBUTION_METHODS}.")
+        model, feature_order = self.artifacts()
+        input_df = pd.DataFrame(features_list)[feature_order]
+        predictions, probabilities = self._score(model, input_df)
+        if method == 'treeshap':
+            bias, contributions = treeshap_contributions(model, input_df)
+        else:
+            bias, contributions = self._engine(model).contributions(input_df)
+        return predictions, probabilities, bias, contributions
+
+    def _engine(self, model) -> ContributionEngine:
+        # Built once per loaded model; a reload replaces the model object
+        loaded_for, engine = self._explainer
+        if loaded_for is not model:
+            engine = ContributionEngine(model)
+            self._explainer = (model, engine)
+        return engine
+
+    @staticmethod
+    def _score(model, input_df: pd.DataFrame):
+        probabilities = model.predict_proba(input_df)
+        predictions = model.classes_.take(probabilities.argmax(axis=1))
+        return predictions, probabilities[:, list(model.classes_).index(1)]
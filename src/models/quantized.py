@@ -0,0 +1,229 @@
+# src/models/quantized.py
+
+import argparse
+import os
+import numpy as np
+from src.models.artifacts import file_sha256, load_array_bundle, round_down_float32, save_array_bundle
+
+QUANTIZED_MODEL_PATH = os.path.join("models", "random_forest_titanic_model.quantized")
+LEAF = 255
+
+def _normalize(value: np.ndarray) -> np.ndarray:
+    # Same normalisation DecisionTreeClassifier.predict_proba applies to leaf values
+    normalizer = value.sum(axis=1)[:, np.newaxis]
+    normalizer[normalizer == 0.0] = 1.0
+    return value / normalizer
+
+class QuantizedForest:
+    """
+    A RandomForestClassifier reduced to the fields inference reads, in the narrowest exact dtypes.
+
+    Nodes are stored struct-of-arrays in each tree's preorder: uint8 feature
+    ids (LEAF marks a leaf), float32 thresholds rounded down and int16 child
+    offsets relative to the tree's root. The left child of a split is the next
+    node, so only right is kept unless the tree was built in another order.
+    For a leaf, right is instead its index into the tree's slice of the leaf
+    table, which holds integer (bootstrap-weighted) class counts when these
+    reproduce sklearn's stored fractions exactly, and float64 fractions
+    otherwise. Predictions are identical to the sklearn model and FlatForest.
+    """
+
+    def __init__(self, feature, threshold, right, roots, leaf_offsets, classes, feature_names, max_depth,
+                 leaf_count=None, leaf_value=None, left=None, source_hash=""):
+        self.feature = feature
+        self.threshold = threshold
+        self.right = right
+        self.left = left
+        self.roots = roots
+        self.leaf_offsets = leaf_offsets
+        self.leaf_count = leaf_count
+        self.classes_ = classes
+        self.feature_names = list(feature_names)
+        self.max_depth = int(max_depth)
+        self.source_hash = str(source_hash)
+        if leaf_value is None:
+            counts = np.asarray(leaf_count, dtype=np.float64)
+            leaf_value = counts / counts.sum(axis=1)[:, np.newaxis]
+        self.leaf_value = leaf_value
+        # The probability table is tiny and rebuilt at load; node arrays stay memory mapped
+        self.value = _normalize(np.asarray(leaf_value, dtype=np.float64))
+
+    @classmethod
+    def from_model(cls, model):
+        """Quantize a fitted RandomForestClassifier; raises ValueError if it cannot be stored exactly."""
+        if model.n_features_in_ >= LEAF:
+            raise ValueError(f"At most {LEAF - 1} features fit in uint8 feature ids, model has {model.n_features_in_}.")
+        features, thresholds, lefts, rights, counts, values, roots, leaf_offsets = [], [], [], [], [], [], [], []
+        node_offset = leaf_offset = 0
+        max_depth = max_nodes = 0
+        implicit_left = exact_counts = True
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            node_ids = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+            roots.append(node_offset)
+            leaf_offsets.append(leaf_offset)
+
+            features.append(np.where(is_leaf, LEAF, tree.feature))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+            lefts.append(np.where(is_leaf, 0, tree.children_left))
+            rights.append(np.where(is_leaf, np.cumsum(is_leaf) - 1, tree.children_right))
+            implicit_left &= bool((tree.children_left[~is_leaf] == node_ids[~is_leaf] + 1).all())
+
+            value = tree.value[is_leaf, 0, :].astype(np.float64)
+            weight = tree.weighted_n_node_samples[is_leaf][:, np.newaxis]
+            count = np.round(value * weight)
+            exact_counts &= bool((count / count.sum(axis=1)[:, np.newaxis] == value).all())
+            counts.append(count)
+            values.append(value)
+
+            max_depth = max(max_depth, tree.max_depth)
+            max_nodes = max(max_nodes, tree.node_count)
+            node_offset += tree.node_count
+            leaf_offset += int(is_leaf.sum())
+
+        index_dtype = np.int16 if max_nodes <= np.iinfo(np.int16).max else np.int32
+        leaf_count = leaf_value = None
+        if exact_counts:
+            count = np.concatenate(counts)
+            leaf_count = count.astype(np.uint16 if count.max() <= np.iinfo(np.uint16).max else np.uint32)
+        else:
+            leaf_value = np.concatenate(values)
+
+        feature_names = getattr(model, "feature_names_in_", range(model.n_features_in_))
+        return cls(
+            feature=np.concatenate(features).astype(np.uint8),
+            threshold=round_down_float32(np.concatenate(thresholds)),
+            right=np.concatenate(rights).astype(index_dtype),
+            left=None if implicit_left else np.concatenate(lefts).astype(index_dtype),
+            roots=np.asarray(roots, dtype=np.int32),
+            leaf_offsets=np.asarray(leaf_offsets, dtype=np.int32),
+            leaf_count=leaf_count,
+            leaf_value=leaf_value,
+            classes=np.asarray(model.classes_),
+            feature_names=[str(name) for name in feature_names],
+            max_depth=max_depth,
+        )
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def node_count(self) -> int:
+        return len(self.feature)
+
+    def _as_array(self, X):
+        if hasattr(X, "columns"):
+            X = X[self.feature_names].to_numpy()
+        return np.asarray(X, dtype=np.float32)
+
+    def leaves(self, X) -> np.ndarray:
+        """Return the leaf table index reached in every tree, shape (n_trees, n_samples)."""
+        X = self._as_array(X)
+        n_samples, n_features = X.shape
+        X_flat = X.ravel()
+
+        # One entry per (tree, row) pair, tree-major; child offsets are relative to the pair's root
+        root = np.repeat(self.roots.astype(np.int64), n_samples)
+        node = root.copy()
+        row_offset = np.tile(np.arange(n_samples, dtype=np.int64) * n_features, self.n_trees)
+
+        active = np.flatnonzero(self.feature[node] != LEAF)
+        current = node[active]
+        root = root[active]
+        row_offset = row_offset[active]
+        while active.size:
+            go_left = X_flat[row_offset + self.feature[current]] <= self.threshold[current]
+            left = current + 1 if self.left is None else root + self.left[current]
+            current = np.where(go_left, left, root + self.right[current])
+            node[active] = current
+            still_split = self.feature[current] != LEAF
+            active = active[still_split]
+            current = current[still_split]
+            root = root[still_split]
+            row_offset = row_offset[still_split]
+        leaf = np.repeat(self.leaf_offsets.astype(np.int64), n_samples) + self.right[node]
+        return leaf.reshape(self.n_trees, n_samples)
+
+    def predict_proba(self, X, chunk_size: int = 8192) -> np.ndarray:
+        """Class probabilities, averaged over trees in the same order as sklearn."""
+        X = self._as_array(X)
+        proba = np.empty((X.shape[0], len(self.classes_)), dtype=np.float64)
+        for start in range(0, X.shape[0], chunk_size):
+            leaf = self.leaves(X[start:start + chunk_size])
+            proba[start:start + chunk_size] = self.value[leaf].sum(axis=0) / self.n_trees
+        return proba
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_.take(self.predict_proba(X).argmax(axis=1))
+
+    def save(self, path: str = QUANTIZED_MODEL_PATH):
+        """Save as a memory-mappable .npy bundle directory."""
+        arrays = {
+            "feature": self.feature,
+            "threshold": self.threshold,
+            "right": self.right,
+            "roots": self.roots,
+            "leaf_offsets": self.leaf_offsets,
+            "classes": self.classes_,
+        }
+        if self.left is not None:
+            arrays["left"] = self.left
+        if self.leaf_count is not None:
+            arrays["leaf_count"] = self.leaf_count
+        else:
+            arrays["leaf_value"] = self.leaf_value
+        save_array_bundle(path, arrays, {"feature_names": self.feature_names, "max_depth": self.max_depth, "source_hash": self.source_hash})
+
+    @classmethod
+    def load(cls, path: str = QUANTIZED_MODEL_PATH, mmap_mode: str = 'r'):
+        """Load a saved bundle; node arrays are read-only memory maps unless mmap_mode is None."""
+        arrays, meta = load_array_bundle(path, mmap_mode)
+        return cls(
+            feature=arrays["feature"],
+            threshold=arrays["threshold"],
+            right=arrays["right"],
+            left=arrays.get("left"),
+            roots=arrays["roots"],
+            leaf_offsets=arrays["leaf_offsets"],
+            leaf_count=arrays.get("leaf_count"),
+            leaf_value=arrays.get("leaf_value"),
+            classes=arrays["classes"],
+            feature_names=meta["feature_names"],
+            max_depth=meta["max_depth"],
+            source_hash=meta.get("source_hash", ""),
+        )
+
+def export_quantized_forest(model_path: str = None, output_path: str = None) -> QuantizedForest:
+    """
+    Quantize a trained joblib forest and save it next to the model.
+
+    Defaults to the current model (registry CURRENT, else models/), saved
+    into its version directory.
+    """
+    import joblib
+    from src.models.registry import MODEL_FILE, QUANTIZED_BUNDLE, add_bundle, current_artifacts
+
+    paths = current_artifacts()
+    model_path = model_path or paths[MODEL_FILE]
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Trained model not found at {model_path}.")
+    forest = QuantizedForest.from_model(joblib.load(model_path))
+    forest.source_hash = file_sha256(model_path)
+    if output_path is None and paths["version"] is not None:
+        output_path = add_bundle(paths["version"], QUANTIZED_BUNDLE, forest.save)
+    else:
+        output_path = output_path or paths[QUANTIZED_BUNDLE]
+        forest.save(output_path)
+    size = sum(os.path.getsize(os.path.join(output_path, name)) for name in os.listdir(output_path))
+    print(f"Quantized {forest.n_trees} trees ({forest.node_count} nodes) into {output_path}: "
+          f"{size / 1024.0:.1f} KB vs {os.path.getsize(model_path) / 1024.0:.1f} KB joblib.")
+    return forest
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the trained forest as a compact quantized bundle")
+    parser.add_argument("--model", type=str, default=None, help="Path to the trained joblib model (default: the registry's CURRENT version)")
+    parser.add_argument("--output", type=str, default=None, help="Bundle directory to write (default: next to the model)")
+    args = parser.parse_args()
+    export_quantized_forest(args.model, args.output)
@@ -0,0 +1,250 @@
+# src/models/registry.py
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import stat
+import tempfile
+from datetime import datetime, timezone
+from src.models.artifacts import MANIFEST_NAME, file_sha256
+
+REGISTRY_PATH = os.path.join("models", "registry")
+VERSIONS_DIR = "versions"
+MODEL_FILE = "model.joblib"
+FEATURE_ORDER_FILE = "feature_order.txt"
+META_FILE = "meta.json"
+# Bundles compiled from a version's model, stored next to it and checked against its model_sha256
+FLAT_BUNDLE = "model.flat"
+QUANTIZED_BUNDLE = "model.quantized"
+LOOKUP_BUNDLE = "model.lookup"
+BUNDLES = [FLAT_BUNDLE, QUANTIZED_BUNDLE, LOOKUP_BUNDLE]
+# Pointer files, each holding one version id
+CURRENT = "CURRENT"
+SHADOW = "SHADOW"
+
+# Where train writes each artifact, and where everything is read from while the registry has no CURRENT version
+LEGACY_PATHS = {
+    MODEL_FILE: os.path.join("models", "random_forest_titanic_model.joblib"),
+    FEATURE_ORDER_FILE: os.path.join("models", "feature_order.txt"),
+    META_FILE: os.path.join("models", "random_forest_titanic_model.meta.json"),
+    FLAT_BUNDLE: os.path.join("models", "random_forest_titanic_model.flat"),
+    QUANTIZED_BUNDLE: os.path.join("models", "random_forest_titanic_model.quantized"),
+    LOOKUP_BUNDLE: os.path.join("models", "random_forest_titanic_model.lookup"),
+}
+
+def version_id(model_path: str, feature_order_path: str) -> str:
+    """Content hash of a model and its feature order; identical artifacts always get the same id."""
+    digest = hashlib.sha256((file_sha256(model_path) + file_sha256(feature_order_path)).encode('ascii'))
+    return digest.hexdigest()[:16]
+
+def version_path(version: str, registry_path: str = REGISTRY_PATH) -> str:
+    return os.path.join(registry_path, VERSIONS_DIR, version)
+
+def publish(model_path: str, feature_order_path: str, meta: dict = None, registry_path: str = REGISTRY_PATH,
+            activate: bool = True, bundles: dict = None) -> str:
+    """
+    Copy a model and its feature order into the registry as an immutable, hash-named version.
+
+    bundles maps bundle names (FLAT_BUNDLE, ...) to bundle directories
+    compiled from this model, which are copied in too. The version
+    directory is assembled under a temporary name and renamed into place,
+    so readers either see all of its files or no directory at all.
+    Publishing the same artifacts again reuses the existing version and
+    only adds bundles it lacks. With activate, the CURRENT pointer is then
+    switched to it. Returns the version id.
+    """
+    version = version_id(model_path, feature_order_path)
+    target = version_path(version, registry_path)
+    model_sha256 = file_sha256(model_path)
+    bundles = {name: path for name, path in (bundles or {}).items() if bundle_source_hash(path) == model_sha256}
+    if os.path.exists(target):
+        for name, bundle_path in bundles.items():
+            if not os.path.exists(os.path.join(target, name)):
+                add_bundle(version, name, lambda path, source=bundle_path: shutil.copytree(source, path, dirs_exist_ok=True),
+                           registry_path)
+    else:
+        versions_dir = os.path.dirname(target)
+        os.makedirs(versions_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=versions_dir)
+        try:
+            shutil.copyfile(model_path, os.path.join(staging, MODEL_FILE))
+            shutil.copyfile(feature_order_path, os.path.join(staging, FEATURE_ORDER_FILE))
+            with open(os.path.join(staging, META_FILE), 'w') as f:
+                json.dump({
+                    **(meta or {}),
+                    "version": version,
+                    "published_at": datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+                    "model_sha256": model_sha256,
+                }, f, indent=2)
+            for name in [MODEL_FILE, FEATURE_ORDER_FILE, META_FILE]:
+                os.chmod(os.path.join(staging, name), stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+            for name, bundle_path in bundles.items():
+                shutil.copytree(bundle_path, os.path.join(staging, name))
+            os.chmod(staging, 0o755)
+            os.rename(staging, target)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+            # Another process published the same content first
+            if not os.path.exists(target):
+                raise
+    if activate:
+        set_pointer(CURRENT, version, registry_path)
+    return version
+
+def bundle_source_hash(path: str) -> str:
+    """sha256 of the joblib model a compiled bundle was built from, or None if there is no readable bundle."""
+    try:
+        with open(os.path.join(path, MANIFEST_NAME), 'r') as f:
+            return json.load(f)["meta"].get("source_hash")
+    except (OSError, ValueError, KeyError):
+        return None
+
+def add_bundle(version: str, name: str, save, registry_path: str = REGISTRY_PATH) -> str:
+    """
+    Add (or replace) a bundle compiled from a version's model, e.g. the lookup table built later.
+
+    save(path) writes the bundle into an empty temporary directory inside
+    the version, which is then renamed into place. Returns the bundle path.
+    """
+    directory = version_path(version, registry_path)
+    if not os.path.exists(os.path.join(directory, META_FILE)):
+        logging.error(f"Model version {version} is not in the registry at {registry_path}.")
+        raise FileNotFoundError(f"Model version {version} is not in the registry at {registry_path}.")
+    target = os.path.join(directory, name)
+    staging = tempfile.mkdtemp(prefix=f".{name}-", dir=directory)
+    try:
+        save(staging)
+        os.chmod(staging, 0o755)
+        if os.path.exists(target):
+            # Readers that already mapped the old files keep them; new readers find the new bundle
+            retired = tempfile.mkdtemp(prefix=f".{name}-retired-", dir=directory)
+            os.rename(target, os.path.join(retired, name))
+            os.rename(staging, target)
+            shutil.rmtree(retired, ignore_errors=True)
+        else:
+            os.rename(staging, target)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return target
+
+def current_artifacts(registry_path: str = REGISTRY_PATH, version: str = None) -> dict:
+    """
+    Paths of every artifact (MODEL_FILE, FEATURE_ORDER_FILE, META_FILE and the bundles) of one version.
+
+    The version defaults to CURRENT, read once, so all paths belong to the
+    same version even if the pointer moves meanwhile. Without a CURRENT
+    version, the LEGACY_PATHS under models/ are returned. The "version"
+    entry holds the id, or None for the legacy paths.
+    """
+    version = version or read_pointer(CURRENT, registry_path)
+    if version is None:
+        return {**LEGACY_PATHS, "version": None}
+    directory = version_path(version, registry_path)
+    return {**{name: os.path.join(directory, name) for name in LEGACY_PATHS}, "version": version}
+
+def set_pointer(name: str, version: str, registry_path: str = REGISTRY_PATH):
+    """Atomically point CURRENT or SHADOW at a published version (None removes the pointer)."""
+    path = os.path.join(registry_path, name)
+    if version is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    if not os.path.exists(os.path.join(version_path(version, registry_path), META_FILE)):
+        logging.error(f"Model version {version} is not in the registry at {registry_path}.")
+        raise FileNotFoundError(f"Model version {version} is not in the registry at {registry_path}.")
+    with open(path + ".tmp", 'w') as f:
+        f.write(version + "\n")
+    os.replace(path + ".tmp", path)
+
+def read_pointer(name: str, registry_path: str = REGISTRY_PATH) -> str:
+    """The version id a pointer holds, or None if it is not set."""
+    try:
+        with open(os.path.join(registry_path, name), 'r') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def pointer_stat(name: str, registry_path: str = REGISTRY_PATH):
+    """Cheap change marker for a pointer; the inode changes on every os.replace."""
+    try:
+        st = os.stat(os.path.join(registry_path, name))
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns)
+
+def load_version(version: str, registry_path: str = REGISTRY_PATH):
+    """Load one version. Returns (model, feature_order, meta)."""
+    import joblib
+
+    path = version_path(version, registry_path)
+    if not os.path.exists(os.path.join(path, META_FILE)):
+        logging.error(f"Model version {version} is not in the registry at {registry_path}.")
+        raise FileNotFoundError(f"Model version {version} is not in the registry at {registry_path}.")
+    model = joblib.load(os.path.join(path, MODEL_FILE))
+    with open(os.path.join(path, FEATURE_ORDER_FILE), 'r') as f:
+        feature_order = [line.strip() for line in f if line.strip()]
+    with open(os.path.join(path, META_FILE), 'r') as f:
+        meta = json.load(f)
+    return model, feature_order, meta
+
+def list_versions(registry_path: str = REGISTRY_PATH) -> list:
+    """Metadata of every published version, oldest first."""
+    versions_dir = os.path.join(registry_path, VERSIONS_DIR)
+    if not os.path.isdir(versions_dir):
+        return []
+    metas = []
+    for name in os.listdir(versions_dir):
+        meta_path = os.path.join(versions_dir, name, META_FILE)
+        if not name.startswith(".") and os.path.exists(meta_path):
+            with open(meta_path, 'r') as f:
+                metas.append(json.load(f))
+    return sorted(metas, key=lambda meta: meta["published_at"])
+
+def prune(keep: int, registry_path: str = REGISTRY_PATH) -> list:
+    """Delete all but the newest keep versions, never the CURRENT or SHADOW one. Returns the removed ids."""
+    pinned = {read_pointer(CURRENT, registry_path), read_pointer(SHADOW, registry_path)}
+    versions = [meta["version"] for meta in list_versions(registry_path)]
+    removed = [version for version in versions[:max(0, len(versions) - keep)] if version not in pinned]
+    for version in removed:
+        shutil.rmtree(version_path(version, registry_path))
+    return removed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect and switch the versions in the model registry")
+    parser.add_argument("--registry", type=str, default=REGISTRY_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="Show published versions")
+    commands.add_parser("publish", help="Publish the model, feature order and compiled bundles last written by train to models/")
+    commands.add_parser("activate", help="Point CURRENT at a version (hot-swaps running predictors)").add_argument("version")
+    commands.add_parser("shadow", help="Score a version in shadow next to CURRENT").add_argument("version")
+    commands.add_parser("unshadow", help="Stop shadow scoring")
+    commands.add_parser("prune", help="Delete old versions").add_argument("--keep", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.command == "list":
+        current, shadow = read_pointer(CURRENT, args.registry), read_pointer(SHADOW, args.registry)
+        for meta in list_versions(args.registry):
+            marker = "current" if meta["version"] == current else "shadow" if meta["version"] == shadow else ""
+            oob = meta.get("oob", {}).get("accuracy")
+            print(f"{meta['version']}  {meta['published_at']}  {len(meta.get('trees', [])):>4} trees"
+                  f"{f'  oob accuracy {oob:.4f}' if oob is not None else ''}  {marker}")
+    elif args.command == "publish":
+        meta = None
+        if os.path.exists(LEGACY_PATHS[META_FILE]):
+            with open(LEGACY_PATHS[META_FILE], 'r') as f:
+                meta = json.load(f)
+        bundles = {name: LEGACY_PATHS[name] for name in BUNDLES if os.path.isdir(LEGACY_PATHS[name])}
+        print(publish(LEGACY_PATHS[MODEL_FILE], LEGACY_PATHS[FEATURE_ORDER_FILE], meta, registry_path=args.registry,
+                      bundles=bundles))
+    elif args.command == "activate":
+        set_pointer(CURRENT, args.version, args.registry)
+    elif args.command == "shadow":
+        set_pointer(SHADOW, args.version, args.registry)
+    elif args.command == "unshadow":
+        set_pointer(SHADOW, None, args.registry)
+    else:
+        print(f"Removed {len(prune(args.keep, args.registry))} versions.")
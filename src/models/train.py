@@ -1,22 +1,146 @@
 # src/models/train.py
 
-import pandas as pd
+import argparse
+import json
 import os
+import shutil
+from datetime import datetime, timezone
+import numpy as np
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, classification_report
 from sklearn.model_selection import train_test_split
 import joblib
+from src.data.columnar import DATA_FORMATS, processed_path, read_table, write_table
+from src.models.artifacts import MODEL_META_PATH, file_sha256
+from src.models.evaluate_error_rate import confusion_counts, metrics_from_confusion, report_from_confusion
+from src.models.flat_forest import FLAT_MODEL_PATH, FlatForest
+from src.models.quantized import QUANTIZED_MODEL_PATH, QuantizedForest
+from src.models.registry import FLAT_BUNDLE, META_FILE, MODEL_FILE, QUANTIZED_BUNDLE, current_artifacts, publish
+from src.utils.metrics import path_bytes, quiet, span
 
-def train_model():
-    processed_data_path = "data/processed"
-    train_processed_path = os.path.join(processed_data_path, "train_processed.csv")
+# Forest settings used unless overridden, e.g. by the best parameters found by src/models/tune.py
+DEFAULT_MODEL_PARAMS = {'n_estimators': 100, 'random_state': 42, 'n_jobs': -1}
+# Parameters that only affect how a forest is fitted, not the trees; the only ones --grow can change
+RUNTIME_PARAMS = ['n_jobs', 'verbose']
+
+def load_model_meta(model, meta_path: str = MODEL_META_PATH) -> dict:
+    """Provenance of the saved model; models trained before it was recorded get one 'unknown' entry per tree."""
+    if os.path.exists(meta_path):
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        if len(meta["trees"]) == len(model.estimators_):
+            return meta
+    return {"generation": 0, "trees": [{"generation": 0, "trained_at": None, "data_sha256": None} for _ in model.estimators_]}
+
+def load_meta_flag(name: str, meta_path: str = MODEL_META_PATH) -> bool:
+    with open(meta_path, 'r') as f:
+        return bool(json.load(f).get(name))
+
+def tree_provenance(generation: int, data_path: str, n_trees: int, n_samples: int) -> list:
+    trained_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    data_sha256 = file_sha256(data_path) if os.path.isfile(data_path) else None
+    return [
+        {"generation": generation, "trained_at": trained_at, "data_sha256": data_sha256, "n_samples": n_samples}
+        for _ in range(n_trees)
+    ]
+
+def grow_forest(model, X_train, y_train, n_new: int, max_trees: int = None):
+    """
+    Append n_new trees fitted on (X_train, y_train) to a fitted forest, keeping the existing trees.
+
+    With max_trees, the oldest trees are then retired so that at most
+    max_trees remain. Returns the number of trees retired.
+    """
+    # Out-of-bag scores of the old trees say nothing about the grown forest, so none are computed or kept
+    model.oob_score = False
+    for attribute in ['oob_score_', 'oob_decision_function_']:
+        if hasattr(model, attribute):
+            delattr(model, attribute)
+    model.warm_start = True
+    model.n_estimators = len(model.estimators_) + n_new
+    model.fit(X_train, y_train)
+    model.warm_start = False
+
+    retired = 0
+    if max_trees and len(model.estimators_) > max_trees:
+        retired = len(model.estimators_) - max_trees
+        model.estimators_ = model.estimators_[retired:]
+        model.n_estimators = max_trees
+    return retired
+
+def remove_validation_sets():
+    """Delete validation_set in every format, so nothing evaluates a model on rows it was trained on."""
+    for data_format in DATA_FORMATS:
+        path = processed_path("validation_set", data_format)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+        else:
+            continue
+        print(f"Removed {path}: the model is trained on all rows, so it is no longer held out.")
+
+def oob_metrics(model, y) -> dict:
+    """
+    evaluate_error_rate's metrics from the out-of-bag predictions of a forest fitted with oob_score=True.
+
+    Each row is predicted only by the trees whose bootstrap sample left it
+    out; rows that were in every bootstrap sample have no such prediction
+    and are not scored.
+    """
+    decision = model.oob_decision_function_
+    scored = decision.sum(axis=1) > 0
+    y_true = y.to_numpy()[scored]
+    y_pred = model.classes_.take(decision[scored].argmax(axis=1))
+    matrix = confusion_counts(y_true, y_pred, model.classes_)
+    return {
+        **{name: float(value) for name, value in metrics_from_confusion(matrix, model.classes_).items()},
+        "labels": model.classes_.tolist(),
+        "confusion_matrix": matrix.tolist(),
+        "rows": len(y),
+        "rows_scored": int(scored.sum()),
+    }
+
+def train_model(data_format: str = 'csv', model_params: dict = None, grow: int = None, max_trees: int = None,
+                oob: bool = False, new_data: str = None):
+    """
+    Train the forest on the processed training data and save it.
+
+    With grow=K, the registry's CURRENT model (else the one in models/) is
+    loaded instead and K new trees fitted only on the newly arrived rows in
+    new_data (a processed-format file) are appended (warm_start), optionally
+    retiring the oldest trees beyond max_trees; of model_params only
+    RUNTIME_PARAMS apply then. The grown forest is validated on the
+    validation_set held out when the forest was first trained, which none of
+    its trees have seen; no new split is made. Per-tree provenance is kept
+    in MODEL_META_PATH. The model and feature order are then published to
+    the model registry as the CURRENT version, which running predictors
+    hot-swap to, together with the flat and quantized bundles.
+
+    With oob=True, no validation split is made: the forest is fitted on all
+    rows with oob_score=True and its out-of-bag metrics are stored under
+    "oob" in MODEL_META_PATH instead of writing validation_set. Any
+    validation_set left from an earlier run is deleted; meta "all_rows"
+    records this, and growing such a forest does not validate either,
+    since its old trees have seen every row.
+    """
+    if oob and grow:
+        raise ValueError("Out-of-bag evaluation needs a forest fitted in one go and cannot be combined with --grow.")
+    if grow and not new_data:
+        raise ValueError("--grow fits the new trees on newly arrived rows only; pass them with --new-data.")
+    if new_data and not grow:
+        raise ValueError("--new-data is only used with --grow.")
+    train_processed_path = new_data if grow else processed_path("train_processed", data_format)
+    validation_path = processed_path("validation_set", data_format)
     
     # Check if processed data exists
     if not os.path.exists(train_processed_path):
         raise FileNotFoundError(f"Processed training data not found at {train_processed_path}.")
     
     # Load the processed training data
-    train_data = pd.read_csv(train_processed_path)
+    with span("train.load", bytes_read=path_bytes(train_processed_path)) as timer:
+        train_data = read_table(train_processed_path)
+        timer.rows = len(train_data)
 
     # Define features and target
     if 'Survived' not in train_data.columns:
@@ -25,47 +149,126 @@ def train_model():
     X = train_data.drop('Survived', axis=1)
     y = train_data['Survived']
 
-    # Split the data into training and validation sets
-    X_train, X_val, y_train, y_val = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
+    params = {**DEFAULT_MODEL_PARAMS, **(model_params or {})}
+    structural = sorted(set(model_params or {}) - set(RUNTIME_PARAMS))
+    if grow and structural:
+        raise ValueError(f"--grow keeps the saved forest's parameters; cannot change {structural} "
+                         f"(only {RUNTIME_PARAMS} apply).")
+    if oob and not params.get('bootstrap', True):
+        raise ValueError("Out-of-bag evaluation needs bootstrap=True.")
+
+    if grow:
+        # --grow extends the registry's CURRENT version (the one being served), not whatever models/ last held
+        current = current_artifacts()
+        if not os.path.exists(current[MODEL_FILE]):
+            raise FileNotFoundError(f"Trained model not found at {current[MODEL_FILE]}; train once before using --grow.")
+        rf_classifier = joblib.load(current[MODEL_FILE])
+        if sorted(X.columns) != sorted(rf_classifier.feature_names_in_):
+            raise ValueError(f"New data has columns {list(X.columns)}; the forest was trained on "
+                             f"{list(rf_classifier.feature_names_in_)}.")
+        X_train, y_train = X[list(rf_classifier.feature_names_in_)], y
+        X = X_train
+
+        # The new trees never see the original holdout, so it stays held out; a forest trained on all rows has none
+        all_rows = os.path.exists(current[META_FILE]) and load_meta_flag("all_rows", current[META_FILE])
+        X_val = y_val = None
+        if not all_rows and os.path.exists(validation_path):
+            validation_data = read_table(validation_path)
+            X_val, y_val = validation_data[list(X.columns)], validation_data['Survived']
+
+        meta = load_model_meta(rf_classifier, current[META_FILE])
+        generation = meta["generation"] + 1
+
+        # A fresh seed per generation, so retiring trees never makes new trees repeat old bootstraps
+        rf_classifier.random_state = DEFAULT_MODEL_PARAMS['random_state'] + generation
+        rf_classifier.set_params(**{name: value for name, value in (model_params or {}).items() if name in RUNTIME_PARAMS})
+        with span("train.fit", rows=len(X_train)):
+            retired = grow_forest(rf_classifier, X_train, y_train, grow, max_trees)
+        trees = meta["trees"] + tree_provenance(generation, train_processed_path, grow, len(X_train))
+        meta = {"generation": generation, "trees": trees[retired:], **({"all_rows": True} if all_rows else {})}
+        print(f"Grew the forest by {grow} trees on {len(X_train)} new rows (generation {generation}), "
+              f"retired {retired}; {len(rf_classifier.estimators_)} trees in total.")
+    else:
+        if oob:
+            # Every row is used for training; each is scored by the trees that did not see it
+            X_train, y_train = X, y
+            X_val = y_val = None
+            remove_validation_sets()
+        else:
+            # Split the data into training and validation sets
+            X_train, X_val, y_train, y_val = train_test_split(
+                X, y, test_size=0.2, random_state=42, stratify=y
+            )
 
-    # Save the validation set with labels
-    validation_data = X_val.copy()
-    validation_data['Survived'] = y_val
-    validation_save_path = os.path.join(processed_data_path, "validation_set.csv")
-    validation_data.to_csv(validation_save_path, index=False)
+            # Save the validation set with labels
+            validation_data = X_val.copy()
+            validation_data['Survived'] = y_val
+            write_table(validation_data, validation_path)
 
-    # Initialize the Random Forest classifier
-    rf_classifier = RandomForestClassifier(
-        n_estimators=100,
-        random_state=42,
-        n_jobs=-1
-    )
+        # Initialize the Random Forest classifier (params is already a copy, so model_params is left as given)
+        if oob:
+            params['oob_score'] = True
+        rf_classifier = RandomForestClassifier(**params)
 
-    # Train the model
-    rf_classifier.fit(X_train, y_train)
+        # Train the model
+        with span("train.fit", rows=len(X_train)):
+            rf_classifier.fit(X_train, y_train)
+        meta = {"generation": 0, "trees": tree_provenance(0, train_processed_path, len(rf_classifier.estimators_), len(X_train))}
+        if oob:
+            meta["all_rows"] = True
 
-    # Make predictions on the validation set
-    y_pred = rf_classifier.predict(X_val)
+    if oob:
+        with span("train.validate", rows=len(y_train)):
+            meta["oob"] = oob_metrics(rf_classifier, y_train)
+        print(f"Out-of-bag Accuracy: {meta['oob']['accuracy']:.4f} ({meta['oob']['rows_scored']} of {meta['oob']['rows']} rows scored)")
+        print(f"Precision: {meta['oob']['precision']:.4f}")
+        print(f"Recall: {meta['oob']['recall']:.4f}")
+        print(f"F1-Score: {meta['oob']['f1']:.4f}")
+        if not quiet():
+            print("Classification Report:")
+            print(report_from_confusion(np.array(meta['oob']['confusion_matrix']), meta['oob']['labels']))
+    elif X_val is None:
+        print("No validation set: the forest's earlier trees were trained on all rows, or no holdout was found.")
+    else:
+        # Make predictions on the validation set
+        with span("train.validate", rows=len(X_val)):
+            y_pred = rf_classifier.predict(X_val)
 
-    # Evaluate the model
-    accuracy = accuracy_score(y_val, y_pred)
-    report = classification_report(y_val, y_pred)
+        # Evaluate the model
+        accuracy = accuracy_score(y_val, y_pred)
 
-    # Print evaluation metrics to console
-    print(f"Validation Accuracy: {accuracy:.4f}")
-    print("Classification Report:")
-    print(report)
+        # Print evaluation metrics to console
+        print(f"Validation Accuracy: {accuracy:.4f}")
+        if not quiet():
+            print("Classification Report:")
+            print(classification_report(y_val, y_pred))
 
     # Save the trained model to a file
     model_dir = "models"
     model_filename = "random_forest_titanic_model.joblib"
     model_path = os.path.join(model_dir, model_filename)
     os.makedirs(model_dir, exist_ok=True)
-    joblib.dump(rf_classifier, model_path)
+    with span("train.save"):
+        joblib.dump(rf_classifier, model_path)
     print(f"Trained model saved to {model_path}.")
 
+    # Record which generation and data each tree came from
+    meta["model_sha256"] = file_sha256(model_path)
+    with open(MODEL_META_PATH, 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    # Save the node arrays as a memory-mappable bundle that worker processes can share
+    flat_forest = FlatForest.from_model(rf_classifier)
+    flat_forest.source_hash = meta["model_sha256"]
+    flat_forest.save(FLAT_MODEL_PATH)
+    print(f"Memory-mappable model saved to {FLAT_MODEL_PATH}.")
+
+    # And the compact quantized form that is shipped to serving nodes
+    quantized_forest = QuantizedForest.from_model(rf_classifier)
+    quantized_forest.source_hash = meta["model_sha256"]
+    quantized_forest.save(QUANTIZED_MODEL_PATH)
+    print(f"Quantized model saved to {QUANTIZED_MODEL_PATH}.")
+
     # Save the feature order to a file
     feature_order = list(X.columns)
     feature_order_save_path = os.path.join(model_dir, "feature_order.txt")
@@ -73,5 +276,22 @@ def train_model():
         for feature in feature_order:
             f.write(f"{feature}\n")
 
+    version = publish(model_path, feature_order_save_path, meta,
+                      bundles={FLAT_BUNDLE: FLAT_MODEL_PATH, QUANTIZED_BUNDLE: QUANTIZED_MODEL_PATH})
+    print(f"Published model version {version} to the registry.")
+
 if __name__ == "__main__":
-    train_model()
+    parser = argparse.ArgumentParser(description="Train the Titanic survival model")
+    parser.add_argument("--format", choices=DATA_FORMATS, default='csv', help="Format of the processed data files")
+    parser.add_argument("--params", type=str, default=None, help="JSON file of RandomForestClassifier parameters (e.g. models/best_params.json from src.models.tune)")
+    parser.add_argument("--grow", type=int, default=None, metavar="K", help="Append K trees fitted on --new-data to the saved model")
+    parser.add_argument("--new-data", type=str, default=None, help="With --grow, processed file (.csv or .cols) of the newly arrived rows")
+    parser.add_argument("--max-trees", type=int, default=None, help="With --grow, retire the oldest trees beyond this many")
+    parser.add_argument("--oob", action='store_true', help="Train on all rows and store out-of-bag metrics in the model metadata instead of writing a validation set")
+    args = parser.parse_args()
+
+    model_params = None
+    if args.params:
+        with open(args.params, 'r') as f:
+            model_params = json.load(f)
+    train_model(args.format, model_params, args.grow, args.max_trees, args.oob, args.new_data)
@@ -0,0 +1,193 @@
+# src/models/tune.py
+
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import ParameterGrid, ParameterSampler
+from src.data.columnar import DATA_FORMATS
+from src.data.split import split_data
+
+SEARCH_SPACE = {
+    'n_estimators': [50, 100, 200, 400],
+    'max_depth': [None, 6, 10, 16],
+    'min_samples_leaf': [1, 2, 4, 8],
+    'max_features': ['sqrt', 'log2', None],
+}
+RESULTS_PATH = os.path.join("models", "tuning_results.csv")
+BEST_PARAMS_PATH = os.path.join("models", "best_params.json")
+LATENCY_REPEATS = 20
+
+# Validation data of the current worker process, set once by _init_worker
+_data = None
+
+def setup_logging():
+    """Set up logging to file and console."""
+    logger = logging.getLogger()
+    logger.setLevel(logging.INFO)
+
+    # Remove any existing handlers to prevent duplicate logs
+    if logger.hasHandlers():
+        logger.handlers.clear()
+
+    formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+
+    file_handler = logging.FileHandler('tuning.log')
+    file_handler.setLevel(logging.INFO)
+    file_handler.setFormatter(formatter)
+    logger.addHandler(file_handler)
+
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setLevel(logging.INFO)
+    console_handler.setFormatter(formatter)
+    logger.addHandler(console_handler)
+
+def _init_worker(X_train, X_val, y_train, y_val):
+    global _data
+    _data = (X_train, X_val, y_train, y_val)
+
+def run_trial(params: dict, n_jobs: int) -> dict:
+    """
+    Fit one forest in the worker and measure it.
+
+    predict_ms is the best single-row predict_proba latency over
+    LATENCY_REPEATS calls with the same n_jobs the trial was fitted with.
+    """
+    X_train, X_val, y_train, y_val = _data
+    model = RandomForestClassifier(**params, random_state=42, n_jobs=n_jobs)
+
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_s = time.perf_counter() - start
+
+    accuracy = float((model.predict(X_val) == y_val.to_numpy()).mean())
+
+    row = X_val.iloc[:1]
+    predict_s = float("inf")
+    for _ in range(LATENCY_REPEATS):
+        start = time.perf_counter()
+        model.predict_proba(row)
+        predict_s = min(predict_s, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    model.predict_proba(X_val)
+    batch_s = time.perf_counter() - start
+
+    return {
+        **params,
+        "accuracy": accuracy,
+        "fit_s": fit_s,
+        "predict_ms": predict_s * 1000.0,
+        "batch_us_per_row": batch_s * 1e6 / len(X_val),
+        "accuracy_per_ms": accuracy / (predict_s * 1000.0),
+    }
+
+def candidates(mode: str, space: dict, n_iter: int, seed: int) -> list:
+    if mode == 'random':
+        return list(ParameterSampler(space, n_iter=n_iter, random_state=seed))
+    return list(ParameterGrid(space))
+
+def _run_round(pool: ProcessPoolExecutor, trials: list, n_jobs: int, round_index: int) -> list:
+    results = []
+    for result in pool.map(run_trial, trials, [n_jobs] * len(trials)):
+        result["round"] = round_index
+        results.append(result)
+        logging.info(f"[round {round_index}] {json.dumps({k: result[k] for k in trials[0]})} "
+                     f"accuracy={result['accuracy']:.4f} fit={result['fit_s']:.2f}s predict={result['predict_ms']:.2f}ms")
+    return results
+
+def tune(mode: str = 'grid', n_iter: int = 20, cores_per_trial: int = 1, max_workers: int = None,
+         eta: int = 3, min_estimators: int = 25, data_format: str = 'csv', seed: int = 42) -> pd.DataFrame:
+    """
+    Search forest hyperparameters and return the results table.
+
+    Trials run in a process pool of max_workers processes, each fitting with
+    n_jobs=cores_per_trial; by default max_workers is cpu_count //
+    cores_per_trial so the machine is not oversubscribed.
+
+    mode='halving' runs successive halving with n_estimators as the budget:
+    every candidate is fitted with min_estimators trees, the best 1/eta
+    (by validation accuracy) advance with eta times more trees, and so on up
+    to the largest n_estimators in the search space.
+    """
+    setup_logging()
+    logging.info(f"=== Starting Hyperparameter Search ({mode}) ===")
+
+    X_train, X_val, y_train, y_val = split_data(data_format)
+    cpu_count = os.cpu_count() or 1
+    cores_per_trial = max(1, min(cores_per_trial, cpu_count))
+    max_workers = max_workers or max(1, cpu_count // cores_per_trial)
+    logging.info(f"{max_workers} worker processes x {cores_per_trial} cores per trial ({cpu_count} cores available).")
+
+    results = []
+    with ProcessPoolExecutor(max_workers, initializer=_init_worker, initargs=(X_train, X_val, y_train, y_val)) as pool:
+        if mode == 'halving':
+            space = {name: values for name, values in SEARCH_SPACE.items() if name != 'n_estimators'}
+            survivors = candidates('grid', space, n_iter, seed)
+            max_estimators = max(SEARCH_SPACE['n_estimators'])
+            n_estimators = min_estimators
+            round_index = 0
+            while True:
+                trials = [{**params, 'n_estimators': n_estimators} for params in survivors]
+                round_results = _run_round(pool, trials, cores_per_trial, round_index)
+                results.extend(round_results)
+                if n_estimators >= max_estimators or len(survivors) == 1:
+                    break
+                keep = max(1, math.ceil(len(survivors) / eta))
+                order = np.argsort([-result['accuracy'] for result in round_results], kind='stable')
+                survivors = [survivors[i] for i in order[:keep]]
+                n_estimators = min(n_estimators * eta, max_estimators)
+                round_index += 1
+        else:
+            results = _run_round(pool, candidates(mode, SEARCH_SPACE, n_iter, seed), cores_per_trial, 0)
+
+    table = pd.DataFrame(results).sort_values('accuracy_per_ms', ascending=False).reset_index(drop=True)
+    logging.info("=== Hyperparameter Search Completed ===")
+    return table
+
+def save_results(table: pd.DataFrame, results_path: str = RESULTS_PATH, best_params_path: str = BEST_PARAMS_PATH,
+                 objective: str = 'accuracy_per_ms'):
+    """Write the results table and the best parameters by objective."""
+    os.makedirs(os.path.dirname(results_path), exist_ok=True)
+    table.to_csv(results_path, index=False)
+
+    # In halving mode only the last round's candidates were fitted with the full budget
+    final_round = table[table['round'] == table['round'].max()]
+    best = final_round.sort_values(objective, ascending=False).iloc[0]
+    best_params = {name: best[name] for name in SEARCH_SPACE}
+    best_params = {
+        name: None if value is None or (isinstance(value, float) and math.isnan(value))
+        else int(value) if isinstance(value, (int, np.integer, float)) and float(value).is_integer()
+        else value
+        for name, value in best_params.items()
+    }
+    with open(best_params_path, 'w') as f:
+        json.dump(best_params, f, indent=2)
+
+    columns = list(SEARCH_SPACE) + ['round', 'accuracy', 'fit_s', 'predict_ms', 'batch_us_per_row', 'accuracy_per_ms']
+    print(table[columns].head(15).to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+    print(f"\nBest by {objective}: {best_params} "
+          f"(accuracy {best['accuracy']:.4f}, {best['predict_ms']:.2f} ms per prediction)")
+    print(f"Results saved to {results_path}; best parameters saved to {best_params_path}.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel hyperparameter search for the Titanic forest")
+    parser.add_argument("--mode", choices=['grid', 'random', 'halving'], default='halving')
+    parser.add_argument("--n-iter", type=int, default=20, help="Number of candidates in random mode")
+    parser.add_argument("--cores-per-trial", type=int, default=1, help="n_jobs given to each trial's forest")
+    parser.add_argument("--max-workers", type=int, default=None, help="Concurrent trials (default: cpu_count // cores-per-trial)")
+    parser.add_argument("--eta", type=int, default=3, help="Halving factor: keep the best 1/eta candidates per round")
+    parser.add_argument("--min-estimators", type=int, default=25, help="Trees per candidate in the first halving round")
+    parser.add_argument("--objective", choices=['accuracy_per_ms', 'accuracy'], default='accuracy_per_ms', help="Column used to pick the best parameters")
+    parser.add_argument("--format", choices=DATA_FORMATS, default='csv', help="Format of the processed data files")
+    args = parser.parse_args()
+
+    table = tune(args.mode, args.n_iter, args.cores_per_trial, args.max_workers, args.eta, args.min_estimators, args.format)
+    save_results(table, objective=args.objective)
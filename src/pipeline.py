@@ -1,13 +1,163 @@
 # src/pipeline.py
 
-from src.data.download import download_titanic_dataset
-from src.data.preprocess import preprocess_data
-from src.models.train import train_model
+import argparse
+import hashlib
+import importlib
+import importlib.util
+import json
+import os
+from src.data.columnar import DATA_FORMATS, processed_path
+from src.data.download import ARCHIVE_NAME, MIRROR_ENV
+from src.models.artifacts import FEATURE_ORDER_PATH, MODEL_META_PATH, MODEL_PATH, file_sha256
+from src.models.flat_forest import FLAT_MODEL_PATH
+from src.models.quantized import QUANTIZED_MODEL_PATH
 
-def run_pipeline():
-    download_titanic_dataset()
-    preprocess_data()
-    train_model()
+PIPELINE_STATE_PATH = os.path.join(".pipeline", "state.json")
+
+class Stage:
+    """
+    One pipeline step: module.function called with params, reading inputs and writing outputs.
+
+    code lists the extra modules whose source is part of the stage's code
+    version, on top of the stage's own module.
+    """
+
+    def __init__(self, name: str, module: str, function: str, inputs: list, outputs: list,
+                 params: dict = None, code: list = None):
+        self.name = name
+        self.module = module
+        self.function = function
+        self.inputs = inputs
+        self.outputs = outputs
+        self.params = params or {}
+        self.code = [module] + (code or [])
+
+    def fingerprint(self) -> str:
+        """Hash of the stage's input contents, code version and parameters."""
+        record = {
+            "inputs": {path: path_sha256(path) for path in self.inputs},
+            "code": {module: file_sha256(importlib.util.find_spec(module).origin) for module in self.code},
+            "params": self.params,
+        }
+        return hashlib.sha256(json.dumps(record, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def run(self):
+        getattr(importlib.import_module(self.module), self.function)(**self.params)
+
+def path_sha256(path: str) -> str:
+    """Content hash of a file, or of every file under a directory (e.g. a columnar bundle)."""
+    if os.path.isfile(path):
+        return file_sha256(path)
+    if not os.path.isdir(path):
+        return None
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            digest.update(os.path.relpath(file_path, path).encode('utf-8'))
+            digest.update(file_sha256(file_path).encode('utf-8'))
+    return digest.hexdigest()
+
+def build_stages(data_format: str = 'csv', chunk_size: int = None, oob: bool = False, mirror: str = None) -> list:
+    """The download -> preprocess -> train DAG, in execution order."""
+    raw = [os.path.join("data", "raw", "train.csv"), os.path.join("data", "raw", "test.csv")]
+    processed = [processed_path("train_processed", data_format), processed_path("test_processed", data_format)]
+    mirror = mirror or os.environ.get(MIRROR_ENV)
+    return [
+        # With a mirror, a new titanic.zip there reruns the download; otherwise the dataset cache makes reruns offline
+        Stage(
+            "download", "src.data.download", "download_titanic_dataset",
+            inputs=[os.path.join(mirror, ARCHIVE_NAME)] if mirror else [], outputs=raw, params={"mirror": mirror},
+        ),
+        Stage(
+            "preprocess", "src.data.preprocess", "preprocess_data", inputs=raw, outputs=processed,
+            params={"data_format": data_format, "chunk_size": chunk_size}, code=["src.data.columnar"],
+        ),
+        Stage(
+            "train", "src.models.train", "train_model", inputs=processed[:1],
+            outputs=[MODEL_PATH, MODEL_META_PATH, FEATURE_ORDER_PATH, FLAT_MODEL_PATH, QUANTIZED_MODEL_PATH]
+                    + ([] if oob else [processed_path("validation_set", data_format)]),
+            params={"data_format": data_format, "oob": oob},
+            code=["src.data.columnar", "src.models.artifacts", "src.models.flat_forest", "src.models.quantized",
+                  "src.models.evaluate_error_rate"],
+        ),
+    ]
+
+def load_state(state_path: str = PIPELINE_STATE_PATH) -> dict:
+    if not os.path.exists(state_path):
+        return {}
+    with open(state_path, 'r') as f:
+        return json.load(f)
+
+def save_state(state: dict, state_path: str = PIPELINE_STATE_PATH):
+    os.makedirs(os.path.dirname(state_path), exist_ok=True)
+    with open(state_path + ".tmp", 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(state_path + ".tmp", state_path)
+
+def is_cached(stage: Stage, record: dict, fingerprint: str) -> bool:
+    """A stage is up to date if its fingerprint matches and its recorded outputs are unchanged."""
+    if not record or record.get("fingerprint") != fingerprint:
+        return False
+    return all(path_sha256(path) == record["outputs"].get(path) for path in stage.outputs)
+
+def run_pipeline(data_format: str = 'csv', chunk_size: int = None, force: list = None,
+                 dry_run: bool = False, state_path: str = PIPELINE_STATE_PATH, oob: bool = False, mirror: str = None) -> list:
+    """
+    Run the stages whose fingerprint or outputs changed since their last successful run.
+
+    force names stages to rerun regardless ('all' reruns everything). With
+    dry_run, only reports what would execute. Returns the names of the
+    stages that ran (or would run).
+    """
+    force = set(force or [])
+    state = load_state(state_path)
+    stages = build_stages(data_format, chunk_size, oob, mirror)
+    pending_outputs = set()
+    executed = []
+
+    for stage in stages:
+        if dry_run and pending_outputs.intersection(stage.inputs):
+            # Upstream output will change, so this fingerprint cannot be known yet
+            reason = "upstream stage will run"
+        else:
+            fingerprint = stage.fingerprint()
+            if stage.name in force or 'all' in force:
+                reason = "forced"
+            elif is_cached(stage, state.get(stage.name), fingerprint):
+                print(f"[skip] {stage.name}: up to date")
+                continue
+            elif stage.name not in state:
+                reason = "no previous run"
+            elif state[stage.name]["fingerprint"] == fingerprint:
+                reason = "outputs missing or modified"
+            else:
+                reason = "inputs, code or parameters changed"
+
+        executed.append(stage.name)
+        if dry_run:
+            print(f"[would run] {stage.name}: {reason}")
+            pending_outputs.update(stage.outputs)
+            continue
+
+        print(f"[run] {stage.name}: {reason}")
+        stage.run()
+        state[stage.name] = {
+            "fingerprint": fingerprint,
+            "outputs": {path: path_sha256(path) for path in stage.outputs},
+        }
+        save_state(state, state_path)
+    return executed
 
 if __name__ == "__main__":
-    run_pipeline()
+    stage_names = [stage.name for stage in build_stages()]
+    parser = argparse.ArgumentParser(description="Download, preprocess and train, skipping stages that are up to date")
+    parser.add_argument("--format", choices=DATA_FORMATS, default='csv', help="Format of the processed data files ('columnar' skips CSV parsing between stages)")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Stream preprocessing in chunks of this many rows")
+    parser.add_argument("--force", action='append', choices=stage_names + ['all'], default=[], help="Rerun this stage even if it is up to date (repeatable)")
+    parser.add_argument("--dry-run", action='store_true', help="Only show which stages would run")
+    parser.add_argument("--oob", action='store_true', help="Train on all rows and evaluate out-of-bag instead of on a validation split")
+    parser.add_argument("--mirror", type=str, default=None, help=f"Directory with {ARCHIVE_NAME} to use instead of Kaggle (default: ${MIRROR_ENV})")
+    args = parser.parse_args()
+    run_pipeline(args.format, args.chunk_size, args.force, args.dry_run, oob=args.oob, mirror=args.mirror)
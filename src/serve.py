@@ -0,0 +1,344 @@
+# src/serve.py
+
+import argparse
+import asyncio
+import bisect
+import json
+import logging
+import sys
+import time
+from collections import deque
+import numpy as np
+from src.models.cache import PredictionCache
+from src.models.predictor import Predictor
+from src.utils.helpers import parse_inputs_bulk
+
+# Upper bounds (ms) of the request latency histogram buckets
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+# Largest request body accepted; a prediction request is a few hundred bytes
+MAX_BODY_BYTES = 64 * 1024
+# Most header lines accepted per request; longer lines than the stream limit (64 KiB) are rejected as well
+MAX_HEADERS = 100
+
+def setup_logging():
+    """Set up logging to file and console."""
+    logger = logging.getLogger()
+    logger.setLevel(logging.INFO)
+
+    # Remove any existing handlers to prevent duplicate logs
+    if logger.hasHandlers():
+        logger.handlers.clear()
+
+    # Formatter for log messages
+    formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+
+    # File handler
+    file_handler = logging.FileHandler('serving.log')
+    file_handler.setLevel(logging.INFO)
+    file_handler.setFormatter(formatter)
+    logger.addHandler(file_handler)
+
+    # Console handler
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setLevel(logging.INFO)
+    console_handler.setFormatter(formatter)
+    logger.addHandler(console_handler)
+
+class ServingStats:
+    """Request latency and batch size statistics exposed on /metrics."""
+
+    def __init__(self, max_batch_size: int, window: int = 10000):
+        self.latencies_ms = deque(maxlen=window)
+        self.latency_counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.batch_size_buckets = [1]
+        while self.batch_size_buckets[-1] < max_batch_size:
+            self.batch_size_buckets.append(min(self.batch_size_buckets[-1] * 2, max_batch_size))
+        self.batch_size_counts = [0] * len(self.batch_size_buckets)
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+
+    def record_latency(self, latency_ms: float):
+        self.requests += 1
+        self.latencies_ms.append(latency_ms)
+        self.latency_counts[bisect.bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+
+    def record_batch(self, batch_size: int):
+        self.batches += 1
+        self.batch_size_counts[bisect.bisect_left(self.batch_size_buckets, batch_size)] += 1
+
+    def quantile(self, q: float):
+        if not self.latencies_ms:
+            return None
+        ordered = sorted(self.latencies_ms)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def snapshot(self) -> dict:
+        latency_histogram = {f"le_{bound}": count for bound, count in zip(LATENCY_BUCKETS_MS, self.latency_counts)}
+        latency_histogram["le_inf"] = self.latency_counts[-1]
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "batches": self.batches,
+            "latency_ms": {
+                "p50": self.quantile(0.50),
+                "p99": self.quantile(0.99),
+                "window": len(self.latencies_ms),
+                "histogram": latency_histogram,
+            },
+            "batch_size_histogram": {
+                f"le_{bound}": count for bound, count in zip(self.batch_size_buckets, self.batch_size_counts)
+            },
+        }
+
+class MicroBatcher:
+    """
+    Collects concurrent prediction requests into micro-batches.
+
+    A batch is scored as soon as it holds max_batch_size requests or max_wait_ms
+    has passed since its first request arrived. Parsing and scoring run in a
+    worker thread (parse_inputs_bulk, then one vectorized predict_proba call),
+    so the event loop keeps accepting requests meanwhile.
+    """
+
+    def __init__(self, predictor: Predictor, stats: ServingStats, max_batch_size: int = 64, max_wait_ms: float = 5.0):
+        self.predictor = predictor
+        self.stats = stats
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = asyncio.Queue()
+
+    async def submit(self, raw_input):
+        """
+        Queue one raw 'input' string or 'features' dict and wait for its (prediction, survival_probability).
+
+        Raises ValueError if the input fails validation.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((raw_input, future))
+        return await future
+
+    def score(self, raw_inputs: list) -> list:
+        """Parse and score one batch; returns a (prediction, survival_probability) tuple or error message per input."""
+        results = [None] * len(raw_inputs)
+        parsed = []  # (original positions, valid columns) per input type
+        for kind in (str, dict):
+            positions = [i for i, raw_input in enumerate(raw_inputs) if isinstance(raw_input, kind)]
+            if not positions:
+                continue
+            columns, valid, errors = parse_inputs_bulk([raw_inputs[i] for i in positions])
+            for row, message in errors:
+                results[positions[row]] = message
+            parsed.append(([p for p, ok in zip(positions, valid) if ok], {f: c[valid] for f, c in columns.items()}))
+
+        positions = [p for group, _ in parsed for p in group]
+        if positions:
+            columns = {feature: np.concatenate([group[feature] for _, group in parsed]) for feature in parsed[0][1]}
+            predictions, probabilities = self.predictor.predict_batch(columns)
+            for position, prediction, probability in zip(positions, predictions, probabilities):
+                results[position] = (int(prediction), float(probability))
+        return results
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            self.stats.record_batch(len(batch))
+            raw_inputs = [item[0] for item in batch]
+            try:
+                results = await loop.run_in_executor(None, self.score, raw_inputs)
+            except Exception as e:
+                logging.exception("Error during batch prediction.")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(RuntimeError(str(e)))
+                continue
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, str):
+                    future.set_exception(ValueError(result))
+                else:
+                    future.set_result(result)
+
+class PredictionServer:
+    """Minimal HTTP/1.1 JSON server: POST /predict, GET /metrics, GET /health."""
+
+    def __init__(self, batcher: MicroBatcher, stats: ServingStats, max_body_bytes: int = MAX_BODY_BYTES):
+        self.batcher = batcher
+        self.stats = stats
+        self.max_body_bytes = max_body_bytes
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request_line = await reader.readline()
+                except ValueError:
+                    # Longer than the stream limit
+                    self.stats.errors += 1
+                    await self._respond(writer, 414, {"error": "Request line too long."}, keep_alive=False)
+                    break
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    self.stats.errors += 1
+                    await self._respond(writer, 400, {"error": "Malformed request line."}, keep_alive=False)
+                    break
+
+                headers = await self._read_headers(reader)
+                if headers is None:
+                    self.stats.errors += 1
+                    await self._respond(writer, 431, {"error": f"Header lines too long or more than {MAX_HEADERS} headers."},
+                                        keep_alive=False)
+                    break
+                content_length = headers.get('content-length', '') or '0'
+                if not content_length.isdigit():
+                    self.stats.errors += 1
+                    await self._respond(writer, 400, {"error": "Malformed Content-Length header."}, keep_alive=False)
+                    break
+                if int(content_length) > self.max_body_bytes:
+                    # The body is never read, so the connection cannot be reused
+                    self.stats.errors += 1
+                    await self._respond(writer, 413, {"error": f"Request body larger than {self.max_body_bytes} bytes."},
+                                        keep_alive=False)
+                    break
+                body = await reader.readexactly(int(content_length))
+
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection == 'keep-alive' or (version == 'HTTP/1.1' and connection != 'close')
+
+                status, payload = await self.dispatch(method, path, body)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_headers(self, reader: asyncio.StreamReader):
+        """Read header lines up to the blank line; None if there are too many or one is too long."""
+        headers = {}
+        for _ in range(MAX_HEADERS + 1):
+            try:
+                line = await reader.readline()
+            except ValueError:
+                return None
+            if line in (b'\r\n', b'\n', b''):
+                return headers
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        return None
+
+    async def dispatch(self, method: str, path: str, body: bytes):
+        if method == 'GET' and path == '/health':
+            return 200, {"status": "ok"}
+        if method == 'GET' and path == '/metrics':
+            metrics = self.stats.snapshot()
+            predictor = self.batcher.predictor
+            if predictor.cache is not None:
+                metrics["cache"] = predictor.cache.stats()
+            metrics["model_version"] = predictor.model_hash
+            metrics["shadow_version"] = predictor.shadow_version
+            shadow_stats = predictor.shadow_stats()
+            if shadow_stats:
+                metrics["shadow"] = shadow_stats
+            return 200, metrics
+        if method == 'POST' and path == '/predict':
+            return await self.predict(body)
+        return 404, {"error": f"No route for {method} {path}."}
+
+    async def predict(self, body: bytes):
+        start = time.perf_counter()
+        try:
+            request = json.loads(body or b'{}')
+            if isinstance(request.get('input'), str):
+                raw_input = request['input']
+            elif isinstance(request.get('features'), dict):
+                raw_input = request['features']
+            else:
+                raise ValueError("Request body must contain an 'input' string or a 'features' object.")
+        except Exception as e:
+            self.stats.errors += 1
+            return 400, {"error": str(e)}
+
+        try:
+            prediction, probability = await self.batcher.submit(raw_input)
+        except ValueError as e:
+            # Parsing happens with the batch, in the worker thread
+            self.stats.errors += 1
+            return 400, {"error": str(e)}
+        except Exception as e:
+            self.stats.errors += 1
+            return 500, {"error": f"Prediction failed: {e}"}
+
+        self.stats.record_latency((time.perf_counter() - start) * 1000.0)
+        return 200, {
+            "prediction": prediction,
+            "result": 'Survived' if prediction == 1 else 'Did Not Survive',
+            "survival_probability": probability,
+        }
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: dict, keep_alive: bool):
+        reasons = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 413: 'Payload Too Large', 414: 'URI Too Long',
+                   431: 'Request Header Fields Too Large', 500: 'Internal Server Error'}
+        body = json.dumps(payload).encode('utf-8')
+        head = (
+            f"HTTP/1.1 {status} {reasons.get(status, 'OK')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+async def serve(host: str = "127.0.0.1", port: int = 8000, max_batch_size: int = 64, max_wait_ms: float = 5.0,
+                cache_size: int = 10000, cache_db: str = None, max_body_bytes: int = MAX_BODY_BYTES):
+    """Load the model and serve predictions until cancelled."""
+    predictor = Predictor(cache=PredictionCache(cache_size, cache_db) if cache_size > 0 else None)
+    predictor.refresh()
+
+    stats = ServingStats(max_batch_size)
+    batcher = MicroBatcher(predictor, stats, max_batch_size, max_wait_ms)
+    app = PredictionServer(batcher, stats, max_body_bytes)
+    batch_task = asyncio.create_task(batcher.run())
+
+    server = await asyncio.start_server(app.handle_connection, host, port)
+    logging.info(f"Serving predictions on http://{host}:{port} "
+                 f"(max batch size {max_batch_size}, max wait {max_wait_ms} ms)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batch_task.cancel()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve Titanic survival predictions over HTTP/JSON")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    parser.add_argument("--max-batch-size", type=int, default=64, help="Maximum number of requests scored together")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0, help="Maximum time a request waits for its batch to fill")
+    parser.add_argument("--cache-size", type=int, default=10000, help="Maximum number of cached predictions (0 disables caching)")
+    parser.add_argument("--cache-db", type=str, default=None, help="SQLite file that keeps cached predictions across restarts")
+    parser.add_argument("--max-body-bytes", type=int, default=MAX_BODY_BYTES, help="Reject larger request bodies with 413")
+    args = parser.parse_args()
+
+    setup_logging()
+    try:
+        asyncio.run(serve(args.host, args.port, args.max_batch_size, args.max_wait_ms, args.cache_size, args.cache_db,
+                          args.max_body_bytes))
+    except KeyboardInterrupt:
+        logging.info("Server stopped.")
@@ -1,6 +1,28 @@
 # src/utils/helpers.py
 
+import csv
+import itertools
+import json
 import logging
+import os
+import re
+import numpy as np
+
+# Keys accepted by parse_input / parse_record (lower-cased)
+INPUT_KEYS = ['age', 'sex', 'class', 'sibsp', 'parch', 'fare', 'embarked']
+
+# Extra names accepted for input file columns only, so the Titanic CSV's own 'Pclass' header works
+FILE_COLUMN_ALIASES = {'pclass': 'class'}
+
+# Model feature each input key maps to
+FEATURE_FOR_KEY = {
+    'age': 'Age', 'sex': 'Sex', 'class': 'Pclass',
+    'sibsp': 'SibSp', 'parch': 'Parch', 'fare': 'Fare', 'embarked': 'Embarked',
+}
+FEATURE_ORDER = ['Pclass', 'Sex', 'Age', 'SibSp', 'Parch', 'Fare', 'Embarked']
+
+# Values used by parse_record for missing features
+DEFAULT_FEATURES = {'Age': 30.0, 'Sex': 0, 'Pclass': 0, 'SibSp': 0, 'Parch': 0, 'Fare': 32.2042, 'Embarked': 2}
 
 def parse_input(input_str: str) -> dict:
     """
@@ -12,12 +34,37 @@ def parse_input(input_str: str) -> dict:
     Returns:
         dict: Dictionary of processed input features.
     """
-    input_dict = {}
+    pairs = []
     for item in input_str.split(','):
         try:
             key, value = item.split('=')
-            key = key.strip().lower()
-            value = value.strip().lower()
+        except ValueError as ve:
+            logging.error(f"ValueError: {ve}")
+            raise ve
+        pairs.append((key, value))
+    return parse_record(pairs)
+
+def parse_record(record) -> dict:
+    """
+    Parses one record of raw input features into a dictionary with appropriate data types and encodings.
+
+    Args:
+        record (dict or list): Mapping (or list of pairs) of feature names to raw values,
+            using the same keys as parse_input. A mapping is a file row, so its keys
+            may also be FILE_COLUMN_ALIASES.
+
+    Returns:
+        dict: Dictionary of processed input features.
+    """
+    is_file_row = isinstance(record, dict)
+    items = record.items() if is_file_row else record
+    input_dict = {}
+    for key, value in items:
+        try:
+            key = str(key).strip().lower()
+            value = str(value).strip().lower()
+            if is_file_row:
+                key = FILE_COLUMN_ALIASES.get(key, key)
             
             if key == 'sex':
                 if value not in ['male', 'female']:
@@ -52,26 +99,207 @@ def parse_input(input_str: str) -> dict:
             logging.error(f"ValueError: {ve}")
             raise ve
         except Exception as e:
-            logging.error(f"Error parsing input item '{item}': {e}")
+            logging.error(f"Error parsing input item '{key}={value}': {e}")
             raise e
     
     # Assign default values for missing features if necessary
-    required_features = ['Age', 'Sex', 'Pclass', 'SibSp', 'Parch', 'Fare', 'Embarked']
-    for feature in required_features:
+    for feature in DEFAULT_FEATURES:
         if feature not in input_dict:
             if feature in ['Age', 'Fare']:
                 # Assign median values; replace with actual median as per your dataset
-                default_value = 30.0 if feature == 'Age' else 32.2042
-                input_dict[feature] = default_value
+                input_dict[feature] = DEFAULT_FEATURES[feature]
                 logging.info(f"Missing '{feature}' assigned default value: {input_dict[feature]}")
             elif feature == 'Sex':
-                input_dict[feature] = 0  # Default to 'male'
+                input_dict[feature] = DEFAULT_FEATURES[feature]  # Default to 'male'
                 logging.info(f"Missing '{feature}' assigned default value: {input_dict[feature]} (male)")
             elif feature == 'Embarked':
-                input_dict[feature] = 2  # Default to 'S'
+                input_dict[feature] = DEFAULT_FEATURES[feature]  # Default to 'S'
                 logging.info(f"Missing '{feature}' assigned default value: {input_dict[feature]} (S)")
             else:
-                input_dict[feature] = 0
+                input_dict[feature] = DEFAULT_FEATURES[feature]
                 logging.info(f"Missing '{feature}' assigned default value: {input_dict[feature]}")
     
     return input_dict
+
+def read_input_records(input_path: str, chunk_size: int = 10000):
+    """
+    Reads raw input records from a CSV or JSONL file in chunks.
+
+    Args:
+        input_path (str): Path to a CSV file with a header row, or a JSONL file (one object per line).
+        chunk_size (int): Maximum number of records per yielded chunk.
+
+    Yields:
+        list: Chunks of records (dicts of raw column values).
+    """
+    extension = os.path.splitext(input_path)[1].lower()
+    with open(input_path, 'r', newline='') as f:
+        if extension in ['.jsonl', '.ndjson']:
+            records = (json.loads(line) for line in f if line.strip())
+        else:
+            records = csv.DictReader(f)
+
+        chunk = []
+        for record in records:
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+def _split_items(entry: str):
+    """Split one 'key=value,...' string into ({key: value}, malformed_items) like parse_input does."""
+    pairs = {}
+    malformed = []
+    for item in entry.split(','):
+        parts = item.split('=')
+        if len(parts) != 2:
+            malformed.append(item)
+            continue
+        pairs[parts[0].strip().lower()] = parts[1].strip().lower()
+    return pairs, malformed
+
+def _split_strings(inputs):
+    """
+    Split many 'key=value,...' strings into one dict per row.
+
+    Well-formed rows are rewritten into a single JSON array and decoded in one
+    json.loads call, so the per-row work runs in C. If any row needs parse_input's
+    item-by-item handling (malformed items, embedded newlines or tabs), every
+    row goes through _split_items instead.
+
+    Returns:
+        tuple: (list of dicts, {row: [malformed items]})
+    """
+    text = "\n".join(inputs).lower()
+    # Any item without exactly one '=' makes the rewritten text invalid JSON
+    if text.count('\n') == len(inputs) - 1 and '\t' not in text:
+        if ' ' in text:
+            text = re.sub(r' *([=,\n]) *', r'\1', text.strip(' '))
+        escaped = text.replace('\\', '\\\\').replace('"', '\\"')
+        try:
+            records = json.loads('[{"' + escaped.replace('=', '":"').replace(',', '","').replace('\n', '"},{"') + '"}]')
+            return records, {}
+        except ValueError:
+            pass
+
+    records = []
+    malformed = {}
+    for row, entry in enumerate(inputs):
+        pairs, bad_items = _split_items(entry)
+        records.append(pairs)
+        if bad_items:
+            malformed[row] = bad_items
+    return records, malformed
+
+def _to_numbers(values: np.ndarray, dtype, present: np.ndarray):
+    """Convert an array of strings to dtype, returning the numbers and a mask of unparseable entries."""
+    numbers = np.zeros(len(values), dtype=dtype)
+    bad = np.zeros(len(values), dtype=bool)
+    if not present.any():
+        return numbers, bad
+    try:
+        numbers[present] = values[present].astype(dtype)
+    except (ValueError, OverflowError):
+        # Fall back to converting one at a time only for the column that failed
+        convert = float if dtype == np.float64 else int
+        for i in np.flatnonzero(present):
+            try:
+                numbers[i] = convert(values[i])
+            except (ValueError, OverflowError):
+                bad[i] = True
+    return numbers, bad
+
+def parse_inputs_bulk(inputs, feature_order: list = None):
+    """
+    Parses many inputs at once with the same validation and defaults as parse_input.
+
+    Args:
+        inputs (sequence): 'key1=value1,key2=value2,...' strings, or dicts of raw values
+            (e.g. rows of a CSV/JSONL file) using the same keys. For dicts, other keys are
+            ignored and empty values count as missing.
+        feature_order (list): Order of the returned columns; defaults to FEATURE_ORDER.
+
+    Returns:
+        tuple: (columns, valid, errors) where columns maps each feature to a typed NumPy
+            array in feature_order order, valid is a boolean mask of rows that parsed
+            cleanly, and errors is a list of (row_index, message) for the rest. Invalid
+            rows hold default values in columns.
+
+    Unlike parse_input, a key repeated within one input is only validated at its
+    last occurrence.
+    """
+    feature_order = feature_order or FEATURE_ORDER
+    n_rows = len(inputs)
+    messages = [[] for _ in range(n_rows)]
+
+    # Per feature: (raw value strings, mask of rows where the feature was given)
+    raw = {}
+    if n_rows and isinstance(inputs[0], dict):
+        # Rows from CSV/JSONL files: other columns are ignored and blank cells count as missing
+        column_keys = {}
+        for column in set().union(*(record.keys() for record in inputs)):
+            key = str(column).strip().lower()
+            key = FILE_COLUMN_ALIASES.get(key, key)
+            if key in FEATURE_FOR_KEY:
+                column_keys.setdefault(FEATURE_FOR_KEY[key], []).append(column)
+        for feature in DEFAULT_FEATURES:
+            values = np.full(n_rows, '', dtype=object)
+            for column in column_keys.get(feature, []):
+                cells = np.array(['' if value is None else str(value) for value in (record.get(column) for record in inputs)])
+                cells = np.char.lower(np.char.strip(cells))
+                values = np.where(cells != '', cells, values)
+            values = values.astype(str)
+            raw[feature] = (values, values != '')
+    else:
+        records, malformed = _split_strings(inputs)
+        for row, items in malformed.items():
+            messages[row].extend(f"Malformed item '{item}'. Expected 'key=value'." for item in items)
+
+        unrecognized = set().union(*records) - set(INPUT_KEYS)
+        if unrecognized:
+            logging.warning(f"Unrecognized features {sorted(unrecognized)} are being ignored.")
+        for key in ['class', 'sex', 'age', 'sibsp', 'parch', 'fare', 'embarked']:
+            present = np.fromiter(map(dict.__contains__, records, itertools.repeat(key)), dtype=bool, count=n_rows)
+            values = np.array(list(map(dict.get, records, itertools.repeat(key), itertools.repeat(''))), dtype=str)
+            raw[FEATURE_FOR_KEY[key]] = (values, present)
+
+    columns = {}
+    problems = []  # (mask of bad rows, raw values, message template)
+    for feature, (values, present) in raw.items():
+        if feature == 'Sex':
+            column = (values == 'female').astype(np.int64)
+            bad = present & (values != 'female') & (values != 'male')
+            problems.append((bad, values, "Invalid value for sex: {}. Expected 'male' or 'female'."))
+        elif feature == 'Embarked':
+            column = np.full(n_rows, DEFAULT_FEATURES['Embarked'], dtype=np.int64)
+            for code, port in enumerate(['c', 'q', 's']):
+                column[values == port] = code
+            bad = present & ~np.isin(values, ['c', 'q', 's'])
+            problems.append((bad, values, "Invalid value for embarked: {}. Expected 'C', 'Q', or 'S'."))
+        else:
+            dtype = np.float64 if feature in ['Age', 'Fare'] else np.int64
+            column, unparseable = _to_numbers(values, dtype, present)
+            column[~present] = DEFAULT_FEATURES[feature]
+            if feature == 'Pclass':
+                out_of_range = present & ~unparseable & ~np.isin(column, [1, 2, 3])
+                problems.append((out_of_range, values, "Invalid value for class: {}. Expected 1, 2, or 3."))
+            else:
+                out_of_range = present & ~unparseable & (column < 0)
+                problems.append((out_of_range, values, f"Invalid negative value for {feature.lower()}: {{}}."))
+            problems.append((unparseable, values, f"Invalid value for {feature.lower()}: {{}}."))
+            bad = unparseable | out_of_range
+        column[bad] = DEFAULT_FEATURES[feature]
+        columns[feature] = column
+
+    for bad, values, message in problems:
+        for row in np.flatnonzero(bad):
+            messages[row].append(message.format(values[row]))
+
+    errors = [(row, " ".join(row_messages)) for row, row_messages in enumerate(messages) if row_messages]
+    valid = np.ones(n_rows, dtype=bool)
+    valid[[row for row, _ in errors]] = False
+    if errors:
+        logging.error(f"{len(errors)} of {n_rows} inputs failed validation.")
+    return {feature: columns[feature] for feature in feature_order}, valid, errors
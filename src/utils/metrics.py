@@ -0,0 +1,130 @@
+# src/utils/metrics.py
+
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Exporters and quiet mode can also be switched on without code changes, e.g. for pipeline stages
+METRICS_JSONL_ENV = "TITANIC_METRICS_JSONL"
+METRICS_PROM_ENV = "TITANIC_METRICS_PROM"
+QUIET_ENV = "TITANIC_QUIET"
+
+class Span:
+    """One timed region; rows and bytes_read are filled in by the code being timed."""
+
+    __slots__ = ("name", "rows", "bytes_read", "start", "duration")
+
+    def __init__(self, name: str, rows: int = 0, bytes_read: int = 0):
+        self.name = name
+        self.rows = rows
+        self.bytes_read = bytes_read
+        self.start = 0.0
+        self.duration = 0.0
+
+class MetricsRegistry:
+    """
+    Per-span-name totals (calls, seconds, rows, bytes read) for the whole process.
+
+    Finished spans are optionally appended to a JSON lines file as they end;
+    the totals are written in Prometheus text format by write_prometheus()
+    (and automatically at exit when a path is configured).
+    """
+
+    def __init__(self):
+        self.totals = {}
+        self.quiet = False
+        self.jsonl_path = None
+        self.prometheus_path = None
+        self._jsonl = None
+        self._lock = threading.Lock()
+
+    def record(self, span: Span):
+        with self._lock:
+            totals = self.totals.setdefault(span.name, {"calls": 0, "seconds": 0.0, "rows": 0, "bytes_read": 0})
+            totals["calls"] += 1
+            totals["seconds"] += span.duration
+            totals["rows"] += span.rows
+            totals["bytes_read"] += span.bytes_read
+            if self.jsonl_path:
+                if self._jsonl is None:
+                    self._jsonl = open(self.jsonl_path, 'a', buffering=1)
+                self._jsonl.write(json.dumps({
+                    "span": span.name,
+                    "start": span.start,
+                    "duration_s": span.duration,
+                    "rows": span.rows,
+                    "bytes_read": span.bytes_read,
+                    "pid": os.getpid(),
+                }) + "\n")
+
+    def write_prometheus(self, path: str = None):
+        """Write the totals as a Prometheus textfile-collector file (atomically)."""
+        path = path or self.prometheus_path
+        if not path:
+            return
+        lines = []
+        for metric, key, help_text in [
+            ("titanic_span_calls_total", "calls", "Number of times the span ran."),
+            ("titanic_span_duration_seconds_total", "seconds", "Total wall time spent in the span."),
+            ("titanic_span_rows_total", "rows", "Rows processed inside the span."),
+            ("titanic_span_bytes_read_total", "bytes_read", "Bytes of input read inside the span."),
+        ]:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            with self._lock:
+                for name, totals in sorted(self.totals.items()):
+                    lines.append(f'{metric}{{span="{name}"}} {totals[key]}')
+        with open(path + ".tmp", 'w') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(path + ".tmp", path)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {name: dict(totals) for name, totals in self.totals.items()}
+
+registry = MetricsRegistry()
+
+def configure(jsonl_path: str = None, prometheus_path: str = None, quiet: bool = None):
+    """Enable JSON lines / Prometheus export and/or quiet mode for this process."""
+    if jsonl_path is not None:
+        registry.jsonl_path = jsonl_path
+    if prometheus_path is not None:
+        registry.prometheus_path = prometheus_path
+    if quiet is not None:
+        registry.quiet = quiet
+
+def quiet() -> bool:
+    """True when hot paths should skip optional, expensive log formatting."""
+    return registry.quiet
+
+@contextmanager
+def span(name: str, rows: int = 0, bytes_read: int = 0):
+    """
+    Time a block of code under name.
+
+        with span("train.fit", rows=len(X_train)) as s:
+            model.fit(X_train, y_train)
+    """
+    current = Span(name, rows, bytes_read)
+    current.start = time.time()
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.duration = time.perf_counter() - start
+        registry.record(current)
+
+def path_bytes(path: str) -> int:
+    """Size of a file, or of all files under a directory (columnar bundles); 0 if missing."""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+configure(os.environ.get(METRICS_JSONL_ENV), os.environ.get(METRICS_PROM_ENV), os.environ.get(QUIET_ENV, "") not in ("", "0"))
+atexit.register(registry.write_prometheus)
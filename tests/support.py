@@ -0,0 +1,97 @@
+# tests/support.py
+#
+# Small synthetic Titanic-like data and forests, so the tests need neither
+# the Kaggle dataset nor anything under models/.
+
+import os
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from src.utils.helpers import FEATURE_ORDER
+
+# Stages of the fake pipeline in test_pipeline append their name here when they run
+STAGE_RUNS = []
+
+def make_features(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """Processed-style feature rows in FEATURE_ORDER, with Titanic-like ranges and encodings."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Pclass': rng.integers(1, 4, n_rows),
+        'Sex': rng.integers(0, 2, n_rows),
+        'Age': np.round(rng.uniform(0.4, 80.0, n_rows), 2),
+        'SibSp': rng.integers(0, 6, n_rows),
+        'Parch': rng.integers(0, 5, n_rows),
+        'Fare': np.round(rng.uniform(0.0, 250.0, n_rows), 4),
+        'Embarked': rng.integers(0, 3, n_rows),
+    })[FEATURE_ORDER]
+
+def make_labels(X: pd.DataFrame, seed: int = 0) -> np.ndarray:
+    """Survival that depends on most features, with some noise so the trees grow deep."""
+    rng = np.random.default_rng(seed)
+    score = 1.5 * X['Sex'] - 0.6 * X['Pclass'] - 0.02 * X['Age'] + 0.004 * X['Fare'] - 0.2 * X['SibSp'] + 0.1 * X['Parch']
+    return (score + rng.normal(0.0, 0.5, len(X)) > -0.8).astype(np.int64).to_numpy()
+
+def train_forest(n_rows: int = 400, seed: int = 0, **params):
+    """(model, X, y) for a forest fitted on make_features / make_labels."""
+    X = make_features(n_rows, seed)
+    y = make_labels(X, seed)
+    model = RandomForestClassifier(**{'n_estimators': 15, 'random_state': seed, 'n_jobs': 1, **params})
+    model.fit(X, y)
+    return model, X, y
+
+def threshold_rows(model, base: pd.DataFrame, features: list) -> pd.DataFrame:
+    """
+    Copies of the base rows with one feature set exactly to a split threshold
+    of the forest, or to the float32 values just below and above it.
+    """
+    rows = []
+    for feature in features:
+        index = list(model.feature_names_in_).index(feature)
+        thresholds = np.unique(np.concatenate([
+            estimator.tree_.threshold[estimator.tree_.feature == index] for estimator in model.estimators_
+        ]))
+        below = np.nextafter(thresholds.astype(np.float32), np.float32(-np.inf)).astype(np.float64)
+        above = np.nextafter(thresholds.astype(np.float32), np.float32(np.inf)).astype(np.float64)
+        for value in np.concatenate([thresholds, below, above]):
+            row = base.iloc[len(rows) % len(base)].copy()
+            row[feature] = value
+            rows.append(row)
+    return pd.DataFrame(rows).reset_index(drop=True)
+
+def write_feature_order(path: str):
+    with open(path, 'w') as f:
+        for feature in FEATURE_ORDER:
+            f.write(f"{feature}\n")
+
+def make_raw_frame(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """Raw Kaggle-style rows with missing Age, Fare and Embarked values."""
+    rng = np.random.default_rng(seed)
+    X = make_features(n_rows, seed)
+    raw = pd.DataFrame({
+        'PassengerId': np.arange(1, n_rows + 1),
+        'Survived': make_labels(X, seed),
+        'Pclass': X['Pclass'],
+        'Name': [f"Passenger {i}" for i in range(n_rows)],
+        'Sex': np.where(X['Sex'] == 1, 'female', 'male'),
+        'Age': X['Age'].where(rng.random(n_rows) > 0.2),
+        'SibSp': X['SibSp'],
+        'Parch': X['Parch'],
+        'Ticket': [f"T{i}" for i in range(n_rows)],
+        'Fare': X['Fare'].where(rng.random(n_rows) > 0.05),
+        'Cabin': None,
+        'Embarked': pd.Series(np.array(['C', 'Q', 'S'])[X['Embarked']]).where(rng.random(n_rows) > 0.05),
+    })
+    # Whole ages are written as '22' like in the Kaggle files, and the first ten rows hold
+    # nothing else, so a streamed chunk can be typed as integers
+    raw['Age'] = raw['Age'].astype(object)
+    raw.loc[:9, 'Age'] = list(range(20, 30))
+    return raw
+
+def copy_upper(source: str, output: str, stage: str):
+    """Pipeline stage used by test_pipeline: output is the upper-cased source."""
+    STAGE_RUNS.append(stage)
+    with open(source, 'r') as f:
+        text = f.read()
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        f.write(text.upper())
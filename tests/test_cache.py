@@ -0,0 +1,133 @@
+# tests/test_cache.py
+
+import logging
+import os
+import sqlite3
+import tempfile
+import unittest
+import joblib
+import numpy as np
+from src.models.cache import PredictionCache
+from src.models.predictor import Predictor
+from tests.support import make_features, train_forest, write_feature_order
+
+def setUpModule():
+    logging.disable(logging.CRITICAL)
+
+def tearDownModule():
+    logging.disable(logging.NOTSET)
+
+class PredictionCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.directory.name, "cache.sqlite")
+        self.cache = PredictionCache(100, self.db_path)
+        self.keys = [PredictionCache.make_key(row) for row in [(1, 0, 22.0), (3, 1, 38.0)]]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def stored_hashes(self):
+        with sqlite3.connect(self.db_path) as db:
+            return sorted({model_hash for (model_hash,) in db.execute("SELECT model_hash FROM predictions")})
+
+    def test_hit_after_put(self):
+        self.cache.validate("a")
+        self.cache.put_many(self.keys, [(0, 0.25), (1, 0.75)], "a")
+        self.assertEqual(self.cache.get_many(self.keys, "a"), [(0, 0.25), (1, 0.75)])
+
+    def test_hash_change_invalidates_memory_and_disk(self):
+        self.cache.validate("a")
+        self.cache.put_many(self.keys, [(0, 0.25), (1, 0.75)], "a")
+        self.cache.validate("b")
+        self.assertEqual(self.cache.get_many(self.keys, "b"), [None, None])
+        self.assertEqual(self.stored_hashes(), [])
+
+        # A new process on the same file finds nothing for the old model either
+        reopened = PredictionCache(100, self.db_path)
+        reopened.validate("a")
+        self.assertEqual(reopened.get_many(self.keys, "a"), [None, None])
+
+    def test_disk_entries_survive_a_restart_with_the_same_hash(self):
+        self.cache.validate("a")
+        self.cache.put_many(self.keys, [(0, 0.25), (1, 0.75)], "a")
+        reopened = PredictionCache(100, self.db_path)
+        reopened.validate("a")
+        self.assertEqual(reopened.get_many(self.keys, "a"), [(0, 0.25), (1, 0.75)])
+        self.assertEqual(reopened.stats()["disk_hits"], 2)
+
+    def test_results_of_the_previous_model_are_not_stored(self):
+        # A batch scored by model "a" finishes after a reload switched the cache to "b"
+        self.cache.validate("a")
+        self.cache.validate("b")
+        self.cache.put_many(self.keys, [(0, 0.25), (1, 0.75)], "a")
+        self.assertEqual(self.cache.get_many(self.keys, "b"), [None, None])
+        self.assertEqual(self.stored_hashes(), [])
+
+    def test_disk_tier_keeps_the_most_recently_used_rows(self):
+        cache = PredictionCache(100, self.db_path, max_disk_entries=3)
+        cache.validate("a")
+        keys = [PredictionCache.make_key((i,)) for i in range(5)]
+        for key in keys[:3]:
+            cache.put_many([key], [(0, 0.5)], "a")
+        # Reading the oldest row from disk makes it recent, so the next two puts evict keys[1] and keys[2]
+        reopened = PredictionCache(100, self.db_path, max_disk_entries=3)
+        reopened.validate("a")
+        self.assertEqual(reopened.get_many(keys[:1], "a"), [(0, 0.5)])
+        reopened.put_many(keys[3:], [(1, 0.9), (1, 0.9)], "a")
+        with sqlite3.connect(self.db_path) as db:
+            stored = sorted(features for (features,) in db.execute("SELECT features FROM predictions"))
+        self.assertEqual(stored, sorted([keys[0], keys[3], keys[4]]))
+        self.assertEqual(reopened.stats()["disk_evictions"], 2)
+
+    def test_database_without_last_used_is_recreated(self):
+        with sqlite3.connect(self.db_path) as db:
+            db.execute("DROP TABLE predictions")
+            db.execute("CREATE TABLE predictions (model_hash TEXT NOT NULL, features TEXT NOT NULL, "
+                       "prediction INTEGER NOT NULL, probability REAL NOT NULL, PRIMARY KEY (model_hash, features))")
+            db.execute("INSERT INTO predictions VALUES ('a', '1.0', 1, 0.9)")
+        cache = PredictionCache(100, self.db_path)
+        cache.validate("a")
+        self.assertEqual(cache.get_many(["1.0"], "a"), [None])
+        cache.put_many(["1.0"], [(1, 0.9)], "a")
+        self.assertEqual(self.stored_hashes(), ["a"])
+
+    def test_make_keys_matches_make_key(self):
+        X = make_features(50, seed=4)
+        self.assertEqual(PredictionCache.make_keys(X), [PredictionCache.make_key(row) for row in X.itertuples(index=False)])
+
+    def test_lookups_for_the_previous_model_miss(self):
+        self.cache.validate("b")
+        self.cache.put_many(self.keys, [(0, 0.25), (1, 0.75)], "b")
+        self.assertEqual(self.cache.get_many(self.keys, "a"), [None, None])
+
+class PredictorCacheTest(unittest.TestCase):
+    """A Predictor must stop serving cached results once its model file is replaced."""
+
+    def test_replaced_model_invalidates_cached_predictions(self):
+        with tempfile.TemporaryDirectory() as directory:
+            model_path = os.path.join(directory, "model.joblib")
+            feature_order_path = os.path.join(directory, "feature_order.txt")
+            write_feature_order(feature_order_path)
+            first, _, _ = train_forest(seed=0)
+            second, _, _ = train_forest(seed=1, n_estimators=3, max_depth=2)
+            joblib.dump(first, model_path)
+
+            cache = PredictionCache(1000, os.path.join(directory, "cache.sqlite"))
+            predictor = Predictor(model_path, feature_order_path, cache=cache, registry_path=None)
+            X = make_features(200, seed=2)
+            rows = X.to_dict('records')
+            _, probabilities = predictor.predict_batch(rows)
+            np.testing.assert_array_equal(probabilities, first.predict_proba(X)[:, 1])
+            old_hash = cache.model_hash
+
+            joblib.dump(second, model_path)
+            self.assertTrue(predictor.refresh(wait=True))
+            self.assertNotEqual(cache.model_hash, old_hash)
+            _, probabilities = predictor.predict_batch(rows)
+            np.testing.assert_array_equal(probabilities, second.predict_proba(X)[:, 1])
+            self.assertEqual(cache.stats()["entries"], len({tuple(row.values()) for row in rows}))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+# tests/test_compiled.py
+
+import contextlib
+import io
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+import joblib
+import pandas as pd
+from src.models.artifacts import file_sha256
+from src.models.compiled import load_compiled_models, predict_fast
+from src.models.flat_forest import FlatForest
+from src.models.lookup import LookupModel, compile_lookup
+from src.models.quantized import QuantizedForest
+from src.models.registry import FLAT_BUNDLE, LOOKUP_BUNDLE, QUANTIZED_BUNDLE, REGISTRY_PATH, publish
+from src.utils.helpers import FEATURE_ORDER, parse_input
+from tests.support import train_forest, write_feature_order
+
+MAIN_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+
+class FastPathTest(unittest.TestCase):
+    """--fast answers from the compiled bundles of the CURRENT version and falls back when one cannot score."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        # Laid out like the repository, so main.py run from the directory finds the registry
+        cls.registry_path = os.path.join(cls.directory.name, REGISTRY_PATH)
+        cls.model, _, _ = train_forest(max_depth=6)
+        model_path = os.path.join(cls.directory.name, "model.joblib")
+        feature_order_path = os.path.join(cls.directory.name, "feature_order.txt")
+        joblib.dump(cls.model, model_path)
+        write_feature_order(feature_order_path)
+
+        bundles = {name: os.path.join(cls.directory.name, name) for name in [FLAT_BUNDLE, QUANTIZED_BUNDLE, LOOKUP_BUNDLE]}
+        for name, engine in [(FLAT_BUNDLE, FlatForest), (QUANTIZED_BUNDLE, QuantizedForest)]:
+            forest = engine.from_model(cls.model)
+            forest.source_hash = file_sha256(model_path)
+            forest.save(bundles[name])
+        with contextlib.redirect_stdout(io.StringIO()):
+            compile_lookup(model_path, bundles[LOOKUP_BUNDLE])
+        publish(model_path, feature_order_path, {}, registry_path=cls.registry_path, bundles=bundles)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def expected(self, input_features: dict):
+        return self.model.predict_proba(pd.DataFrame([input_features])[FEATURE_ORDER])[0, 1]
+
+    def parse(self, text: str) -> dict:
+        # parse_input logs each default it fills in
+        logging.disable(logging.INFO)
+        try:
+            return parse_input(text)
+        finally:
+            logging.disable(logging.NOTSET)
+
+    def test_bundles_in_priority_order(self):
+        engines = [type(model) for model, _ in load_compiled_models(self.registry_path)]
+        self.assertEqual(engines, [LookupModel, QuantizedForest, FlatForest])
+
+    def test_lookup_answers_inputs_in_its_domain(self):
+        input_features = self.parse("class=3,sex=female,age=22,sibsp=1,parch=0,fare=7.25,embarked=S")
+        with self.assertNoLogs(level='WARNING'):
+            prediction, probability = predict_fast(input_features, self.registry_path)
+        self.assertEqual(probability, self.expected(input_features))
+        self.assertEqual(prediction, int(probability > 0.5))
+
+    def test_missing_class_falls_back_to_the_quantized_forest(self):
+        # A missing class is filled in as Pclass=0, which the lookup table does not cover
+        input_features = self.parse("age=22,sex=female")
+        with self.assertLogs(level='WARNING') as logs:
+            prediction, probability = predict_fast(input_features, self.registry_path)
+        self.assertIn("LookupModel cannot score this input", logs.output[0])
+        self.assertEqual(probability, self.expected(input_features))
+
+    def test_main_fast_matches_the_full_model(self):
+        for text in ["age=22,sex=female", "age=22,sex=female,class=3"]:
+            with self.subTest(input=text):
+                outputs = []
+                for flags in [["--fast"], []]:
+                    result = subprocess.run([sys.executable, "-W", "ignore", MAIN_PATH, *flags, "--input", text],
+                                            cwd=self.directory.name, capture_output=True, text=True)
+                    self.assertEqual(result.returncode, 0, result.stderr)
+                    outputs.append([line for line in result.stdout.splitlines() if line.startswith("Survival Prediction")])
+                self.assertEqual(outputs[0], outputs[1])
+                self.assertEqual(len(outputs[0]), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+# tests/test_compress.py
+
+import unittest
+import numpy as np
+from src.models.compress import _candidate_scores, cap_tree_depth, select_trees
+from src.models.evaluate_error_rate import compute_metrics
+from tests.support import make_features, train_forest
+
+def truncated_proba(tree, X: np.ndarray, max_depth: int) -> np.ndarray:
+    """Class distribution at the node each row reaches when descending the original tree at most max_depth levels."""
+    nodes = np.zeros(len(X), dtype=np.int64)
+    for _ in range(max_depth):
+        left, right = tree.children_left[nodes], tree.children_right[nodes]
+        go_left = X[np.arange(len(X)), tree.feature[nodes]] <= tree.threshold[nodes]
+        nodes = np.where(left == -1, nodes, np.where(go_left, left, right))
+    values = tree.value[nodes, 0]
+    return values / values.sum(axis=1, keepdims=True)
+
+class FakeTree:
+    """Stands in for a Tree whose pickle state has a different layout."""
+
+    def __init__(self, tree):
+        self.tree = tree
+
+    def __reduce__(self):
+        tree_class, tree_args, state = self.tree.__reduce__()
+        return tree_class, tree_args, {**state, 'missing_values_in_feature_mask': None}
+
+class CapTreeDepthTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.model, _, _ = train_forest()
+        cls.X = make_features(300, seed=1).to_numpy(dtype=np.float32)
+
+    def test_capped_tree_is_the_original_truncated(self):
+        for depth in [1, 3, 6]:
+            for estimator in self.model.estimators_[:5]:
+                with self.subTest(depth=depth):
+                    capped = cap_tree_depth(estimator, depth)
+                    self.assertLessEqual(capped.get_depth(), depth)
+                    np.testing.assert_allclose(capped.predict_proba(self.X),
+                                               truncated_proba(estimator.tree_, self.X, depth), rtol=0, atol=1e-12)
+
+    def test_shallow_tree_is_copied_unchanged(self):
+        estimator = self.model.estimators_[0]
+        capped = cap_tree_depth(estimator, estimator.get_depth() + 1)
+        self.assertIsNot(capped, estimator)
+        np.testing.assert_array_equal(capped.predict_proba(self.X), estimator.predict_proba(self.X))
+
+    def test_original_tree_is_not_modified(self):
+        estimator = self.model.estimators_[0]
+        before = estimator.predict_proba(self.X)
+        cap_tree_depth(estimator, 2)
+        np.testing.assert_array_equal(estimator.predict_proba(self.X), before)
+
+    def test_unknown_tree_state_fails_clearly(self):
+        estimator = type('Estimator', (), {'tree_': FakeTree(self.model.estimators_[0].tree_)})()
+        with self.assertRaisesRegex(TypeError, "Unsupported scikit-learn tree state"):
+            cap_tree_depth(estimator, 2)
+
+class SelectTreesTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.model, _, _ = train_forest(n_estimators=20, max_depth=5)
+        X = make_features(200, seed=4)
+        cls.X = X.to_numpy(dtype=np.float32)
+        cls.y = cls.model.predict(X)
+        cls.tree_proba = np.stack([e.predict_proba(cls.X) for e in cls.model.estimators_])
+        cls.node_counts = np.array([e.tree_.node_count for e in cls.model.estimators_])
+
+    def test_candidate_scores_match_compute_metrics(self):
+        predictions = self.model.classes_.take(self.tree_proba.argmax(axis=2))
+        for metric in ['accuracy', 'f1']:
+            expected = [compute_metrics(self.y, row)[metric] for row in predictions]
+            np.testing.assert_allclose(_candidate_scores(self.y, predictions, metric), expected)
+
+    def test_stops_once_the_target_is_reached(self):
+        selected = select_trees(self.tree_proba, self.y, self.model.classes_, self.node_counts, 0.9, 'accuracy', 3)
+        self.assertGreaterEqual(len(selected), 3)
+        self.assertEqual(len(set(selected)), len(selected))
+        averaged = self.tree_proba[selected].sum(axis=0)
+        self.assertGreaterEqual((self.model.classes_.take(averaged.argmax(axis=1)) == self.y).mean(), 0.9)
+
+    def test_unreachable_target_selects_every_tree(self):
+        selected = select_trees(self.tree_proba, self.y, self.model.classes_, self.node_counts, 1.1, 'accuracy')
+        self.assertEqual(sorted(selected), list(range(20)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+# tests/test_contributions.py
+
+import importlib.util
+import unittest
+import numpy as np
+from src.models.contributions import ContributionEngine, treeshap_contributions
+from src.utils.helpers import FEATURE_ORDER
+from tests.support import make_features, train_forest
+
+def naive_saabas(model, X: np.ndarray) -> np.ndarray:
+    """Saabas contributions one row and one tree at a time, following each decision path."""
+    contributions = np.zeros(X.shape, dtype=np.float64)
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        value = tree.value[:, 0, 1] / tree.value[:, 0].sum(axis=1)
+        for row, x in enumerate(X.astype(np.float32)):
+            node = 0
+            while tree.children_left[node] != -1:
+                feature = tree.feature[node]
+                child = tree.children_left[node] if x[feature] <= tree.threshold[node] else tree.children_right[node]
+                contributions[row, feature] += value[child] - value[node]
+                node = child
+    return contributions / len(model.estimators_)
+
+class SaabasTest(unittest.TestCase):
+    """Contributions plus the bias must add up to the forest's survival probability."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.model, _, _ = train_forest(max_depth=8)
+        cls.engine = ContributionEngine(cls.model)
+        cls.X = make_features(500, seed=5)
+
+    def test_additive(self):
+        bias, contributions = self.engine.contributions(self.X)
+        self.assertEqual(contributions.shape, (len(self.X), len(FEATURE_ORDER)))
+        np.testing.assert_allclose(bias + contributions.sum(axis=1), self.model.predict_proba(self.X)[:, 1],
+                                   rtol=0, atol=1e-12)
+
+    def test_chunking_does_not_change_the_result(self):
+        _, expected = self.engine.contributions(self.X)
+        for chunk_size, block_size in [(64, 16), (100, 7), (1, 1)]:
+            with self.subTest(chunk_size=chunk_size, block_size=block_size):
+                _, contributions = self.engine.contributions(self.X.iloc[:150], chunk_size, block_size)
+                np.testing.assert_allclose(contributions, expected[:150], rtol=0, atol=1e-15)
+
+    def test_matches_per_path_reference(self):
+        X = self.X.iloc[:40]
+        _, contributions = self.engine.contributions(X.to_numpy())
+        np.testing.assert_allclose(contributions, naive_saabas(self.model, X.to_numpy()), rtol=0, atol=1e-12)
+
+    def test_bias_is_the_mean_root_value(self):
+        roots = [e.tree_.value[0, 0, 1] / e.tree_.value[0, 0].sum() for e in self.model.estimators_]
+        self.assertAlmostEqual(self.engine.bias, float(np.mean(roots)), places=12)
+
+@unittest.skipUnless(importlib.util.find_spec("shap"), "the shap package is not installed")
+class TreeShapTest(unittest.TestCase):
+
+    def test_additive(self):
+        model, _, _ = train_forest(max_depth=6)
+        X = make_features(50, seed=6)
+        bias, contributions = treeshap_contributions(model, X)
+        np.testing.assert_allclose(bias + contributions.sum(axis=1), model.predict_proba(X)[:, 1], rtol=0, atol=1e-6)
+
+if __name__ == "__main__":
+    unittest.main()
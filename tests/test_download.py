@@ -0,0 +1,114 @@
+# tests/test_download.py
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+import pandas as pd
+from src.data.columnar import processed_path, read_table
+from src.data.download import (ARCHIVE_NAME, MEMBERS, MIRROR_ENV, RAW_DATA_PATH, archive_path, download_titanic_dataset,
+                               load_index)
+from src.data.preprocess import transform_chunk
+from src.models.artifacts import file_sha256
+from tests.support import make_raw_frame
+
+class DownloadTest(unittest.TestCase):
+    """The dataset comes from a mirror or the content-addressed cache, and is only extracted when it changed."""
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.directory = tempfile.TemporaryDirectory()
+        os.chdir(self.directory.name)
+        self.mirror = os.path.join(self.directory.name, "mirror")
+        os.makedirs(self.mirror)
+        self.write_archive(seed=0)
+        # Kaggle must never be contacted, and the mirror is only what each test passes
+        patches = [mock.patch("src.data.download.fetch_from_kaggle", side_effect=AssertionError("contacted Kaggle")),
+                   mock.patch.dict(os.environ, {MIRROR_ENV: ""})]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.directory.cleanup()
+
+    def write_archive(self, seed: int):
+        self.contents = {}
+        with zipfile.ZipFile(os.path.join(self.mirror, ARCHIVE_NAME), 'w') as archive:
+            for offset, member in enumerate(MEMBERS):
+                self.contents[member] = make_raw_frame(60, seed=seed + offset).to_csv(index=False)
+                archive.writestr(member, self.contents[member])
+
+    def download(self, **kwargs) -> str:
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            download_titanic_dataset(**kwargs)
+        return output.getvalue()
+
+    def raw_mtimes(self) -> list:
+        return [os.stat(os.path.join(RAW_DATA_PATH, member)).st_mtime_ns for member in MEMBERS]
+
+    def test_mirror_is_cached_and_extracted(self):
+        self.download(mirror=self.mirror)
+        for member in MEMBERS:
+            with open(os.path.join(RAW_DATA_PATH, member)) as f:
+                self.assertEqual(f.read(), self.contents[member])
+        sha256 = file_sha256(os.path.join(self.mirror, ARCHIVE_NAME))
+        self.assertEqual(load_index()["current"], sha256)
+        self.assertTrue(os.path.exists(archive_path(sha256)))
+
+    def test_unchanged_files_are_not_extracted_again(self):
+        self.download(mirror=self.mirror)
+        mtimes = self.raw_mtimes()
+        self.assertIn("nothing extracted", self.download(mirror=self.mirror))
+        self.assertEqual(self.raw_mtimes(), mtimes)
+
+    def test_cached_archive_is_used_without_a_mirror(self):
+        self.download(mirror=self.mirror)
+        os.remove(os.path.join(self.mirror, ARCHIVE_NAME))
+        os.remove(os.path.join(RAW_DATA_PATH, MEMBERS[0]))
+        output = self.download(offline=True)
+        self.assertIn("Using cached dataset", output)
+        self.assertIn(os.path.join(RAW_DATA_PATH, MEMBERS[0]), output)
+        self.assertNotIn(os.path.join(RAW_DATA_PATH, MEMBERS[1]), output)
+        with open(os.path.join(RAW_DATA_PATH, MEMBERS[0])) as f:
+            self.assertEqual(f.read(), self.contents[MEMBERS[0]])
+
+    def test_edited_raw_file_is_restored(self):
+        self.download(mirror=self.mirror)
+        with open(os.path.join(RAW_DATA_PATH, MEMBERS[1]), 'a') as f:
+            f.write("edited\n")
+        output = self.download(mirror=self.mirror)
+        self.assertIn(os.path.join(RAW_DATA_PATH, MEMBERS[1]), output)
+        with open(os.path.join(RAW_DATA_PATH, MEMBERS[1])) as f:
+            self.assertEqual(f.read(), self.contents[MEMBERS[1]])
+
+    def test_new_mirror_archive_replaces_the_data(self):
+        self.download(mirror=self.mirror)
+        self.write_archive(seed=10)
+        self.download(mirror=self.mirror)
+        with open(os.path.join(RAW_DATA_PATH, MEMBERS[0])) as f:
+            self.assertEqual(f.read(), self.contents[MEMBERS[0]])
+        self.assertEqual(load_index()["current"], file_sha256(os.path.join(self.mirror, ARCHIVE_NAME)))
+
+    def test_processed_tables_straight_from_the_archive(self):
+        self.download(mirror=self.mirror, processed_format='csv')
+        self.assertFalse(os.path.exists(RAW_DATA_PATH))
+        path = processed_path("train_processed")
+        raw = pd.read_csv(io.StringIO(self.contents["train.csv"]))
+        expected = transform_chunk(raw, raw['Age'].median(), raw['Fare'].median())
+        pd.testing.assert_frame_equal(read_table(path), expected, check_dtype=False)
+        self.assertIn("nothing extracted", self.download(mirror=self.mirror, processed_format='csv'))
+
+    def test_missing_sources_fail(self):
+        with self.assertRaises(FileNotFoundError), self.assertLogs(level='ERROR'):
+            self.download(offline=True)
+        with self.assertRaises(FileNotFoundError), self.assertLogs(level='ERROR'):
+            self.download(mirror=os.path.join(self.directory.name, "empty"))
+
+if __name__ == "__main__":
+    unittest.main()
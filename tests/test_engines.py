@@ -0,0 +1,105 @@
+# tests/test_engines.py
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+import joblib
+import numpy as np
+from src.models.flat_forest import FlatForest
+from src.models.lookup import LookupModel, compile_lookup
+from src.models.quantized import QuantizedForest
+from src.utils.helpers import FEATURE_ORDER
+from tests.support import make_features, threshold_rows, train_forest
+
+ENGINES = [FlatForest, QuantizedForest]
+
+class ForestEngineTest(unittest.TestCase):
+    """The NumPy forest engines must reproduce sklearn's predict_proba bit for bit."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.model, X, _ = train_forest()
+        # Unseen rows, plus every feature placed exactly on (and one float32 step around) each threshold
+        cls.X = make_features(300, seed=1)
+        cls.X_thresholds = threshold_rows(cls.model, cls.X, FEATURE_ORDER)
+
+    def check_exact(self, engine):
+        for X in [self.X, self.X_thresholds]:
+            np.testing.assert_array_equal(engine.predict_proba(X), self.model.predict_proba(X))
+            np.testing.assert_array_equal(engine.predict(X), self.model.predict(X))
+
+    def test_engines_match_sklearn(self):
+        for engine in ENGINES:
+            with self.subTest(engine=engine.__name__):
+                self.check_exact(engine.from_model(self.model))
+
+    def test_saved_bundles_match_sklearn(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for engine in ENGINES:
+                with self.subTest(engine=engine.__name__):
+                    path = os.path.join(directory, engine.__name__)
+                    engine.from_model(self.model).save(path)
+                    self.check_exact(engine.load(path))
+
+    def test_chunked_scoring_matches_sklearn(self):
+        for engine in ENGINES:
+            with self.subTest(engine=engine.__name__):
+                np.testing.assert_array_equal(engine.from_model(self.model).predict_proba(self.X, chunk_size=7),
+                                              self.model.predict_proba(self.X))
+
+class LookupModelTest(unittest.TestCase):
+    """The compiled lookup table must give sklearn's labels and survival probabilities exactly."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.model, _, _ = train_forest(max_depth=8)
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.model_path = os.path.join(cls.directory.name, "model.joblib")
+        joblib.dump(cls.model, cls.model_path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            cls.lookup = compile_lookup(cls.model_path, os.path.join(cls.directory.name, "model.lookup"))
+        cls.X = make_features(300, seed=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def check_matches(self, lookup, X):
+        np.testing.assert_array_equal(lookup.predict(X), self.model.predict(X))
+        expected = self.model.predict_proba(X)
+        np.testing.assert_array_equal(lookup.predict_proba(X)[:, 1], expected[:, 1])
+        # The other column is 1 - p
+        np.testing.assert_allclose(lookup.predict_proba(X)[:, 0], expected[:, 0], rtol=0, atol=1e-15)
+
+    def test_matches_sklearn(self):
+        self.check_matches(self.lookup, self.X)
+
+    def test_matches_sklearn_on_thresholds(self):
+        # Only the continuous features can sit on a threshold; the discrete ones must stay valid codes
+        self.check_matches(self.lookup, threshold_rows(self.model, self.X, ['Age', 'Fare']))
+
+    def test_counts_above_the_largest_threshold(self):
+        X = self.X.copy()
+        X['SibSp'] = 40
+        X['Parch'] = 25
+        self.check_matches(self.lookup, X)
+
+    def test_saved_bundle_matches_sklearn(self):
+        self.check_matches(LookupModel.load(os.path.join(self.directory.name, "model.lookup")), self.X)
+
+    def test_rejects_codes_outside_the_domain(self):
+        X = self.X.copy()
+        X.loc[0, 'Pclass'] = 4
+        with self.assertRaises(ValueError):
+            self.lookup.predict(X)
+
+    def test_refuses_tables_over_the_size_limit(self):
+        output_path = os.path.join(self.directory.name, "too_big.lookup")
+        with self.assertRaises(ValueError), self.assertLogs(level='ERROR'):
+            compile_lookup(self.model_path, output_path, max_table_mb=0.01)
+        self.assertFalse(os.path.exists(output_path))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+# tests/test_evaluate.py
+
+import os
+import tempfile
+import unittest
+import joblib
+import numpy as np
+from src.data.columnar import processed_path, write_table
+from src.models.evaluate_error_rate import (compute_metrics, confusion_counts, metrics_from_confusion,
+                                            stream_confusion)
+from src.utils.helpers import FEATURE_ORDER
+from tests.support import make_features, make_labels, train_forest
+
+class StreamConfusionTest(unittest.TestCase):
+    """Chunked, multi-process scoring must give the same metrics as scoring the whole file at once."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.model, _, _ = train_forest()
+        cls.model_path = os.path.join(cls.directory.name, "model.joblib")
+        joblib.dump(cls.model, cls.model_path)
+        cls.test_data = make_features(1000, seed=3)
+        cls.test_data['Survived'] = make_labels(cls.test_data, seed=3)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def check_format(self, data_format: str):
+        path = processed_path("test_processed", data_format, self.directory.name)
+        write_table(self.test_data, path)
+        y_true = self.test_data['Survived'].to_numpy()
+        y_pred = self.model.predict(self.test_data[FEATURE_ORDER])
+        # Chunk sizes that do and do not divide the row count
+        for chunk_size in [1000, 250, 97]:
+            matrix = stream_confusion(path, self.model_path, FEATURE_ORDER, self.model.classes_, chunk_size, max_workers=2)
+            np.testing.assert_array_equal(matrix, confusion_counts(y_true, y_pred, self.model.classes_))
+            expected = compute_metrics(y_true, y_pred)
+            for name, value in metrics_from_confusion(matrix, self.model.classes_).items():
+                self.assertAlmostEqual(value, expected[name], places=12, msg=f"{name}, chunk_size={chunk_size}")
+
+    def test_csv_matches_compute_metrics(self):
+        self.check_format('csv')
+
+    def test_columnar_matches_compute_metrics(self):
+        self.check_format('columnar')
+
+    def test_missing_labels_raise(self):
+        path = os.path.join(self.directory.name, "unlabelled.csv")
+        write_table(self.test_data[FEATURE_ORDER], path)
+        with self.assertRaises(KeyError), self.assertLogs(level='ERROR'):
+            stream_confusion(path, self.model_path, FEATURE_ORDER, self.model.classes_, 100, max_workers=1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+# tests/test_parsing.py
+
+import logging
+import unittest
+import numpy as np
+from src.utils.helpers import FEATURE_ORDER, parse_input, parse_inputs_bulk, parse_record
+
+VALID_INPUTS = [
+    "age=22,sex=female,class=3",
+    "Age=38, Sex=Male, Class=1, SibSp=1, Parch=0, Fare=71.2833, Embarked=C",
+    "class=2,embarked=q,fare=0,age=0.42",
+    "sex=male",
+    "fare=512.3292,parch=6,sibsp=8,embarked=S,age=80,class=1,sex=female",
+    "age=1e1,fare=7.25,unknown=5",
+    "pclass=1,sex=female",
+]
+
+INVALID_INPUTS = [
+    "age=-1",
+    "sex=other",
+    "class=4",
+    "embarked=x",
+    "fare=abc",
+    "sibsp=1.5",
+    "age=22,sex",
+]
+
+def setUpModule():
+    # parse_input logs every default it fills in and every rejected value
+    logging.disable(logging.CRITICAL)
+
+def tearDownModule():
+    logging.disable(logging.NOTSET)
+
+class ParseRecordTest(unittest.TestCase):
+
+    def test_file_rows_use_the_same_rules_as_parse_input(self):
+        self.assertEqual(parse_record({"Age": "22", "Sex": "female", "class": "3"}), parse_input("age=22,sex=female,class=3"))
+
+    def test_pclass_column_is_accepted_in_file_rows_only(self):
+        self.assertEqual(parse_record({"Pclass": "1"})["Pclass"], 1)
+        # --input keeps its documented keys; an unknown key is ignored and the default applies
+        self.assertEqual(parse_input("pclass=1")["Pclass"], parse_input("sex=male")["Pclass"])
+
+    def test_invalid_values_raise(self):
+        for record in [{"class": "4"}, {"sex": "x"}, {"age": "-1"}, {"Pclass": "0"}]:
+            with self.assertRaises(ValueError, msg=record):
+                parse_record(record)
+
+class ParseInputsBulkTest(unittest.TestCase):
+    """parse_inputs_bulk must agree with parse_input / parse_record row by row."""
+
+    def check_rows(self, columns, expected_rows):
+        self.assertEqual(list(columns), FEATURE_ORDER)
+        for row, expected in enumerate(expected_rows):
+            self.assertEqual({feature: columns[feature][row] for feature in FEATURE_ORDER}, expected, msg=f"row {row}")
+
+    def test_strings_match_parse_input(self):
+        columns, valid, errors = parse_inputs_bulk(VALID_INPUTS)
+        self.assertTrue(valid.all())
+        self.assertEqual(errors, [])
+        self.check_rows(columns, [parse_input(text) for text in VALID_INPUTS])
+
+    def test_dicts_match_parse_record(self):
+        records = [
+            {"PassengerId": "1", "Age": "22", "Sex": "female", "Pclass": "3", "Fare": ""},
+            {"PassengerId": "2", "age": "38", "sex": "male", "class": "1", "embarked": "c", "sibsp": "1"},
+            {"PassengerId": "3"},
+        ]
+        columns, valid, errors = parse_inputs_bulk(records)
+        self.assertTrue(valid.all())
+        expected = [parse_record({key: value for key, value in record.items() if key != "PassengerId" and value != ""})
+                    for record in records]
+        self.check_rows(columns, expected)
+
+    def test_invalid_rows_are_reported_where_parse_input_raises(self):
+        inputs = [VALID_INPUTS[0]] + INVALID_INPUTS + [VALID_INPUTS[1]]
+        columns, valid, errors = parse_inputs_bulk(inputs)
+        for row, text in enumerate(inputs):
+            try:
+                parse_input(text)
+                raised = False
+            except ValueError:
+                raised = True
+            self.assertEqual(bool(valid[row]), not raised, msg=text)
+        self.assertEqual([row for row, _ in errors], list(np.flatnonzero(~valid)))
+        self.check_rows({feature: columns[feature][[0, len(inputs) - 1]] for feature in FEATURE_ORDER},
+                        [parse_input(VALID_INPUTS[0]), parse_input(VALID_INPUTS[1])])
+
+    def test_dtypes(self):
+        columns, _, _ = parse_inputs_bulk(VALID_INPUTS)
+        for feature in FEATURE_ORDER:
+            expected = np.float64 if feature in ['Age', 'Fare'] else np.int64
+            self.assertEqual(columns[feature].dtype, expected, msg=feature)
+
+if __name__ == "__main__":
+    unittest.main()
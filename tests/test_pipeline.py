@@ -0,0 +1,95 @@
+# tests/test_pipeline.py
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+from src.pipeline import Stage, load_state, run_pipeline
+from tests import support
+
+class PipelineTest(unittest.TestCase):
+    """Stages rerun only when forced or when their inputs, parameters or outputs changed."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.source = self.path("raw.txt")
+        self.middle = self.path("processed", "middle.txt")
+        self.output = self.path("model", "output.txt")
+        self.state_path = self.path(".pipeline", "state.json")
+        with open(self.source, 'w') as f:
+            f.write("passengers\n")
+        support.STAGE_RUNS.clear()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, *parts) -> str:
+        return os.path.join(self.directory.name, *parts)
+
+    def stages(self, stage=None):
+        # Same shape as build_stages: each stage's output is the next one's input
+        return [
+            Stage("preprocess", "tests.support", "copy_upper", inputs=[self.source], outputs=[self.middle],
+                  params={"source": self.source, "output": self.middle, "stage": "preprocess"}),
+            Stage("train", "tests.support", "copy_upper", inputs=[self.middle], outputs=[self.output],
+                  params={"source": self.middle, "output": self.output, "stage": stage or "train"}),
+        ]
+
+    def run_pipeline(self, stages=None, **kwargs) -> list:
+        support.STAGE_RUNS.clear()
+        with mock.patch("src.pipeline.build_stages", return_value=stages or self.stages()), \
+                contextlib.redirect_stdout(io.StringIO()):
+            executed = run_pipeline(state_path=self.state_path, **kwargs)
+        return executed
+
+    def test_first_run_executes_everything(self):
+        self.assertEqual(self.run_pipeline(), ["preprocess", "train"])
+        self.assertEqual(support.STAGE_RUNS, ["preprocess", "train"])
+        self.assertEqual(sorted(load_state(self.state_path)), ["preprocess", "train"])
+
+    def test_unchanged_stages_are_skipped(self):
+        self.run_pipeline()
+        self.assertEqual(self.run_pipeline(), [])
+        self.assertEqual(support.STAGE_RUNS, [])
+
+    def test_force_reruns_only_the_named_stage(self):
+        self.run_pipeline()
+        self.assertEqual(self.run_pipeline(force=["train"]), ["train"])
+        self.assertEqual(support.STAGE_RUNS, ["train"])
+
+    def test_force_all(self):
+        self.run_pipeline()
+        self.assertEqual(self.run_pipeline(force=["all"]), ["preprocess", "train"])
+
+    def test_changed_input_reruns_downstream_stages(self):
+        self.run_pipeline()
+        with open(self.source, 'w') as f:
+            f.write("more passengers\n")
+        self.assertEqual(self.run_pipeline(), ["preprocess", "train"])
+
+    def test_changed_parameters_rerun_the_stage(self):
+        self.run_pipeline()
+        self.assertEqual(self.run_pipeline(self.stages(stage="train-again")), ["train"])
+
+    def test_modified_output_reruns_its_stage(self):
+        self.run_pipeline()
+        with open(self.output, 'w') as f:
+            f.write("edited by hand\n")
+        self.assertEqual(self.run_pipeline(), ["train"])
+
+    def test_missing_output_reruns_its_stage(self):
+        self.run_pipeline()
+        os.remove(self.middle)
+        # preprocess writes the same middle file again, so train's input is unchanged
+        self.assertEqual(self.run_pipeline(), ["preprocess"])
+
+    def test_dry_run_executes_nothing(self):
+        self.assertEqual(self.run_pipeline(dry_run=True), ["preprocess", "train"])
+        self.assertEqual(support.STAGE_RUNS, [])
+        self.assertFalse(os.path.exists(self.state_path))
+        self.assertFalse(os.path.exists(self.output))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+# tests/test_preprocess.py
+
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from src.data.columnar import processed_path, read_table, write_table
+from src.data.preprocess import StreamingMedian, preprocess_file_streaming, transform_chunk
+from tests.support import make_raw_frame
+
+class StreamingPreprocessTest(unittest.TestCase):
+    """Chunked preprocessing must write exactly what the whole-file path writes."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.raw_path = os.path.join(cls.directory.name, "train.csv")
+        make_raw_frame(503, seed=3).to_csv(cls.raw_path, index=False)
+        raw = pd.read_csv(cls.raw_path)
+        cls.expected = transform_chunk(raw, raw['Age'].median(), raw['Fare'].median())
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def test_median_matches_pandas(self):
+        values = pd.read_csv(self.raw_path)['Fare']
+        for chunk_size in [1, 10, 1000]:
+            median = StreamingMedian()
+            for start in range(0, len(values), chunk_size):
+                median.add(values.iloc[start:start + chunk_size])
+            self.assertEqual(median.median(), values.median())
+        self.assertTrue(np.isnan(StreamingMedian().median()))
+
+    def test_streamed_csv_matches_whole_file(self):
+        expected_path = os.path.join(self.directory.name, "expected.csv")
+        write_table(self.expected, expected_path)
+        for chunk_size in [10, 64, 10000]:
+            with self.subTest(chunk_size=chunk_size):
+                output_path = os.path.join(self.directory.name, f"streamed_{chunk_size}.csv")
+                self.assertEqual(preprocess_file_streaming(self.raw_path, output_path, chunk_size), len(self.expected))
+                with open(output_path) as streamed, open(expected_path) as whole:
+                    self.assertEqual(streamed.read(), whole.read())
+
+    def test_streamed_columnar_matches_whole_file(self):
+        expected_path = processed_path("expected", 'columnar', self.directory.name)
+        write_table(self.expected, expected_path)
+        for chunk_size in [10, 10000]:
+            with self.subTest(chunk_size=chunk_size):
+                output_path = processed_path(f"streamed_{chunk_size}", 'columnar', self.directory.name)
+                preprocess_file_streaming(self.raw_path, output_path, chunk_size)
+                pd.testing.assert_frame_equal(read_table(output_path), read_table(expected_path))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,175 @@
+# tests/test_registry.py
+
+import os
+import tempfile
+import time
+import unittest
+import joblib
+import numpy as np
+from src.models.artifacts import file_sha256
+from src.models.flat_forest import FlatForest
+from src.models.predictor import Predictor
+from src.models.registry import (CURRENT, FLAT_BUNDLE, LEGACY_PATHS, META_FILE, MODEL_FILE, QUANTIZED_BUNDLE, SHADOW,
+                                 add_bundle, current_artifacts, list_versions, prune, publish, read_pointer,
+                                 set_pointer, version_path)
+from tests.support import make_features, train_forest, write_feature_order
+
+class RegistryTestCase(unittest.TestCase):
+    """A scratch registry with two published models: v1 (active) and v2."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.registry_path = os.path.join(self.directory.name, "registry")
+        self.feature_order_path = os.path.join(self.directory.name, "feature_order.txt")
+        write_feature_order(self.feature_order_path)
+        self.models, self.model_paths = [], []
+        for seed, params in [(0, {}), (1, {'n_estimators': 3, 'max_depth': 2})]:
+            model, _, _ = train_forest(seed=seed, **params)
+            path = os.path.join(self.directory.name, f"model_{seed}.joblib")
+            joblib.dump(model, path)
+            self.models.append(model)
+            self.model_paths.append(path)
+        self.v2 = publish(self.model_paths[1], self.feature_order_path, {"name": "v2"}, self.registry_path)
+        self.v1 = publish(self.model_paths[0], self.feature_order_path, {"name": "v1"}, self.registry_path)
+        self.X = make_features(200, seed=2)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+class RegistryTest(RegistryTestCase):
+
+    def test_publish_is_content_addressed_and_activates(self):
+        self.assertEqual(read_pointer(CURRENT, self.registry_path), self.v1)
+        self.assertEqual(publish(self.model_paths[0], self.feature_order_path, registry_path=self.registry_path,
+                                 activate=False), self.v1)
+        self.assertNotEqual(self.v1, self.v2)
+        self.assertEqual([meta["name"] for meta in list_versions(self.registry_path)], ["v2", "v1"])
+
+        paths = current_artifacts(self.registry_path)
+        self.assertEqual(paths["version"], self.v1)
+        self.assertEqual(os.path.dirname(paths[MODEL_FILE]), version_path(self.v1, self.registry_path))
+        self.assertEqual(file_sha256(paths[MODEL_FILE]), file_sha256(self.model_paths[0]))
+
+    def test_without_current_the_legacy_paths_are_used(self):
+        set_pointer(CURRENT, None, self.registry_path)
+        self.assertEqual(current_artifacts(self.registry_path), {**LEGACY_PATHS, "version": None})
+
+    def test_only_bundles_of_the_same_model_are_published(self):
+        bundles = {}
+        for name, model_path in [(FLAT_BUNDLE, self.model_paths[0]), (QUANTIZED_BUNDLE, self.model_paths[1])]:
+            bundles[name] = os.path.join(self.directory.name, name)
+            forest = FlatForest.from_model(joblib.load(model_path))
+            forest.source_hash = file_sha256(model_path)
+            forest.save(bundles[name])
+        publish(self.model_paths[0], self.feature_order_path, registry_path=self.registry_path, bundles=bundles)
+        paths = current_artifacts(self.registry_path)
+        self.assertTrue(os.path.isdir(paths[FLAT_BUNDLE]))
+        self.assertFalse(os.path.exists(paths[QUANTIZED_BUNDLE]))
+
+    def test_add_bundle_replaces_in_place(self):
+        for content in ["first", "second"]:
+            def save(path, content=content):
+                with open(os.path.join(path, "data.txt"), 'w') as f:
+                    f.write(content)
+            target = add_bundle(self.v1, FLAT_BUNDLE, save, self.registry_path)
+        with open(os.path.join(target, "data.txt")) as f:
+            self.assertEqual(f.read(), "second")
+        # No staging or retired directories are left behind
+        self.assertEqual([name for name in os.listdir(version_path(self.v1, self.registry_path)) if name.startswith(".")], [])
+
+    def test_pointers_only_name_published_versions(self):
+        with self.assertRaises(FileNotFoundError), self.assertLogs(level='ERROR'):
+            set_pointer(SHADOW, "0" * 16, self.registry_path)
+        self.assertIsNone(read_pointer(SHADOW, self.registry_path))
+
+    def test_prune_keeps_current_and_shadow(self):
+        set_pointer(SHADOW, self.v2, self.registry_path)
+        self.assertEqual(prune(0, self.registry_path), [])
+        set_pointer(SHADOW, None, self.registry_path)
+        self.assertEqual(prune(0, self.registry_path), [self.v2])
+        self.assertEqual([meta["version"] for meta in list_versions(self.registry_path)], [self.v1])
+
+class PredictorRegistryTest(RegistryTestCase):
+    """Running predictors follow CURRENT without stopping, and score SHADOW alongside it."""
+
+    def predictor(self) -> Predictor:
+        """A predictor after its first load; the load's log lines are kept in self.load_logs."""
+        predictor = Predictor(cache=None, registry_path=self.registry_path)
+        with self.assertLogs(level='INFO') as logs:
+            predictor.refresh()
+        self.load_logs = logs.output
+        return predictor
+
+    def probabilities(self, predictor):
+        return predictor.predict_batch(self.X.to_dict('records'))[1]
+
+    def wait_for(self, predictor, version: str):
+        """Keep predicting until the background reload has swapped version in."""
+        deadline = time.monotonic() + 30
+        while predictor.model_hash != version:
+            self.assertLess(time.monotonic(), deadline, "background reload did not finish")
+            self.probabilities(predictor)
+            time.sleep(0.01)
+
+    def test_serves_current(self):
+        predictor = self.predictor()
+        self.assertEqual(predictor.model_hash, self.v1)
+        np.testing.assert_array_equal(self.probabilities(predictor), self.models[0].predict_proba(self.X)[:, 1])
+
+    def test_activate_hot_swaps_in_the_background(self):
+        predictor = self.predictor()
+        set_pointer(CURRENT, self.v2, self.registry_path)
+        with self.assertLogs(level='INFO'):
+            # The call that notices the change is still answered by the loaded model
+            np.testing.assert_array_equal(self.probabilities(predictor), self.models[0].predict_proba(self.X)[:, 1])
+            self.wait_for(predictor, self.v2)
+        np.testing.assert_array_equal(self.probabilities(predictor), self.models[1].predict_proba(self.X)[:, 1])
+
+        # Rolling back to a resident version does not load anything
+        set_pointer(CURRENT, self.v1, self.registry_path)
+        with self.assertNoLogs(level='INFO'):
+            self.assertTrue(predictor.refresh(wait=True))
+        self.assertEqual(predictor.model_hash, self.v1)
+
+    def test_failed_reload_keeps_serving(self):
+        predictor = self.predictor()
+        os.remove(os.path.join(version_path(self.v2, self.registry_path), MODEL_FILE))
+        set_pointer(CURRENT, self.v2, self.registry_path)
+        with self.assertLogs(level='ERROR'):
+            self.probabilities(predictor)
+            deadline = time.monotonic() + 30
+            while predictor._lock.locked():
+                self.assertLess(time.monotonic(), deadline)
+                time.sleep(0.01)
+        self.assertEqual(predictor.model_hash, self.v1)
+        # Not retried on every call
+        with self.assertNoLogs(level='ERROR'):
+            np.testing.assert_array_equal(self.probabilities(predictor), self.models[0].predict_proba(self.X)[:, 1])
+
+    def test_shadow_scores_the_same_rows(self):
+        set_pointer(SHADOW, self.v2, self.registry_path)
+        predictor = self.predictor()
+        self.assertEqual(predictor.shadow_version, self.v2)
+        np.testing.assert_array_equal(self.probabilities(predictor), self.models[0].predict_proba(self.X)[:, 1])
+
+        stats = predictor.shadow_stats()[self.v2]
+        primary, shadow = self.models[0].predict(self.X), self.models[1].predict(self.X)
+        self.assertEqual(stats["rows"], len(self.X))
+        self.assertEqual(stats["disagreements"], int((primary != shadow).sum()))
+        expected_diff = np.abs(self.models[0].predict_proba(self.X)[:, 1] - self.models[1].predict_proba(self.X)[:, 1]).mean()
+        self.assertAlmostEqual(stats["mean_abs_probability_diff"], expected_diff, places=12)
+
+        set_pointer(SHADOW, None, self.registry_path)
+        predictor.refresh(wait=True)
+        self.assertIsNone(predictor.shadow_version)
+
+    def test_broken_shadow_does_not_affect_current(self):
+        os.remove(os.path.join(version_path(self.v2, self.registry_path), MODEL_FILE))
+        set_pointer(SHADOW, self.v2, self.registry_path)
+        predictor = self.predictor()
+        self.assertTrue(any(line.startswith("ERROR") and self.v2 in line for line in self.load_logs))
+        self.assertIsNone(predictor.shadow_version)
+        np.testing.assert_array_equal(self.probabilities(predictor), self.models[0].predict_proba(self.X)[:, 1])
+
+if __name__ == "__main__":
+    unittest.main()
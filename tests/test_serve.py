@@ -0,0 +1,134 @@
+# tests/test_serve.py
+
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+import joblib
+import pandas as pd
+from src.models.predictor import Predictor
+from src.serve import MAX_HEADERS, MicroBatcher, PredictionServer, ServingStats
+from src.utils.helpers import FEATURE_ORDER, parse_input
+from tests.support import train_forest, write_feature_order
+
+INPUTS = ["class=1,sex=female,age=29,fare=100", "class=3,sex=male,age=40", "sex=female",
+          "class=2,sex=male,age=8,sibsp=1,parch=2,embarked=C"]
+
+class PredictionServerTest(unittest.IsolatedAsyncioTestCase):
+    """End-to-end requests against the HTTP server on an ephemeral port."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.model, _, _ = train_forest()
+        cls.model_path = os.path.join(cls.directory.name, "model.joblib")
+        cls.feature_order_path = os.path.join(cls.directory.name, "feature_order.txt")
+        joblib.dump(cls.model, cls.model_path)
+        write_feature_order(cls.feature_order_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    async def asyncSetUp(self):
+        self.predictor = Predictor(self.model_path, self.feature_order_path, registry_path=None)
+        self.predictor.refresh()
+        self.stats = ServingStats(max_batch_size=8)
+        # A long wait so concurrent requests reliably share batches
+        self.batcher = MicroBatcher(self.predictor, self.stats, max_batch_size=8, max_wait_ms=200.0)
+        self.batch_task = asyncio.create_task(self.batcher.run())
+        self.server = await asyncio.start_server(PredictionServer(self.batcher, self.stats).handle_connection,
+                                                 '127.0.0.1', 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        self.server.close()
+        await self.server.wait_closed()
+        self.batch_task.cancel()
+
+    async def send(self, raw: bytes):
+        """Send raw bytes on a new connection; (status, payload) of the first response."""
+        reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+        writer.write(raw)
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        headers = {}
+        while (line := await reader.readline()) not in (b'\r\n', b''):
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        body = await reader.readexactly(int(headers['content-length']))
+        writer.close()
+        return status, json.loads(body)
+
+    async def post(self, payload):
+        body = json.dumps(payload).encode('utf-8')
+        return await self.send(b"POST /predict HTTP/1.1\r\nContent-Length: " + str(len(body)).encode() +
+                               b"\r\nConnection: close\r\n\r\n" + body)
+
+    def expected(self, text: str):
+        """Survival probability of parse_input(text) straight from the model."""
+        with self.assertLogs(level='INFO'):
+            features = parse_input(text)
+        return self.model.predict_proba(pd.DataFrame([features])[FEATURE_ORDER])[0, 1]
+
+    async def test_predict_matches_the_model(self):
+        expected = [self.expected(text) for text in INPUTS]
+        # Defaults are filled in without logging each request
+        with self.assertNoLogs(level='INFO'):
+            results = [await self.post({"input": text}) for text in INPUTS]
+        for (status, payload), probability in zip(results, expected):
+            self.assertEqual(status, 200)
+            self.assertEqual(payload["survival_probability"], probability)
+            self.assertEqual(payload["prediction"], int(probability > 0.5))
+
+    async def test_features_object_matches_input_string(self):
+        status, payload = await self.post({"features": {"Pclass": "1", "Sex": "female", "Age": "29", "Fare": "100"}})
+        self.assertEqual(status, 200)
+        self.assertEqual(payload["survival_probability"], self.expected(INPUTS[0]))
+
+    async def test_concurrent_requests_share_batches(self):
+        texts = INPUTS * 4
+        results = await asyncio.gather(*(self.post({"input": text}) for text in texts))
+        for text, (status, payload) in zip(texts, results):
+            self.assertEqual(status, 200)
+            self.assertEqual(payload["survival_probability"], self.expected(text))
+        self.assertLess(self.stats.batches, len(texts))
+        self.assertEqual(sum(self.stats.batch_size_counts), self.stats.batches)
+
+    async def test_invalid_input_in_a_batch_only_fails_its_own_request(self):
+        with self.assertLogs(level='ERROR'):
+            results = await asyncio.gather(self.post({"input": "class=5,sex=female"}), self.post({"input": INPUTS[0]}),
+                                           self.post({"features": {"sex": "unknown"}}))
+        self.assertEqual([status for status, _ in results], [400, 200, 400])
+        self.assertIn("class", results[0][1]["error"])
+        self.assertEqual(self.stats.errors, 2)
+
+    async def test_metrics_and_health(self):
+        await self.post({"input": INPUTS[0]})
+        status, metrics = await self.send(b"GET /metrics HTTP/1.1\r\nConnection: close\r\n\r\n")
+        self.assertEqual(status, 200)
+        self.assertEqual(metrics["requests"], 1)
+        self.assertEqual(metrics["batches"], 1)
+        self.assertEqual(await self.send(b"GET /health HTTP/1.1\r\n\r\n"), (200, {"status": "ok"}))
+        self.assertEqual((await self.send(b"GET /nothing HTTP/1.1\r\n\r\n"))[0], 404)
+
+    async def test_malformed_requests_are_rejected_and_counted(self):
+        cases = [
+            (b"GARBAGE\r\n\r\n", 400),
+            (b"POST /predict HTTP/1.1\r\nContent-Length: abc\r\n\r\n", 400),
+            (b"POST /predict HTTP/1.1\r\nContent-Length: 1000000\r\n\r\n", 413),
+            (b"POST /predict HTTP/1.1\r\nContent-Length: 7\r\n\r\nnotjson", 400),
+            (b"GET /" + b"a" * 70000 + b" HTTP/1.1\r\n\r\n", 414),
+            (b"GET /health HTTP/1.1\r\nX-Long: " + b"a" * 70000 + b"\r\n\r\n", 431),
+            (b"GET /health HTTP/1.1\r\n" + b"X-Header: 1\r\n" * (MAX_HEADERS + 1) + b"\r\n", 431),
+        ]
+        for raw, expected_status in cases:
+            with self.subTest(status=expected_status):
+                self.assertEqual((await self.send(raw))[0], expected_status)
+        self.assertEqual(self.stats.errors, len(cases))
+        # The server keeps working afterwards
+        self.assertEqual((await self.send(b"GET /health HTTP/1.1\r\n" + b"X-Header: 1\r\n" * MAX_HEADERS + b"\r\n"))[0], 200)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+# tests/test_suite.py
+
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from benchmarks.suite import compare
+
+def metrics(**values) -> dict:
+    return {"metrics": {name: {"value": value, "better": 'higher' if name.endswith("per_s") else 'lower'}
+                        for name, value in values.items()}}
+
+class CompareTest(unittest.TestCase):
+    """Slowdowns beyond the threshold, in either direction of 'better', are regressions."""
+
+    def compare(self, results, baseline):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return compare(results, baseline, 0.2)
+
+    def test_latency_and_throughput_regressions(self):
+        baseline = metrics(latency_ms=10.0, rows_per_s=1000.0, other_ms=10.0)
+        results = metrics(latency_ms=12.5, rows_per_s=700.0, other_ms=11.0)
+        self.assertEqual(self.compare(results, baseline), ["latency_ms", "rows_per_s"])
+
+    def test_improvements_and_new_metrics_pass(self):
+        self.assertEqual(self.compare(metrics(latency_ms=5.0, rows_per_s=5000.0, new_ms=1.0),
+                                      metrics(latency_ms=10.0, rows_per_s=1000.0)), [])
+
+    def test_missing_baseline_fails(self):
+        with tempfile.TemporaryDirectory() as directory:
+            result = subprocess.run([sys.executable, "-m", "benchmarks.suite", "--baseline",
+                                     os.path.join(directory, "baseline.json")], capture_output=True, text=True)
+        self.assertEqual(result.returncode, 1)
+        self.assertIn("--update-baseline", result.stdout)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+# tests/test_train.py
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+import joblib
+import numpy as np
+from src.data.columnar import processed_path, write_table
+from src.models.artifacts import MODEL_META_PATH, MODEL_PATH
+from src.models.train import train_model
+from tests.support import make_features, make_labels
+
+SMALL_PARAMS = {'n_estimators': 10, 'max_depth': 4, 'n_jobs': 1}
+
+def write_processed(path: str, n_rows: int, seed: int):
+    X = make_features(n_rows, seed)
+    X['Survived'] = make_labels(X, seed)
+    write_table(X, path)
+
+class TrainTest(unittest.TestCase):
+    """train_model in a scratch directory laid out like the repository (data/processed, models/)."""
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.directory = tempfile.TemporaryDirectory()
+        os.chdir(self.directory.name)
+        os.makedirs(os.path.join("data", "processed"))
+        write_processed(processed_path("train_processed"), 300, seed=0)
+        self.new_data = os.path.join("data", "processed", "new_rows.csv")
+        write_processed(self.new_data, 80, seed=1)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.directory.cleanup()
+
+    def train(self, **kwargs) -> str:
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            train_model(**kwargs)
+        return output.getvalue()
+
+    def meta(self) -> dict:
+        with open(MODEL_META_PATH, 'r') as f:
+            return json.load(f)
+
+class GrowTest(TrainTest):
+
+    def test_grow_needs_new_data(self):
+        self.train(model_params=SMALL_PARAMS)
+        with self.assertRaises(ValueError):
+            self.train(grow=5)
+        with self.assertRaises(ValueError):
+            self.train(new_data=self.new_data)
+
+    def test_new_trees_fit_only_the_new_rows_and_old_trees_are_kept(self):
+        self.train(model_params=SMALL_PARAMS)
+        old = joblib.load(MODEL_PATH)
+        self.train(grow=5, new_data=self.new_data)
+        grown = joblib.load(MODEL_PATH)
+
+        self.assertEqual(len(grown.estimators_), 15)
+        X = make_features(50, seed=2)
+        for old_tree, tree in zip(old.estimators_, grown.estimators_[:10]):
+            np.testing.assert_array_equal(tree.predict_proba(X.to_numpy()), old_tree.predict_proba(X.to_numpy()))
+        meta = self.meta()
+        self.assertEqual(meta["generation"], 1)
+        self.assertEqual([tree["n_samples"] for tree in meta["trees"][10:]], [80] * 5)
+        self.assertTrue(all(tree["generation"] == 1 for tree in meta["trees"][10:]))
+
+    def test_grow_keeps_the_original_holdout(self):
+        self.train(model_params=SMALL_PARAMS)
+        validation_path = processed_path("validation_set")
+        with open(validation_path, 'rb') as f:
+            holdout = f.read()
+        output = self.train(grow=5, new_data=self.new_data)
+        with open(validation_path, 'rb') as f:
+            self.assertEqual(f.read(), holdout)
+        self.assertIn("Validation Accuracy", output)
+
+    def test_grow_without_holdout_skips_validation(self):
+        self.train(model_params=SMALL_PARAMS, oob=True)
+        output = self.train(grow=5, new_data=self.new_data)
+        self.assertNotIn("Validation Accuracy", output)
+        self.assertFalse(os.path.exists(processed_path("validation_set")))
+        self.assertTrue(self.meta()["all_rows"])
+
+    def test_max_trees_retires_the_oldest(self):
+        self.train(model_params=SMALL_PARAMS)
+        old = joblib.load(MODEL_PATH)
+        self.train(grow=5, max_trees=12, new_data=self.new_data)
+        grown = joblib.load(MODEL_PATH)
+        self.assertEqual(len(grown.estimators_), 12)
+        X = make_features(50, seed=2).to_numpy()
+        np.testing.assert_array_equal(grown.estimators_[0].predict_proba(X), old.estimators_[3].predict_proba(X))
+        self.assertEqual(len(self.meta()["trees"]), 12)
+
+    def test_rejects_new_data_with_other_columns(self):
+        self.train(model_params=SMALL_PARAMS)
+        X = make_features(20, seed=3).drop(columns=['Fare'])
+        X['Survived'] = 0
+        write_table(X, self.new_data)
+        with self.assertRaises(ValueError):
+            self.train(grow=5, new_data=self.new_data)
+
+    def test_rejects_structural_params(self):
+        self.train(model_params=SMALL_PARAMS)
+        with self.assertRaises(ValueError):
+            self.train(grow=5, new_data=self.new_data, model_params={'max_depth': 8})
+
+class OobTest(TrainTest):
+
+    def test_oob_metrics_are_stored_and_no_validation_set_is_written(self):
+        self.train(model_params=SMALL_PARAMS)
+        self.assertTrue(os.path.exists(processed_path("validation_set")))
+        # Enough trees that every row is left out of some bootstrap sample
+        output = self.train(model_params={**SMALL_PARAMS, 'n_estimators': 40}, oob=True)
+        self.assertIn("Out-of-bag Accuracy", output)
+        self.assertFalse(os.path.exists(processed_path("validation_set")))
+
+        model = joblib.load(MODEL_PATH)
+        meta = self.meta()
+        self.assertTrue(meta["all_rows"])
+        self.assertEqual(meta["oob"]["rows"], 300)
+        self.assertEqual(meta["trees"][0]["n_samples"], 300)
+        # Every row scored by at least one tree agrees with sklearn's own oob_score_
+        self.assertEqual(meta["oob"]["rows_scored"], 300)
+        self.assertAlmostEqual(meta["oob"]["accuracy"], model.oob_score_, places=12)
+        self.assertEqual(np.array(meta["oob"]["confusion_matrix"]).sum(), 300)
+
+    def test_params_may_already_ask_for_oob_score(self):
+        params = {**SMALL_PARAMS, 'oob_score': True}
+        self.train(model_params=params, oob=True)
+        self.assertEqual(params, {**SMALL_PARAMS, 'oob_score': True})
+        self.assertIn("oob", self.meta())
+
+    def test_rejects_settings_without_out_of_bag_rows(self):
+        with self.assertRaises(ValueError):
+            self.train(model_params={**SMALL_PARAMS, 'bootstrap': False}, oob=True)
+        self.train(model_params=SMALL_PARAMS)
+        with self.assertRaises(ValueError):
+            self.train(grow=5, new_data=self.new_data, oob=True)
+
+if __name__ == "__main__":
+    unittest.main()